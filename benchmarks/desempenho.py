@@ -0,0 +1,219 @@
+#  -*- coding: utf-8 -*-
+#    @package: desempenho.py
+#     @author: Guilherme N. Ramos (gnramos@unb.br)
+#
+# Medição de desempenho das funções de extração de informações dos relatórios
+# do Sistema de Graduação da UnB (SIGRA), usando relatórios sintéticos em
+# escalas crescentes.
+#
+# Para cada relatório e escala, são medidos o tempo de processamento (o menor
+# dentre as repetições), a vazão (linhas/s e registros/s) e o pico de memória
+# alocada. Os resultados são acrescentados (uma linha JSON por execução) ao
+# arquivo de resultados e comparados com os da execução anterior, indicando
+# as regressões.
+#
+# Os resultados são gravados por padrão em benchmarks/resultados.jsonl, que
+# não é versionado.
+#
+# Uso (a partir da raiz do repositório):
+#   python -m benchmarks.desempenho [--escalas 1 2 4 8] [--repeticoes 3]
+
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from sigra import cache
+from sigra import lote
+from sigra import sintetico
+
+
+RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          'resultados.jsonl')
+
+# Tamanho dos relatórios na escala 1.
+DISCIPLINAS = 250
+TURMAS = 3
+ALUNOS = 2000
+
+
+def _num_registros(tipo, resultado):
+    '''Quantidade de registros (a unidade de informação de cada relatório)
+    extraídos.'''
+    if tipo == 'OFELST':
+        return sum(len(d.turmas) for d in resultado.values())
+    if tipo == 'FLULST':
+        return sum(len(disciplinas)
+                   for periodo in resultado.values()
+                   for disciplinas in periodo.disciplinas.values())
+    if tipo == 'CUREGEP':
+        return sum(len(stats) for stats in resultado.values())
+    if tipo == 'ALUREL':
+        return sum(len(alunos)
+                   for opcao in resultado.values()
+                   for alunos in opcao['Alunos'].values())
+    if tipo == 'HEDIS':
+        return sum(len(matriculas)
+                   for turmas in resultado.values()
+                   for matriculas in turmas.values())
+    if tipo == 'HEEME':
+        return sum(len(disciplina['Turmas'])
+                   for deptos in resultado.values()
+                   for disciplinas in deptos.values()
+                   for disciplina in disciplinas.values())
+    return len(resultado)  # DISLST e ALUTEL
+
+
+def _num_linhas(arquivo):
+    with open(arquivo, encoding='utf-16') as f:
+        return sum(1 for _ in f)
+
+
+def mede(tipo, arquivo, repeticoes=3):
+    '''Mede o desempenho da extração de um relatório, sem usar o cache.
+
+    Argumentos:
+    tipo -- tipo do relatório (veja lote.TIPOS).
+    arquivo -- caminho para o arquivo (UTF-16) contendo os dados.
+    repeticoes -- quantidade de medições de tempo (considera-se a menor).
+                  (default 3)
+    '''
+    extrai = lote.extrator(tipo)
+    argumento = [arquivo] if tipo in lote.RECEBEM_LISTA else arquivo
+
+    tempos = []
+    with cache.desativado():
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            resultado = extrai(argumento)
+            tempos.append(time.perf_counter() - inicio)
+
+        tracemalloc.start()
+        try:
+            extrai(argumento)
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    tempo = min(tempos)
+    linhas = _num_linhas(arquivo)
+    registros = _num_registros(tipo, resultado)
+    if not registros:
+        raise RuntimeError('Nenhum registro extraído de {} ({}), '
+                           'verifique o relatório sintético.'.format(
+                               arquivo, tipo))
+    return {'tempo': tempo,
+            'linhas': linhas,
+            'registros': registros,
+            'linhas/s': linhas / tempo if tempo else 0,
+            'registros/s': registros / tempo if tempo else 0,
+            'memoria': pico}
+
+
+def executa(escalas=(1, 2, 4, 8), tipos=None, repeticoes=3):
+    '''Mede o desempenho de cada tipo de relatório em cada escala,
+    retornando um dicionário tipo: {escala: medidas}.
+
+    Argumentos:
+    escalas -- fatores multiplicativos do tamanho dos relatórios sintéticos.
+               (default (1, 2, 4, 8))
+    tipos -- tipos de relatório a considerar (None para todos).
+             (default None)
+    repeticoes -- quantidade de medições de tempo (considera-se a menor).
+                  (default 3)
+    '''
+    tipos = tipos or sorted(lote.TIPOS)
+    medidas = {tipo: {} for tipo in tipos}
+    with tempfile.TemporaryDirectory() as diretorio:
+        for escala in escalas:
+            arquivos = sintetico.gera(os.path.join(diretorio, str(escala)),
+                                      DISCIPLINAS * escala, TURMAS,
+                                      ALUNOS * escala)
+            for tipo in tipos:
+                medidas[tipo][str(escala)] = mede(tipo, arquivos[tipo],
+                                                  repeticoes)
+    return medidas
+
+
+def _versao():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def _anterior(arquivo):
+    try:
+        with open(arquivo) as f:
+            linhas = f.read().splitlines()
+    except FileNotFoundError:
+        return None
+    return json.loads(linhas[-1]) if linhas else None
+
+
+def _imprime(medidas, anterior, tolerancia):
+    print('{:9} {:>6} {:>9} {:>12} {:>12} {:>9}'.format(
+          'Relatório', 'Escala', 'Tempo(s)', 'Linhas/s', 'Registros/s',
+          'MiB'))
+    regressoes = []
+    for tipo, por_escala in medidas.items():
+        for escala, m in por_escala.items():
+            alerta = ''
+            try:
+                antes = anterior['medidas'][tipo][escala]['tempo']
+            except (KeyError, TypeError):
+                antes = None
+            if antes and m['tempo'] > antes * (1 + tolerancia):
+                alerta = '  +{:.0%}'.format(m['tempo'] / antes - 1)
+                regressoes.append((tipo, escala))
+            print('{:9} {:>6} {:>9.4f} {:>12.0f} {:>12.0f} {:>9.1f}{}'.format(
+                  tipo, escala, m['tempo'], m['linhas/s'], m['registros/s'],
+                  m['memoria'] / 2**20, alerta))
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mede o desempenho das '
+                                     'funções de extração com relatórios '
+                                     'sintéticos.')
+    parser.add_argument('--escalas', nargs='+', type=int,
+                        default=[1, 2, 4, 8],
+                        help='fatores de escala dos relatórios')
+    parser.add_argument('--tipos', nargs='+', choices=sorted(lote.TIPOS),
+                        help='relatórios a considerar (default todos)')
+    parser.add_argument('--repeticoes', type=int, default=3,
+                        help='medições de tempo por relatório e escala')
+    parser.add_argument('--tolerancia', type=float, default=0.2,
+                        help='aumento relativo de tempo considerado '
+                             'regressão')
+    parser.add_argument('--resultados', default=RESULTADOS,
+                        help='arquivo onde acrescentar os resultados')
+    args = parser.parse_args()
+
+    anterior = _anterior(args.resultados)
+    medidas = executa(args.escalas, args.tipos, args.repeticoes)
+    regressoes = _imprime(medidas, anterior, args.tolerancia)
+
+    execucao = {'data': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'versao': _versao(),
+                'python': platform.python_version(),
+                'medidas': medidas}
+    with open(args.resultados, 'a') as f:
+        f.write(json.dumps(execucao) + '\n')
+
+    if regressoes:
+        print('\n{} regressão(ões) em relação à execução anterior '
+              '({}).'.format(len(regressoes), anterior.get('versao', '?')))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
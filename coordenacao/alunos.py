@@ -3,12 +3,19 @@
 #     @author: Guilherme N. Ramos (gnramos@unb.br)
 #
 # Funções para lidar com informações dos alunos.
+#
+# Os relatórios podem ser dados pelo caminho do arquivo ou por uma
+# sessao.Sessao que os contenha (processando-os uma única vez).
 
-import re
+import copy
+import csv
 
-from sigra.acompanhamento import alunos as ac_alunos
+from coordenacao import sessao
+from sigra import lote
+from sigra import metricas
+from sigra import utils
 from sigra.acompanhamento import historico_escolar as ac_he
-from sigra.planejamento import curso as pl_curso
+from sigra.planejamento import pre_requisitos as pl_pre_requisitos
 
 
 def contatos(ALUTEL,
@@ -25,7 +32,7 @@ def contatos(ALUTEL,
                parâmetros: nome, email, telefone (entre chaves {}).
                (default {nome} <{email}>)
     '''
-    relacao = ac_alunos.contatos(ALUTEL)
+    relacao = sessao.extrai(ALUTEL, 'ALUTEL')
     return [formato.format(nome=info['nome'],
                            email=info['e-mail'],
                            telefone=info['telefone'])
@@ -48,19 +55,16 @@ def csv_com_entrada_saida_de_alunos(CUREGEPs,
     separador -- separador de valores.
                  (default ;)
     '''
-    estatisticas = pl_curso.estatisticas(CUREGEPs)
+    estatisticas = sessao.extrai(CUREGEPs, 'CUREGEP')
     col_names = sorted(next(iter(estatisticas.values())).keys())
 
-    with open(arquivo, 'w') as f:
-        f.write('{}\n'.format(separador.join(['Período'] + col_names)))
-
-        for periodo in sorted(estatisticas.keys()):
-            f.write(periodo)
-            for k in col_names:
-                estatistica = estatisticas[periodo][k].values()
-                total = sum(int(n) for n in estatistica)
-                f.write('{}{}'.format(separador, total))
-            f.write('\n')
+    with open(arquivo, 'w', newline='') as f:
+        escritor = csv.writer(f, delimiter=separador, lineterminator='\n')
+        escritor.writerow(['Período'] + col_names)
+        escritor.writerows(
+            [periodo] + [sum(int(n) for n in estatisticas[periodo][k].values())
+                         for k in col_names]
+            for periodo in sorted(estatisticas))
 
 
 def matriculados_por_semestre(ALUREL,
@@ -83,18 +87,220 @@ def matriculados_por_semestre(ALUREL,
                     todas.
                     (default [])
     '''
-    cursaram = resultado_matriculados_por_semestre(ALUREL,
-                                                   HEDIS,
-                                                   habilitacoes)
-
     import collections
-    contador = collections.defaultdict(int)
-    for periodo in cursaram:
-        for turma in cursaram[periodo].values():
-            for matricula in turma:
-                contador[periodo] += 1
+    relacao = sessao.extrai(HEDIS, 'HEDIS')
+    matriculas = _matriculas(sessao.extrai(ALUREL, 'ALUREL'), habilitacoes)
+    try:
+        tabela = ac_he.TabelaDeMatriculas.de_relacao(relacao)
+    except ImportError:  # Sem NumPy.
+        # Assim como a tabela, conta cada matrícula em cada turma.
+        contador = collections.defaultdict(int)
+        for periodo, turmas in relacao.items():
+            for matriculados in turmas.values():
+                num_matriculados = len(matriculas.intersection(matriculados))
+                if num_matriculados:
+                    contador[periodo] += num_matriculados
+        return contador
+
+    contador = tabela.filtra(matriculas).matriculados_por_periodo()
+    return collections.defaultdict(int, contador)
+
+
+def aprovacao_por_turma(ALUREL,
+                        HEDIS,
+                        habilitacoes=[]):
+    '''Retorna um dicionário indicando, para cada turma (período, turma) em
+    que uma disciplina foi oferecida, a taxa de aprovação (entre 0 e 1) dos
+    alunos de determinadas habilitações. Requer NumPy.
+
+    Argumentos:
+    ALUREL -- caminho para o arquivo (UTF-16) contendo a relação de alunos
+              a serem considerados, que deve ser o ser o relatório
+              exportado via:
+              SIGRA > Acompanhamento > Alunos > ALUREL
+    HEDIS -- caminho para o arquivo (UTF-16) contendo o histórico de
+             matrículas da disciplina , que deve ser o relatório exportado
+             via:
+             SIGRA > Acompanhamento > Histórico Escolar > HEDIS
+    habilitacoes -- conjunto de habilitações de interesse. Deixe vazia para
+                    todas.
+                    (default [])
+    '''
+    tabela = ac_he.TabelaDeMatriculas.de_relacao(sessao.extrai(HEDIS,
+                                                               'HEDIS'))
+    matriculas = _matriculas(sessao.extrai(ALUREL, 'ALUREL'), habilitacoes)
+    return tabela.filtra(matriculas).aprovacao_por_turma()
+
+
+def matriculados_por_disciplina(ALUREL,
+                                HEDISs,
+                                habilitacoes=[],
+                                processos=None):
+    '''Retorna um dicionário indicando, para cada disciplina e cada período
+    letivo em que foi oferecida, quantos alunos de determinadas habilitações
+    foram matriculados ('Matriculados') e aprovados ('Aprovados') nela.
 
-    return contador
+    As matrículas dos alunos de interesse são obtidas uma única vez, e cada
+    histórico é cruzado com elas à medida que é processado (em paralelo).
+
+    Argumentos:
+    ALUREL -- caminho para o arquivo (UTF-16) contendo a relação de alunos
+              a serem considerados, que deve ser o ser o relatório
+              exportado via:
+              SIGRA > Acompanhamento > Alunos > ALUREL
+    HEDISs -- caminho para um diretório com os históricos (os arquivos HEDIS
+              são identificados pelo cabeçalho) ou lista contendo o caminho
+              para cada arquivo (UTF-16) contendo o histórico de matrículas
+              de uma disciplina, que deve ser o relatório exportado via:
+              SIGRA > Acompanhamento > Histórico Escolar > HEDIS
+    habilitacoes -- conjunto de habilitações de interesse. Deixe vazia para
+                    todas.
+                    (default [])
+    processos -- número máximo de processos simultâneos.
+                 (default número de processadores)
+    '''
+    matriculas = _matriculas(sessao.extrai(ALUREL, 'ALUREL'), habilitacoes)
+    aprovacao = set(ac_he.MENCOES_DE_APROVACAO)
+
+    tabela = {}
+    for codigo, relacao in _historicos(HEDISs, processos):
+        periodos = tabela.setdefault(codigo, {})
+        for periodo, turmas in relacao.items():
+            matriculados = aprovados = 0
+            for alunos in turmas.values():
+                for matricula in alunos.keys() & matriculas:
+                    matriculados += 1
+                    aprovados += alunos[matricula].mencao in aprovacao
+            if matriculados:
+                contagem = periodos.setdefault(periodo, {'Matriculados': 0,
+                                                         'Aprovados': 0})
+                contagem['Matriculados'] += matriculados
+                contagem['Aprovados'] += aprovados
+
+    return tabela
+
+
+def desempenho_por_turma(HEDISs,
+                         processos=None):
+    '''Retorna um dicionário indicando, para cada turma (código da disciplina,
+    período, turma) dos históricos dados, o número de matrículas e as taxas
+    (entre 0 e 1) de aprovação, reprovação e trancamento (veja
+    MENCOES_DE_APROVACAO, MENCOES_DE_REPROVACAO e MENCOES_DE_TRANCAMENTO em
+    historico_escolar).
+
+    Argumentos:
+    HEDISs -- caminho para um diretório com os históricos (os arquivos HEDIS
+              são identificados pelo cabeçalho) ou lista contendo o caminho
+              para cada arquivo (UTF-16) contendo o histórico de matrículas
+              de uma disciplina (processados em paralelo), que deve ser o
+              relatório exportado via:
+              SIGRA > Acompanhamento > Histórico Escolar > HEDIS
+    processos -- número máximo de processos simultâneos.
+                 (default número de processadores)
+    '''
+    # Índice da contagem de cada menção (0 para as demais).
+    categoria = dict.fromkeys(ac_he.MENCOES_DE_APROVACAO, 1)
+    categoria.update(dict.fromkeys(ac_he.MENCOES_DE_REPROVACAO, 2))
+    categoria.update(dict.fromkeys(ac_he.MENCOES_DE_TRANCAMENTO, 3))
+
+    desempenho = {}
+    for codigo, relacao in _historicos(HEDISs, processos):
+        for periodo, turmas in relacao.items():
+            for turma, alunos in turmas.items():
+                contagem = [0, 0, 0, 0]
+                for aluno in alunos.values():
+                    contagem[categoria.get(aluno.mencao, 0)] += 1
+
+                total = len(alunos)
+                if total:
+                    desempenho[codigo, periodo, turma] = {
+                        'Matrículas': total,
+                        'Aprovação': contagem[1] / total,
+                        'Reprovação': contagem[2] / total,
+                        'Trancamento': contagem[3] / total}
+
+    return desempenho
+
+
+def csv_com_desempenho_por_turma(HEDISs,
+                                 arquivo='desempenho.csv',
+                                 separador=';',
+                                 processos=None):
+    '''Gera um arquivo com o desempenho dos alunos em cada turma (veja
+    desempenho_por_turma), como uma listagem CSV ordenada por disciplina,
+    período e turma.
+
+    Argumentos:
+    HEDISs -- caminho para um diretório com os históricos ou lista contendo
+              o caminho para cada arquivo (UTF-16) contendo o histórico de
+              matrículas de uma disciplina, que deve ser o relatório
+              exportado via:
+              SIGRA > Acompanhamento > Histórico Escolar > HEDIS
+    arquivo -- caminho para o arquivo onde gravar os dados.
+               (default desempenho.csv)
+    separador -- separador de valores.
+                 (default ;)
+    processos -- número máximo de processos simultâneos.
+                 (default número de processadores)
+    '''
+    desempenho = desempenho_por_turma(HEDISs, processos)
+    colunas = ['Matrículas', 'Aprovação', 'Reprovação', 'Trancamento']
+
+    with open(arquivo, 'w', newline='') as f:
+        escritor = csv.writer(f, delimiter=separador, lineterminator='\n')
+        escritor.writerow(['Disciplina', 'Período', 'Turma'] + colunas)
+        escritor.writerows(
+            list(turma) + [desempenho[turma][c] for c in colunas]
+            for turma in sorted(desempenho, key=lambda t: (
+                t[0], utils.ordinal(t[1]), t[2])))
+
+
+def aptos_por_disciplina(OFELST,
+                         ALUREL,
+                         HEDISs,
+                         habilitacoes=[]):
+    '''Retorna um dicionário com o número de alunos que cumprem os
+    pré-requisitos de cada disciplina ofertada (e ainda não foram aprovados
+    nela), ou seja, a demanda potencial pela disciplina. Requer NumPy.
+
+    As aprovações dos alunos são obtidas dos históricos das disciplinas
+    dados; aprovações em disciplinas sem histórico não são consideradas.
+
+    Argumentos:
+    OFELST -- caminho para o arquivo (UTF-16) contendo os dados da Oferta,
+              que deve ser o relatório exportado via:
+              SIGRA > Planejamento > Oferta > OFELST
+    ALUREL -- caminho para o arquivo (UTF-16) contendo a relação de alunos
+              a serem considerados, que deve ser o ser o relatório
+              exportado via:
+              SIGRA > Acompanhamento > Alunos > ALUREL
+    HEDISs -- lista contendo o caminho para cada arquivo (UTF-16) contendo
+              o histórico de matrículas de uma disciplina (processados em
+              paralelo), que deve ser o relatório exportado via:
+              SIGRA > Acompanhamento > Histórico Escolar > HEDIS
+              Históricos sem o código da disciplina são ignorados.
+    habilitacoes -- conjunto de habilitações de interesse. Deixe vazia para
+                    todas.
+                    (default [])
+    '''
+    oferta = sessao.extrai(OFELST, 'OFELST')
+    matriculas = _matriculas(sessao.extrai(ALUREL, 'ALUREL'), habilitacoes)
+
+    aprovacoes = {matricula: set() for matricula in matriculas}
+    historicos = lote.processa(HEDISs, 'HEDIS')
+    for HEDIS, relacao in historicos.resultados.items():
+        codigo = ac_he.disciplina_cursada(HEDIS)
+        if codigo is None:
+            metricas.LOGGER.warning('%s ignorado (código da disciplina não '
+                                    'encontrado).', HEDIS)
+            continue
+        for matricula in ac_he.aprovados(relacao) & matriculas:
+            aprovacoes[matricula].add(codigo)
+
+    matriz = pl_pre_requisitos.MatrizDeAptidao(
+        aprovacoes, {codigo: disciplina.pre_requisitos
+                     for codigo, disciplina in oferta.items()})
+    return matriz.num_aptos()
 
 
 def media_de_matriculados_por_semestre(matriculados_por_semestre,
@@ -109,33 +315,29 @@ def media_de_matriculados_por_semestre(matriculados_por_semestre,
                                  matriculados_por_semestre).
     ignora_verao -- indica se deve ou não ignorar semestre de verão
                     (default True)
-    filtro_de_semestre -- filtro de semestres a serem considerados. Por
-                          exemplo, o filtro para considerar apenas períodos
-                          entre 2014/2 (inclusive) e 2016/2 (exclusive)
-                          seria '2014/2 <= {periodo} < 2016/2'
+    filtro_de_semestre -- filtro de semestres a serem considerados: um
+                          utils.IntervaloDePeriodos ou uma expressão de
+                          comparação. Por exemplo, o filtro para considerar
+                          apenas períodos entre 2014/2 (inclusive) e 2016/2
+                          (exclusive) seria '2014/2 <= {periodo} < 2016/2'
+                          (veja utils.IntervaloDePeriodos.de_filtro)
                           (default None)
     '''
-    def entre_aspas(matchobj):
-        return '\'{}\''.format(matchobj.group(0))
-
-    def filtra(p):
-        f = re.sub(r'\d{4}/\d', entre_aspas,
-                   filtro_de_semestre.format(periodo))
-        return not eval(f)
-
-    num_turmas = 0
-    total_matriculados = 0
-    for periodo, matriculados in matriculados_por_semestre.items():
-        # num_matriculas = len(matriculados)
-        if matriculados < 1:
-            continue
-        if ignora_verao and periodo.endswith('/0'):
-            continue
-        if filtro_de_semestre and filtra(periodo):
-            continue
-        total_matriculados += matriculados
-        num_turmas += 1
-    return total_matriculados / num_turmas if num_turmas else 0
+    if filtro_de_semestre is None:
+        intervalo = utils.IntervaloDePeriodos(ignora_verao=ignora_verao)
+    elif isinstance(filtro_de_semestre, str):
+        intervalo = utils.IntervaloDePeriodos.de_filtro(filtro_de_semestre,
+                                                        ignora_verao)
+    else:
+        intervalo = copy.copy(filtro_de_semestre)
+        intervalo.ignora_verao = intervalo.ignora_verao or ignora_verao
+
+    periodos = intervalo.filtra(periodo for periodo, matriculados
+                                in matriculados_por_semestre.items()
+                                if matriculados > 0)
+    total_matriculados = sum(matriculados_por_semestre[periodo]
+                             for periodo in periodos)
+    return total_matriculados / len(periodos) if periodos else 0
 
 
 def resultado_matriculados_por_semestre(ALUREL,
@@ -158,16 +360,10 @@ def resultado_matriculados_por_semestre(ALUREL,
                     todas.
                     (default [])
     '''
-    alunos = ac_alunos.relacao(ALUREL)
-    alunos_que_cursaram = ac_he.alunos_que_cursaram_disciplina(HEDIS)
+    alunos = sessao.extrai(ALUREL, 'ALUREL')
+    alunos_que_cursaram = sessao.extrai(HEDIS, 'HEDIS')
 
-    if not habilitacoes:
-        habilitacoes = alunos.keys()
-
-    matriculas = set(matricula
-                     for habilitacao in habilitacoes
-                     for periodo in alunos[habilitacao]['Alunos'].values()
-                     for matricula in periodo)
+    matriculas = _matriculas(alunos, habilitacoes)
 
     listagem = {}
     for periodo, turmas in alunos_que_cursaram.items():
@@ -179,3 +375,39 @@ def resultado_matriculados_por_semestre(ALUREL,
                     listagem[periodo][matricula] = infos
 
     return listagem
+
+
+def _historicos(HEDISs, processos=None):
+    '''Gera (código da disciplina, relação de alunos que a cursaram) de cada
+    histórico, processados em paralelo. O código (ou o caminho do arquivo, se
+    não for encontrado) é obtido no mesmo processo que extrai a relação.
+
+    Argumentos:
+    HEDISs -- caminho para um diretório com os históricos (os arquivos HEDIS
+              são identificados pelo cabeçalho) ou lista contendo o caminho
+              para cada arquivo.
+    processos -- número máximo de processos simultâneos.
+                 (default número de processadores)
+    '''
+    if isinstance(HEDISs, str):
+        HEDISs = list(lote.relatorios(HEDISs, 'HEDIS'))
+    yield from lote.aplica(_historico, HEDISs, processos)
+
+
+def _historico(HEDIS):
+    '''Retorna (código da disciplina, relação de alunos que a cursaram) de
+    um histórico (veja _historicos).'''
+    codigo = ac_he.disciplina_cursada(HEDIS) or HEDIS
+    return codigo, ac_he.alunos_que_cursaram_disciplina(HEDIS)
+
+
+def _matriculas(alunos, habilitacoes):
+    '''Retorna o conjunto de matrículas dos alunos das habilitações dadas
+    (todas, se vazia), dada a relação de alunos.'''
+    if not habilitacoes:
+        habilitacoes = alunos.keys()
+
+    return set(matricula
+               for habilitacao in habilitacoes
+               for periodo in alunos[habilitacao]['Alunos'].values()
+               for matricula in periodo)
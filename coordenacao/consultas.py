@@ -0,0 +1,158 @@
+#  -*- coding: utf-8 -*-
+#    @package: consultas.py
+#     @author: Guilherme N. Ramos (gnramos@unb.br)
+#
+# Versões das funções de coordenacao que consultam um armazem.Armazem (via
+# SQL, usando os índices do banco) em vez de processar os relatórios. Como o
+# banco pode conter relatórios de vários semestres, as consultas podem
+# cruzá-los sem acessar os arquivos originais. A oferta de cada período é a
+# do último relatório OFELST armazenado para ele (veja armazem.Armazem).
+
+import collections
+
+from sigra.acompanhamento import historico_escolar as ac_he
+
+
+def _marcadores(valores):
+    return ', '.join('?' * len(valores))
+
+
+def _alunos(habilitacoes):
+    '''Retorna a subconsulta SQL (e seus parâmetros) das matrículas dos
+    alunos das habilitações dadas (todas, se vazia).'''
+    if not habilitacoes:
+        return 'SELECT matricula FROM alurel_alunos', ()
+    return ('SELECT matricula FROM alurel_alunos '
+            'WHERE opcao IN ({})'.format(_marcadores(habilitacoes)),
+            tuple(habilitacoes))
+
+
+def contatos(armazem,
+             formato='{nome} <{email}>'):
+    '''Retorna a lista de contatos dos alunos armazenados (relatórios
+    ALUTEL). Se um aluno constar de mais de um relatório, considera-se o
+    armazenado por último.
+
+    Argumentos:
+    armazem -- armazem.Armazem com as informações dos relatórios.
+    formato -- formatação de cada registro. Aceitam-se apenas os seguintes
+               parâmetros: nome, email, telefone (entre chaves {}).
+               (default {nome} <{email}>)
+    '''
+    return [formato.format(nome=nome, email=email, telefone=telefone)
+            for nome, email, telefone in armazem.consulta(
+                'SELECT nome, email, telefone FROM alutel_contatos '
+                'WHERE rowid IN (SELECT MAX(rowid) FROM alutel_contatos '
+                'GROUP BY matricula)')]
+
+
+def matriculados_por_semestre(armazem,
+                              disciplina,
+                              habilitacoes=[]):
+    '''Retorna um dicionário indicando, para cada período letivo em que uma
+    disciplina foi oferecida, quantos alunos de determinadas habilitações
+    foram matriculados (veja alunos.matriculados_por_semestre).
+
+    Argumentos:
+    armazem -- armazem.Armazem com as informações dos relatórios (ALUREL e
+               HEDIS da disciplina).
+    disciplina -- código da disciplina.
+    habilitacoes -- conjunto de habilitações de interesse. Deixe vazia para
+                    todas.
+                    (default [])
+    '''
+    alunos, parametros = _alunos(habilitacoes)
+    return collections.defaultdict(int, armazem.consulta(
+        'SELECT periodo, COUNT(*) FROM ('
+        'SELECT DISTINCT periodo, turma, matricula FROM hedis_matriculas '
+        'WHERE codigo = ? AND matricula IN ({})) '
+        'GROUP BY periodo'.format(alunos), (disciplina,) + parametros))
+
+
+def aprovacao_por_turma(armazem,
+                        disciplina,
+                        habilitacoes=[]):
+    '''Retorna um dicionário indicando, para cada turma (período, turma) em
+    que uma disciplina foi oferecida, a taxa de aprovação (entre 0 e 1) dos
+    alunos de determinadas habilitações (veja alunos.aprovacao_por_turma).
+
+    Argumentos:
+    armazem -- armazem.Armazem com as informações dos relatórios (ALUREL e
+               HEDIS da disciplina).
+    disciplina -- código da disciplina.
+    habilitacoes -- conjunto de habilitações de interesse. Deixe vazia para
+                    todas.
+                    (default [])
+    '''
+    alunos, parametros = _alunos(habilitacoes)
+    aprovacao = ac_he.MENCOES_DE_APROVACAO
+    return {(periodo, turma): taxa
+            for periodo, turma, taxa in armazem.consulta(
+                'SELECT periodo, turma, AVG(mencao IN ({})) FROM ('
+                'SELECT DISTINCT periodo, turma, matricula, mencao '
+                'FROM hedis_matriculas '
+                'WHERE codigo = ? AND matricula IN ({})) '
+                'GROUP BY periodo, turma'.format(_marcadores(aprovacao),
+                                                 alunos),
+                aprovacao + (disciplina,) + parametros)}
+
+
+def carga_horaria_ofertada(armazem,
+                           periodo):
+    '''Retorna um dicionário contendo a carga horária a ser cumprida por cada
+    professor(a) no período letivo dado, considerando disciplinas ofertadas
+    com pelo menos 1 vaga (veja professores.carga_horaria_ofertada).
+
+    Argumentos:
+    armazem -- armazem.Armazem com as informações dos relatórios (OFELST).
+    periodo -- período letivo da oferta, como '2017/2'.
+    '''
+    return dict(armazem.consulta(
+        'SELECT p.professor, SUM(t.teoria + t.pratica + t.extensao) '
+        'FROM relatorios r '
+        'JOIN ofelst_turmas t ON t.arquivo = r.arquivo '
+        'JOIN ofelst_professores p ON p.arquivo = t.arquivo '
+        'AND p.codigo = t.codigo AND p.turma = t.turma '
+        "WHERE r.tipo = 'OFELST' AND r.periodo = ? AND t.vagas > 0 "
+        'GROUP BY p.professor', (periodo,)))
+
+
+def estatistica_por_semestre(armazem,
+                             ignore=[]):
+    '''Cruza as informações do histórico de menções com a oferta de cada
+    semestre, retornando um dicionário com a informações (veja
+    professores.estatistica_por_semestre). As menções de cada período são
+    cruzadas com a oferta do mesmo período.
+
+    Argumentos:
+    armazem -- armazem.Armazem com as informações dos relatórios (HEEME e
+               OFELST).
+    ignore -- lista com código de disciplinas que devem ser ignoradas na
+              contabilização (como '167681' -> Trabalho de Graduação 1).
+    '''
+    estatisticas = {periodo: {} for periodo, in armazem.consulta(
+        'SELECT DISTINCT periodo FROM heeme_mencoes')}
+
+    consulta = armazem.consulta(
+        'SELECT h.periodo, p.professor, '
+        'SUM((t.teoria + t.pratica + t.extensao) * 1.0 / ('
+        'SELECT COUNT(*) FROM ofelst_professores q '
+        'WHERE q.arquivo = t.arquivo AND q.codigo = t.codigo '
+        'AND q.turma = t.turma)), '
+        'COUNT(*), SUM(h.mencoes) '
+        'FROM (SELECT DISTINCT periodo, codigo, nivel, turma, mencoes '
+        'FROM heeme_mencoes) h '
+        "JOIN relatorios r ON r.tipo = 'OFELST' AND r.periodo = h.periodo "
+        'JOIN ofelst_turmas t ON t.arquivo = r.arquivo '
+        'AND t.codigo = h.codigo AND t.turma = h.turma '
+        'JOIN ofelst_professores p ON p.arquivo = t.arquivo '
+        'AND p.codigo = t.codigo AND p.turma = t.turma '
+        "WHERE h.nivel = 'GR' AND h.mencoes > 0 AND h.turma != '' "
+        'AND h.codigo NOT IN ({}) '
+        'GROUP BY h.periodo, p.professor'.format(_marcadores(ignore)),
+        tuple(ignore))
+    for periodo, professor, creditos, turmas, alunos in consulta:
+        estatisticas[periodo][professor] = {'creditos': creditos,
+                                            'turmas': turmas,
+                                            'alunos': alunos}
+    return estatisticas
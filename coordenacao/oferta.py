@@ -0,0 +1,51 @@
+#  -*- coding: utf-8 -*-
+#    @package: oferta.py
+#     @author: Guilherme N. Ramos (gnramos@unb.br)
+#
+# Funções para lidar com informações da oferta de disciplinas.
+#
+# Os relatórios podem ser dados pelo caminho do arquivo ou por uma
+# sessao.Sessao que os contenha (processando-os uma única vez).
+
+
+from coordenacao import sessao
+
+
+def conflitos_de_horario(OFELST,
+                         FLULST,
+                         habilitacao='',
+                         tipos=['OBR']):
+    '''Retorna um dicionário indicando, para cada período do fluxo de uma
+    habilitação, os pares de turmas reservadas de disciplinas do período
+    cujos horários coincidem, como ((código, turma), (código, turma)).
+
+    Argumentos:
+    OFELST -- caminho para o arquivo (UTF-16) contendo os dados da Oferta,
+              que deve ser o relatório exportado via:
+              SIGRA > Planejamento > Oferta > OFELST
+    FLULST -- caminho para o arquivo (UTF-16) contendo os dados do Fluxo de
+              uma habilitação, que deve ser o relatório exportado via:
+              SIGRA > Planejamento > Fluxo > FLULST
+    habilitacao -- parte do nome (em minúsculas) da habilitação para qual se
+                   quer considerar as turmas reservadas.
+                   (default '')
+    tipos -- lista com os tipos de disciplinas do fluxo a serem
+             consideradas.
+             (default ['OBR'])
+    '''
+    oferta = sessao.extrai(OFELST, 'OFELST')
+    fluxo = sessao.extrai(FLULST, 'FLULST')
+
+    reservadas = {}
+    for codigo, turma in oferta.reservadas(habilitacao):
+        reservadas.setdefault(codigo, []).append((codigo, turma))
+
+    conflitos = {}
+    for p in sorted(fluxo):
+        conflitos[p] = oferta.conflitos(
+            turma
+            for tipo, disciplinas in fluxo[p].disciplinas.items()
+            if tipo in tipos
+            for codigo in disciplinas
+            for turma in reservadas.get(codigo, []))
+    return conflitos
@@ -3,10 +3,15 @@
 #     @author: Guilherme N. Ramos (gnramos@unb.br)
 #
 # Funções para lidar com informações dos professores.
+#
+# Os relatórios podem ser dados pelo caminho do arquivo ou por uma
+# sessao.Sessao que os contenha (processando-os uma única vez).
 
 
+from coordenacao import sessao
+from sigra import lote
+from sigra import utils
 from sigra.acompanhamento import historico_escolar as ac_he
-from sigra.planejamento import oferta as pl_oferta
 
 
 def carga_horaria_ofertada(OFELST):
@@ -18,16 +23,14 @@ def carga_horaria_ofertada(OFELST):
               que deve ser o relatório exportado via:
               SIGRA > Planejamento > Oferta > OFELST
     '''
-    oferta = pl_oferta.listagem(OFELST)
+    oferta = sessao.extrai(OFELST, 'OFELST')
 
     carga = {}
-    for codigo, disciplina in oferta.items():
-        for turma, detalhes in disciplina.turmas.items():
-            if int(detalhes.vagas) > 0:
-                for professor in detalhes.professores:
-                    if professor not in carga:
-                        carga[professor] = 0
-                    carga[professor] += disciplina.creditos.total()
+    for professor, turmas in oferta.por_professor.items():
+        for codigo, turma in turmas:
+            if int(oferta.turma(codigo, turma).vagas) > 0:
+                carga[professor] = (carga.get(professor, 0) +
+                                    oferta[codigo].creditos.total())
 
     return carga
 
@@ -48,8 +51,8 @@ def estatistica_por_semestre(HEEME,
     ignore -- lista com código de disciplinas que devem ser ignoradas na
               contabilização (como '167681' -> Trabalho de Graduação 1).
     '''
-    estatisticas_de_mencoes = ac_he.estatisticas_de_mencoes(HEEME)
-    oferta = pl_oferta.listagem(OFELST)
+    estatisticas_de_mencoes = sessao.extrai(HEEME, 'HEEME')
+    oferta = sessao.extrai(OFELST, 'OFELST')
 
     estatisticas = {}
     for periodo in estatisticas_de_mencoes:
@@ -85,35 +88,220 @@ def estatistica_por_semestre(HEEME,
     return estatisticas
 
 
+def estatistica_por_semestres(HEEMEs,
+                              OFELSTs,
+                              ignore=[],
+                              processos=None):
+    '''Cruza as informações de vários pares (histórico de menções, lista de
+    oferta), como os de vários semestres, retornando um CuboDeProfessores
+    com as mesmas informações de estatistica_por_semestre (e a taxa de
+    aprovação) de cada professor(a) em cada período. Requer NumPy.
+
+    Argumentos:
+    HEEMEs -- lista de caminhos para os arquivos (UTF-16) contendo o
+              histórico de menções (processados em paralelo), que devem ser
+              o relatório exportado via:
+              SIGRA > Acompanhamento > Histórico Escolar > HEEME
+    OFELSTs -- lista de caminhos para os arquivos (UTF-16) contendo os dados
+               da oferta correspondente a cada HEEME (processados em
+               paralelo), que devem ser o relatório exportado via:
+               SIGRA > Planejamento > Oferta > OFELST
+    ignore -- lista com código de disciplinas que devem ser ignoradas na
+              contabilização (como '167681' -> Trabalho de Graduação 1).
+    processos -- número máximo de processos simultâneos.
+                 (default número de processadores)
+    '''
+    HEEMEs, OFELSTs = list(HEEMEs), list(OFELSTs)
+    if len(HEEMEs) != len(OFELSTs):
+        raise ValueError('Devem ser dados pares HEEME/OFELST ({} HEEME e {} '
+                         'OFELST).'.format(len(HEEMEs), len(OFELSTs)))
+
+    mencoes = lote.processa(HEEMEs, 'HEEME', processos).resultados
+    ofertas = lote.processa(OFELSTs, 'OFELST', processos).resultados
+
+    ignore = set(ignore)
+    registros = []
+    for HEEME, OFELST in zip(HEEMEs, OFELSTs):
+        registros.extend(_registros(mencoes[HEEME], ofertas[OFELST], ignore))
+    return CuboDeProfessores.de_registros(registros)
+
+
+def _registros(estatisticas_de_mencoes, oferta, ignore):
+    '''Gera (professor, período, créditos, alunos, aprovados, avaliados)
+    para cada professor(a) de cada turma de graduação com menções (veja
+    estatistica_por_semestre).'''
+    aprovacao = [ac_he.MENCOES.index(m) for m in ac_he.MENCOES_DE_APROVACAO]
+    for periodo, deptos in estatisticas_de_mencoes.items():
+        for disciplinas in deptos.values():
+            for codigo, info in disciplinas.items():
+                if (info['Nível'] != 'GR' or codigo in ignore or
+                        codigo not in oferta):
+                    continue
+
+                turmas = oferta[codigo].turmas
+                num_cred = oferta[codigo].creditos.total()
+                for turma, num_alunos in info['Turmas'].items():
+                    if not turma or num_alunos == 0 or turma not in turmas:
+                        continue
+
+                    mencoes = info['Menções'][turma]
+                    aprovados = sum(mencoes[i] for i in aprovacao)
+                    professores = turmas[turma].professores
+                    for p in professores:
+                        yield (p, periodo, num_cred / len(professores),
+                               num_alunos, aprovados, sum(mencoes))
+
+
+class CuboDeProfessores():
+    '''Estatísticas de cada professor(a) em cada período letivo, como
+    arrays densos (professores x períodos), para fatiar e agregar vários
+    semestres de uma vez (requer NumPy).
+
+    Atributos:
+    professores -- lista (ordenada) dos nomes dos professores (linhas).
+    periodos -- lista (em ordem cronológica) dos períodos (colunas).
+    medidas -- dicionário com o array de cada medida (veja MEDIDAS): total
+               de créditos, turmas e alunos e a quantidade de menções de
+               aprovação ('aprovados') e de menções em geral ('avaliados').
+    '''
+    MEDIDAS = ('creditos', 'turmas', 'alunos', 'aprovados', 'avaliados')
+
+    def __init__(self, professores, periodos, medidas):
+        self.professores = professores
+        self.periodos = periodos
+        self.medidas = medidas
+        self._linha = {p: i for i, p in enumerate(professores)}
+
+    @classmethod
+    def de_registros(cls, registros):
+        '''Cria o cubo a partir de (professor, período, créditos, alunos,
+        aprovados, avaliados) de cada professor(a) em cada turma.'''
+        import numpy as np
+
+        registros = list(registros)
+        professores = sorted({r[0] for r in registros})
+        periodos = sorted({r[1] for r in registros}, key=utils.ordinal)
+        linha = {p: i for i, p in enumerate(professores)}
+        coluna = {p: j for j, p in enumerate(periodos)}
+
+        forma = (len(professores), len(periodos))
+        celula = np.fromiter((linha[r[0]] * forma[1] + coluna[r[1]]
+                              for r in registros),
+                             dtype=np.int64, count=len(registros))
+        n = forma[0] * forma[1]
+
+        medidas = {'turmas': np.bincount(celula, minlength=n)}
+        for k, medida in enumerate(('creditos', 'alunos', 'aprovados',
+                                    'avaliados'), 2):
+            pesos = np.fromiter((r[k] for r in registros), dtype=np.float64,
+                                count=len(registros))
+            medidas[medida] = np.bincount(celula, weights=pesos, minlength=n)
+        for medida in ('alunos', 'aprovados', 'avaliados'):
+            medidas[medida] = np.rint(medidas[medida]).astype(np.int64)
+
+        return cls(professores, periodos,
+                   {medida: medidas[medida].reshape(forma)
+                    for medida in cls.MEDIDAS})
+
+    def aprovacao(self):
+        '''Retorna o array (professores x períodos) com a taxa de aprovação
+        (entre 0 e 1) das turmas de cada professor(a) em cada período (NaN
+        se não houver menções).'''
+        import numpy as np
+
+        avaliados = self.medidas['avaliados']
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(avaliados > 0,
+                            self.medidas['aprovados'] / avaliados, np.nan)
+
+    def fatia(self, professores=None, periodos=None):
+        '''Retorna o cubo restrito aos professores e/ou períodos dados.
+
+        Argumentos:
+        professores -- lista com os nomes dos professores.
+                       (default None, todos)
+        periodos -- filtro dos períodos: um utils.IntervaloDePeriodos ou uma
+                    expressão de comparação, como '2014/2 <= {} <= 2016/2'
+                    (veja utils.IntervaloDePeriodos.de_filtro).
+                    (default None, todos)
+        '''
+        import numpy as np
+
+        linhas = (np.arange(len(self.professores)) if professores is None
+                  else np.array([self._linha[p] for p in professores],
+                                dtype=np.int64))
+        colunas = np.arange(len(self.periodos))
+        if periodos is not None:
+            if isinstance(periodos, str):
+                periodos = utils.IntervaloDePeriodos.de_filtro(periodos)
+            ordinais = np.array([utils.ordinal(p) for p in self.periodos],
+                                dtype=np.int64)
+            colunas = np.flatnonzero(periodos.mascara(ordinais))
+
+        selecao = np.ix_(linhas, colunas)
+        return CuboDeProfessores([self.professores[i] for i in linhas],
+                                 [self.periodos[j] for j in colunas],
+                                 {medida: valores[selecao]
+                                  for medida, valores
+                                  in self.medidas.items()})
+
+    def totais(self):
+        '''Retorna um dicionário com o total de cada medida (e a taxa de
+        aprovação) de cada professor(a), considerando todos os períodos.'''
+        somas = {medida: valores.sum(axis=1)
+                 for medida, valores in self.medidas.items()}
+        return {professor: _estatistica(somas, i)
+                for i, professor in enumerate(self.professores)}
+
+    def como_dict(self):
+        '''Retorna as informações no formato de estatistica_por_semestre,
+        acrescidas da taxa de aprovação ('aprovacao').'''
+        estatisticas = {periodo: {} for periodo in self.periodos}
+        turmas = self.medidas['turmas']
+        for i, j in zip(*turmas.nonzero()):
+            estatistica = _estatistica(self.medidas, (i, j))
+            estatisticas[self.periodos[j]][self.professores[i]] = estatistica
+        return estatisticas
+
+    def __repr__(self):
+        return 'CuboDeProfessores({} professores x {} períodos)'.format(
+            len(self.professores), len(self.periodos))
+
+
+def _estatistica(medidas, indice):
+    avaliados = int(medidas['avaliados'][indice])
+    return {'creditos': float(medidas['creditos'][indice]),
+            'turmas': int(medidas['turmas'][indice]),
+            'alunos': int(medidas['alunos'][indice]),
+            'aprovacao': (int(medidas['aprovados'][indice]) / avaliados
+                          if avaliados else None)}
+
+
 def turmas_ofertadas(professores,
                      OFELST):
     ''' Dada uma lista de nomes de professores, retorna um dicionário
     contendo as turmas a serem ofertadas por cada professor(a).
 
     Argumentos:
-    professores -- lista de nomes [parciais] professores.
+    professores -- lista de nomes [parciais] professores. Cada nome pode ter
+                   palavras incompletas e não considera acentos (por
+                   exemplo, 'jose silv' corresponde a 'JOSÉ DA SILVA').
     OFELST -- caminho para o arquivo (UTF-16) contendo os dados da Oferta,
               que deve ser o relatório exportado via:
               SIGRA > Planejamento > Oferta > OFELST
     '''
-    oferta = pl_oferta.listagem(OFELST)
+    oferta = sessao.extrai(OFELST, 'OFELST')
+
+    if professores:
+        selecionados = [(p, nome) for p in professores
+                        for nome in oferta.professores(p)]
+    else:
+        selecionados = [(nome, nome) for nome in oferta.por_professor]
 
     oferta_docente = {}
-    for codigo, disciplina in oferta.items():
-        for turma, detalhes in disciplina.turmas.items():
-            if professores:
-                current_professores = [p for p in professores
-                                       if p.lower() in (prof.lower()
-                                                        for prof in
-                                                        detalhes.professores)]
-            else:
-                current_professores = detalhes.professores
-
-            for professor in current_professores:
-                if professor not in oferta_docente:
-                    oferta_docente[professor] = {}
-                if codigo not in oferta_docente[professor]:
-                    oferta_docente[professor][codigo] = {}
-                oferta_docente[professor][codigo][turma] = detalhes
+    for professor, nome in selecionados:
+        for codigo, turma in oferta.por_professor[nome]:
+            turmas = oferta_docente.setdefault(professor, {})
+            turmas.setdefault(codigo, {})[turma] = oferta.turma(codigo, turma)
 
     return oferta_docente
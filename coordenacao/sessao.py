@@ -0,0 +1,102 @@
+#  -*- coding: utf-8 -*-
+#    @package: sessao.py
+#     @author: Guilherme N. Ramos (gnramos@unb.br)
+#
+# Sessão de consultas que compartilham os mesmos relatórios, de forma que cada
+# um seja processado uma única vez.
+
+from sigra import lote
+
+
+class Sessao():
+    '''Conjunto de relatórios usados em várias consultas. Cada relatório é
+    processado apenas na primeira vez em que for usado, e o resultado é
+    compartilhado pelas demais consultas.
+
+    As funções de coordenacao aceitam uma Sessao no lugar do caminho de
+    qualquer relatório. Por exemplo:
+
+        sessao = Sessao(OFELST='OFELST.txt', FLULST='FLULST.txt')
+        terminal.grade(sessao, sessao)
+        professores.carga_horaria_ofertada(sessao)
+
+    Como os resultados são compartilhados, as consultas não devem alterá-los.
+    '''
+    def __init__(self, **arquivos):
+        '''Argumentos:
+        arquivos -- caminho para o arquivo (UTF-16) de cada tipo de
+                    relatório (veja lote.TIPOS), como OFELST='OFELST.txt'. No
+                    caso de CUREGEP, uma lista de caminhos.
+        '''
+        for tipo in arquivos:
+            if tipo not in lote.TIPOS:
+                raise ValueError('Tipo de relatório desconhecido: {} '
+                                 '(esperado um dentre {}).'.format(
+                                     tipo, ', '.join(sorted(lote.TIPOS))))
+        self.arquivos = arquivos
+        self._resultados = {}
+
+    @classmethod
+    def de_diretorio(cls, diretorio, processos=None, **arquivos):
+        '''Retorna uma Sessao com todos os relatórios de um diretório, cujos
+        tipos são identificados pelo cabeçalho e que são processados em
+        paralelo (veja lote.processa_diretorio). Deve haver apenas um
+        relatório de cada tipo, exceto de CUREGEP.
+
+        Argumentos:
+        diretorio -- caminho para o diretório com os arquivos (UTF-16).
+        processos -- número máximo de processos simultâneos.
+                     (default número de processadores)
+        arquivos -- caminho para o arquivo de tipos de relatório que não
+                    devem ser obtidos do diretório, como OFELST='OFELST.txt'
+                    (processados apenas no primeiro uso).
+        '''
+        lotes = lote.processa_diretorio(diretorio, processos)
+        resultados = {}
+        for tipo, processado in lotes.items():
+            if tipo in arquivos:
+                continue
+            if tipo in lote.RECEBEM_LISTA:
+                arquivos[tipo] = list(processado.resultados)
+                resultados[tipo] = processado.combinado()
+            elif len(processado.resultados) > 1:
+                raise ValueError('Mais de um relatório {} em {}: {}.'.format(
+                                 tipo, diretorio,
+                                 ', '.join(processado.resultados)))
+            else:
+                arquivo, resultado = next(iter(processado.resultados.items()))
+                arquivos[tipo] = arquivo
+                resultados[tipo] = resultado
+
+        sessao = cls(**arquivos)
+        sessao._resultados = resultados
+        return sessao
+
+    def extrai(self, tipo):
+        '''Retorna as informações do relatório do tipo dado, processando-o
+        apenas no primeiro acesso.'''
+        if tipo not in self._resultados:
+            if tipo not in self.arquivos:
+                raise KeyError('Sessão sem relatório {}.'.format(tipo))
+            extrai = lote.extrator(tipo)
+            self._resultados[tipo] = extrai(self.arquivos[tipo])
+        return self._resultados[tipo]
+
+    def __repr__(self):
+        return 'Sessao({})'.format(', '.join(
+            '{}={}{}'.format(tipo, arquivo,
+                             '' if tipo in self._resultados else ' (pendente)')
+            for tipo, arquivo in sorted(self.arquivos.items())))
+
+
+def extrai(origem, tipo):
+    '''Retorna as informações do relatório do tipo dado.
+
+    Argumentos:
+    origem -- caminho para o arquivo (UTF-16) contendo o relatório (uma lista
+              de caminhos, no caso de CUREGEP) ou uma Sessao que o contenha.
+    tipo -- tipo do relatório (veja lote.TIPOS), como 'OFELST'.
+    '''
+    if isinstance(origem, Sessao):
+        return origem.extrai(tipo)
+    return lote.extrator(tipo)(origem)
@@ -3,9 +3,12 @@
 #     @author: Guilherme N. Ramos (gnramos@unb.br)
 #
 # Funções para mostrar informações no terminal.
+#
+# Os relatórios podem ser dados pelo caminho do arquivo ou por uma
+# sessao.Sessao que os contenha (processando-os uma única vez).
 
 
-from sigra.planejamento import fluxo as pl_fluxo
+from coordenacao import sessao
 from sigra.planejamento import oferta as pl_oferta
 
 
@@ -18,7 +21,7 @@ def fluxo(FLULST):
               de uma habilitação, que deve ser o relatório exportado via:
               SIGRA > Planejamento > Fluxo > FLULST
     '''
-    fluxo = pl_fluxo.listagem(FLULST)
+    fluxo = sessao.extrai(FLULST, 'FLULST')
 
     print()
     for periodo in sorted(fluxo):
@@ -46,47 +49,48 @@ def grade(OFELST, FLULST, habilitacao='', filtro_tipo=[]):
                    'ML', etc.
                    (default [])
     '''
-    oferta = pl_oferta.listagem(OFELST)
-
-    fluxo = pl_fluxo.listagem(FLULST)
-    for tipo in filtro_tipo:
-        for disciplinas in fluxo.values():
-            if tipo in disciplinas:
-                del disciplinas[tipo]
+    try:
+        from terminaltables import AsciiTable
+    except ImportError:
+        AsciiTable = None
+
+    oferta = sessao.extrai(OFELST, 'OFELST')
+    fluxo = sessao.extrai(FLULST, 'FLULST')
+
+    # Turmas reservadas com aula em cada (dia, hora de início).
+    reservadas = oferta.reservadas(habilitacao)
+    celulas = {}
+    for (dia, horario), turmas in oferta.por_horario.items():
+        for turma in turmas:
+            if turma in reservadas:
+                celulas.setdefault((dia, horario[:2]), []).append(turma)
 
     for p in sorted(fluxo):
         print('\n\nPeríodo: ', p)
         print('===========')
 
+        ordem = {}
+        for tipo, disciplinas in fluxo[p].disciplinas.items():
+            if tipo not in filtro_tipo:
+                for codigo in disciplinas:
+                    ordem.setdefault(codigo, len(ordem))
+
         table_data = [[''] + pl_oferta.Aula.DIAS]
         for h in pl_oferta.Aula.HORARIOS:
             linha = [h]
 
             for dia in pl_oferta.Aula.DIAS:
-                aulas_do_dia = []
-                for disciplinas in fluxo[p].disciplinas.values():
-                    for codigo in disciplinas:
-                        if codigo not in oferta:
-                            continue
-                        turmas = oferta[codigo].turmas
-                        turmas = [t for t, detalhes in turmas.items()
-                                  for reserva in detalhes.reserva
-                                  if habilitacao in reserva.lower()]
-
-                        for t in sorted(turmas):
-                            turma = oferta[codigo].turmas[t]
-                            for aula in turma.aulas:
-                                if (dia == aula.dia and
-                                        h[:2] == aula.horario[:2]):
-                                    aulas_do_dia.append(codigo + ' ' + t)
-
-                linha.append(' '.join(a for a in aulas_do_dia))
+                aulas_do_dia = [(codigo, t) for codigo, t
+                                in celulas.get((dia, h[:2]), [])
+                                if codigo in ordem]
+                aulas_do_dia.sort(key=lambda a: (ordem[a[0]], a[1]))
+                linha.append(' '.join(codigo + ' ' + t
+                                      for codigo, t in aulas_do_dia))
             table_data.append(linha)
 
-        try:
-            from terminaltables import AsciiTable
+        if AsciiTable:
             print(AsciiTable(table_data).table)
-        except Exception:
+        else:
             for row in table_data:
                 print(''.join('{0: <22}'.format(cell) for cell in row))
 
@@ -112,22 +116,22 @@ def oferta_obrigatorias(OFELST,
                      disciplina ou não
                      (default False)
     '''
-    oferta = pl_oferta.listagem(OFELST)
-    fluxo = pl_fluxo.listagem(FLULST)
+    oferta = sessao.extrai(OFELST, 'OFELST')
+    fluxo = sessao.extrai(FLULST, 'FLULST')
 
-    for periodo in fluxo.values():
-        if 'OPT' in periodo.disciplinas:
-            del periodo.disciplinas['OPT']
+    reservadas = {}
+    for codigo, t in oferta.reservadas(habilitacao):
+        reservadas.setdefault(codigo, []).append(t)
 
     for p in sorted(fluxo):
         print('\n\nPeríodo: ', p)
         print('===========')
 
-        for disciplinas in fluxo[p].disciplinas.values():
+        for tipo, disciplinas in fluxo[p].disciplinas.items():
+            if tipo == 'OPT':
+                continue
             for codigo in sorted(disciplinas):
-                turmas = sorted(t for t in oferta[codigo].turmas
-                                for r in oferta[codigo].turmas[t].reserva
-                                if habilitacao in r.lower())
+                turmas = sorted(reservadas.get(codigo, []))
 
                 print('\n', codigo, oferta[codigo].nome)
 
@@ -5,5 +5,15 @@
 #
 
 
+def __getattr__(nome):
+    # Importação sob demanda, para não carregar o processamento em lote (e o
+    # que ele importa) quando apenas um dos submódulos for usado.
+    if nome == 'processa_lote':
+        from sigra import lote
+        return lote.processa
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__,
+                                                                    nome))
+
+
 if __name__ == '__main__':
     pass
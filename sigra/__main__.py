@@ -0,0 +1,161 @@
+#  -*- coding: utf-8 -*-
+#    @package: __main__.py
+#     @author: Guilherme N. Ramos (gnramos@unb.br)
+#
+# Interface de linha de comando para as consultas de coordenacao, como em:
+#
+#     python -m sigra grade -d relatorios/ --habilitacao computação
+#     python -m sigra carga --OFELST relatorios/OFELST.txt
+#
+# Os relatórios podem ser dados individualmente ou por um diretório, cujos
+# relatórios são identificados pelo cabeçalho e processados em paralelo. Os
+# módulos são importados apenas quando o comando é executado, de forma que a
+# ajuda (--help) é exibida sem carregar o restante do pacote.
+
+import argparse
+import importlib
+
+
+# Comando: (função (módulo:função), relatórios usados, descrição, opções).
+# Os relatórios são passados para a função pelos parâmetros de mesmo nome, e
+# cada opção é dada por (nome, argumentos de add_argument).
+COMANDOS = {
+    'fluxo': ('coordenacao.terminal:fluxo', ['FLULST'],
+              'Imprime o fluxo de uma habilitação.',
+              []),
+    'grade': ('coordenacao.terminal:grade', ['OFELST', 'FLULST'],
+              'Imprime a grade horária de cada período do fluxo.',
+              [('--habilitacao', dict(default='',
+                                      help='parte do nome da habilitação '
+                                           'das turmas reservadas')),
+               ('--filtro-tipo', dict(nargs='+', default=[],
+                                      help='tipos de disciplinas a remover '
+                                           '(como OPT)'))]),
+    'obrigatorias': ('coordenacao.terminal:oferta_obrigatorias',
+                     ['OFELST', 'FLULST'],
+                     'Imprime a oferta das disciplinas obrigatórias.',
+                     [('--habilitacao', dict(default='',
+                                             help='parte do nome da '
+                                                  'habilitação das turmas '
+                                                  'reservadas')),
+                      ('--mostra-opcoes', dict(action='store_true',
+                                               help='mostra as demais '
+                                                    'turmas'))]),
+    'conflitos': ('coordenacao.oferta:conflitos_de_horario',
+                  ['OFELST', 'FLULST'],
+                  'Lista as turmas reservadas com choque de horário em cada '
+                  'período do fluxo.',
+                  [('--habilitacao', dict(default='',
+                                          help='parte do nome da '
+                                               'habilitação das turmas '
+                                               'reservadas')),
+                   ('--tipos', dict(nargs='+', default=['OBR'],
+                                    help='tipos de disciplinas '
+                                         'consideradas'))]),
+    'carga': ('coordenacao.professores:carga_horaria_ofertada', ['OFELST'],
+              'Mostra a carga horária ofertada de cada professor(a).',
+              []),
+    'turmas': ('coordenacao.professores:turmas_ofertadas', ['OFELST'],
+               'Mostra as turmas ofertadas de cada professor(a).',
+               [('professores', dict(nargs='*',
+                                     help='nomes (parciais) dos '
+                                          'professores (default todos)'))]),
+    'mencoes': ('coordenacao.professores:estatistica_por_semestre',
+                ['HEEME', 'OFELST'],
+                'Mostra créditos, turmas e alunos de cada professor(a) por '
+                'semestre.',
+                [('--ignore', dict(nargs='+', default=[],
+                                   help='códigos de disciplinas '
+                                        'ignoradas'))]),
+    'matriculados': ('coordenacao.alunos:matriculados_por_semestre',
+                     ['ALUREL', 'HEDIS'],
+                     'Mostra quantos alunos se matricularam na disciplina '
+                     'em cada semestre.',
+                     [('--habilitacoes', dict(nargs='+', default=[],
+                                              help='códigos das '
+                                                   'habilitações (default '
+                                                   'todas)'))]),
+    'aprovacao': ('coordenacao.alunos:aprovacao_por_turma',
+                  ['ALUREL', 'HEDIS'],
+                  'Mostra a taxa de aprovação de cada turma da disciplina.',
+                  [('--habilitacoes', dict(nargs='+', default=[],
+                                           help='códigos das habilitações '
+                                                '(default todas)'))]),
+    'contatos': ('coordenacao.alunos:contatos', ['ALUTEL'],
+                 'Lista os contatos dos alunos.',
+                 [('--formato', dict(default='{nome} <{email}>',
+                                     help='formatação de cada contato '
+                                          '(campos nome, email e '
+                                          'telefone)'))])}
+
+
+def _parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m sigra',
+        description='Consultas sobre relatórios do Sistema de Graduação da '
+                    'UnB (SIGRA).')
+    comandos = parser.add_subparsers(dest='comando', metavar='comando')
+    comandos.required = True
+
+    for comando, (_, tipos, descricao, opcoes) in COMANDOS.items():
+        subparser = comandos.add_parser(comando, help=descricao,
+                                        description=descricao)
+        subparser.add_argument('-d', '--diretorio',
+                               help='diretório com os relatórios (cujos '
+                                    'tipos são identificados pelo '
+                                    'cabeçalho)')
+        subparser.add_argument('--processos', type=int,
+                               help='número máximo de processos ao processar '
+                                    'o diretório (default número de '
+                                    'processadores)')
+        for tipo in tipos:
+            subparser.add_argument('--' + tipo, metavar='ARQUIVO',
+                                   help='relatório {} (prevalece sobre o '
+                                        'do diretório)'.format(tipo))
+        for nome, argumentos in opcoes:
+            subparser.add_argument(nome, **argumentos)
+    return parser
+
+
+def _imprime(resultado):
+    if resultado is None:
+        return
+    if isinstance(resultado, list):
+        print('\n'.join(str(item) for item in resultado))
+    else:
+        import pprint
+        pprint.pprint(dict(resultado))  # Inclusive defaultdict.
+
+
+def main(argumentos=None):
+    parser = _parser()
+    args = vars(parser.parse_args(argumentos))
+
+    funcao, tipos, _, _ = COMANDOS[args.pop('comando')]
+    diretorio = args.pop('diretorio')
+    processos = args.pop('processos')
+    arquivos = {tipo: args.pop(tipo) for tipo in tipos}
+    arquivos = {tipo: arquivo for tipo, arquivo in arquivos.items()
+                if arquivo}
+
+    from coordenacao.sessao import Sessao
+    try:
+        if diretorio:
+            sessao = Sessao.de_diretorio(diretorio, processos, **arquivos)
+        else:
+            sessao = Sessao(**arquivos)
+    except (OSError, ValueError) as erro:
+        parser.error(str(erro))
+
+    for tipo in tipos:
+        if tipo not in sessao.arquivos:
+            parser.error('relatório {} não encontrado (use --{} ou '
+                         '--diretorio).'.format(tipo, tipo))
+
+    modulo, nome = funcao.split(':')
+    funcao = getattr(importlib.import_module(modulo), nome)
+    _imprime(funcao(**dict(args, **{tipo: sessao for tipo in tipos})))
+
+
+if __name__ == '__main__':
+    main()
@@ -7,9 +7,94 @@
 
 import re
 
+from sigra import cache
+from sigra import metricas
 from sigra import utils
 
 
+class Contato(utils.Registro):
+    '''Informações de contato de um aluno (ALUTEL).'''
+    __slots__ = ('nome', 'email', 'telefone')
+    CHAVES = {'nome': 'nome', 'e-mail': 'email', 'telefone': 'telefone'}
+
+    def __init__(self, nome, email, telefone):
+        self.nome = nome
+        self.email = email
+        self.telefone = telefone
+
+    def __repr__(self):
+        return '{} <{}> {}'.format(self.nome, self.email, self.telefone)
+
+
+class Inscricao(utils.Registro):
+    '''Inscrição de um aluno em uma opção de curso (ALUREL).'''
+    __slots__ = ('nome', 'forma_ingresso')
+    CHAVES = {'Nome': 'nome', 'Forma Ingresso': 'forma_ingresso'}
+
+    def __init__(self, nome, forma_ingresso):
+        self.nome = nome
+        self.forma_ingresso = forma_ingresso
+
+    def __repr__(self):
+        return '{} ({})'.format(self.nome, self.forma_ingresso)
+
+
+# ALUTEL: a linha com matrícula, nome e telefone é seguida pela do e-mail.
+CONTATO = re.compile(r'(\d\d/\d{5,}) +(\w.*)$')
+EMAIL = re.compile(r' +(\w.*@.*)$')
+TELEFONE = re.compile(r'(\(\d+\) *)?\d[\d -]*\d$')
+
+# ALUREL
+ALUNO = re.compile(r'(\d\d/\d{3,}) +(.*?) {2,}(\d+/\d+) {2,}(\w+) +(\d+) +'
+                   r'(.*)$')
+
+
+def _contato(match):
+    '''Retorna (matrícula, nome, telefone) de uma linha reconhecida por
+    CONTATO. O telefone é o que segue o último intervalo de três espaços,
+    desde que tenha o formato de um (veja TELEFONE).'''
+    matricula, nome_e_tel = match.groups()
+    nome, _, telefone = nome_e_tel.strip().rpartition('   ')
+    telefone = telefone.strip()
+    if nome and TELEFONE.match(telefone):
+        return matricula, nome.strip(), telefone
+    return matricula, nome_e_tel.strip(), ''
+
+
+def _colunas_de_contato(match):
+    '''Retorna a disposição das colunas (matrícula, nome e telefone) do
+    relatório ALUTEL, que não tem régua, a partir de uma linha com telefone
+    reconhecida por CONTATO.'''
+    nome_e_tel = match.group(2).rstrip()
+    telefone = nome_e_tel.rsplit('   ', 1)[-1].lstrip()
+    telefone = match.start(2) + len(nome_e_tel) - len(telefone)
+    return utils.Colunas([match.span(1), (match.start(2), telefone - 3),
+                          (telefone, None)])
+
+
+def _aluno(line, colunas):
+    '''Retorna (matrícula, nome, período de ingresso, forma de ingresso,
+    código e nome da opção) de uma linha do relatório ALUREL, ou None se ela
+    não for um registro. A linha é fatiada pelas colunas (matrícula, nome,
+    ingresso e o restante), e a expressão regular ALUNO é usada apenas se o
+    fatiamento não for possível.'''
+    campos = colunas.fatia(line) if colunas else None
+    if campos and campos[0][2:3] == '/' and campos[2][4:5] == '/':
+        matricula, nome, periodo_ingresso, opcao = campos
+        opcao = opcao.split(None, 2)
+        if len(opcao) == 3 and opcao[1].isdigit():
+            return (matricula.rstrip(), nome.rstrip(),
+                    periodo_ingresso.rstrip(), opcao[0], opcao[1],
+                    opcao[2].rstrip())
+
+    match = ALUNO.search(line)
+    if not match:
+        return None
+    return match.groups()[:-1] + (match.group(6).rstrip(),)
+
+
+@metricas.mede
+@cache.armazena(versao=5)
 def contatos(arquivo):
     '''Extrai o nome completo, telefone de contato e o e-mail registrados
     para cada aluno(a) listado(a) no arquivo de entrada.
@@ -19,27 +104,36 @@ def contatos(arquivo):
                o relatório exportado via:
                SIGRA > Acompanhamento > Alunos > ALUTEL
     '''
-    def parse_info(match_obj):
-        matricula, nome_e_tel, email = match_obj
-        if '   ' in nome_e_tel:
-            infos = nome_e_tel.split('   ')
-            nome, telefone = infos[0].strip(), infos[-1].strip()
-        else:
-            nome, telefone = nome_e_tel, ''
-        return (matricula, {'nome': nome,
-                            'e-mail': email,
-                            'telefone': telefone})
-
-    content = utils.load(arquivo)
-
-    REGEX = r'(\d\d/\d{5,}) +(\w.*)\n +(\w.*@.*)'
-    contatos = dict(parse_info(match_obj)
-                    for match_obj in re.findall(REGEX, content))
-
-    print('{} contatos.'.format(len(contatos)))
+    contatos = {}
+    colunas = None
+    anterior = None
+    for line in utils.linhas(arquivo):
+        if anterior:
+            email = EMAIL.match(line)
+            if email:
+                matricula, nome, telefone = anterior
+                contatos[matricula] = Contato(nome, email.group(1), telefone)
+                anterior = None
+                continue
+
+        campos = colunas.fatia(line) if colunas else None
+        if campos and campos[0][2:3] == '/':
+            matricula, nome, telefone = campos
+            anterior = matricula.rstrip(), nome.rstrip(), telefone.strip()
+            continue
+
+        match = CONTATO.search(line)
+        anterior = _contato(match) if match else None
+        if colunas is None and anterior and anterior[2]:
+            colunas = _colunas_de_contato(match)
+
+    metricas.registros(len(contatos))
+    metricas.LOGGER.info('%s contatos.', len(contatos))
     return contatos
 
 
+@metricas.mede
+@cache.armazena(versao=4)
 def relacao(arquivo):
     '''Retorna um dicionário com as informações de cada aluno listado no
     arquivo com a relação de alunos.
@@ -49,25 +143,33 @@ def relacao(arquivo):
                o relatório exportado via:
                SIGRA > Acompanhamento > Alunos > ALUREL
     '''
-    content = utils.load(arquivo)
-
     relacao = {}
 
     num_registros = 0
-    REGEX = r'(\d\d/\d{3,}) +(.*?) {2,}(\d+/\d+) {2,}(\w+) +(\d+) +(.*)[\s\S]'
-    for (matricula,
+    colunas = None
+    for line in utils.linhas(arquivo):
+        if colunas is None and utils.REGUA.match(line):
+            colunas = utils.Colunas.de_regua(line, 4)
+            continue
+
+        aluno = _aluno(line, colunas)
+        if not aluno:
+            continue
+
+        (matricula,
          nome,
          periodo_ingresso,
          forma_ingresso,
          codigo,
-         nome_opcao) in re.findall(REGEX, content):
+         nome_opcao) = aluno
         if codigo not in relacao:
             relacao[codigo] = {'Nome da Opção': nome_opcao, 'Alunos': {}}
         if periodo_ingresso not in relacao[codigo]['Alunos']:
             relacao[codigo]['Alunos'][periodo_ingresso] = {}
-        aluno = {'Nome': nome, 'Forma Ingresso': forma_ingresso}
+        aluno = Inscricao(nome, forma_ingresso)
         relacao[codigo]['Alunos'][periodo_ingresso][matricula] = aluno
         num_registros += 1
 
-    print('{} alunos relacionados.'.format(num_registros))
+    metricas.registros(num_registros)
+    metricas.LOGGER.info('%s alunos relacionados.', num_registros)
     return relacao
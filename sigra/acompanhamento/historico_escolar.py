@@ -5,11 +5,44 @@
 # Funções de extração de informações de relatórios de Acompanhamento do Sistema
 # de Graduação da UnB (SIGRA).
 
+import array
 import re
 
+from sigra import cache
+from sigra import metricas
 from sigra import utils
 
 
+class Matricula(utils.Registro):
+    '''Matrícula de um aluno em uma turma (HEDIS).'''
+    __slots__ = ('nome', 'mencao')
+    CHAVES = {'Nome': 'nome', 'Menção': 'mencao'}
+
+    def __init__(self, nome, mencao):
+        self.nome = nome
+        self.mencao = mencao
+
+    def __repr__(self):
+        return '{} ({})'.format(self.nome, self.mencao)
+
+
+REGISTRO_HEDIS = re.compile(r'(\d\d/\d{3,}) +(\d{4}/\d+) +(\w+) +(\w\w) {2,}'
+                            r'(.*)$')
+DISCIPLINA_HEDIS = re.compile(r'Disciplina: +(\d{6})')
+
+
+def _registro_hedis(line):
+    '''Retorna (matrícula, período, turma, menção, nome) de uma linha do
+    relatório HEDIS que não pôde ser fatiada pelas colunas, ou None se ela
+    não for um registro.'''
+    match = REGISTRO_HEDIS.search(line)
+    if not match:
+        return None
+    return match.groups()[:-1] + (match.group(5).rstrip(),)
+
+
+@metricas.mede
+@cache.armazena(versao=4)
 def alunos_que_cursaram_disciplina(arquivo):
     '''Extrai as informações dos alunos que cursaram determinada disciplina.
 
@@ -18,102 +51,312 @@ def alunos_que_cursaram_disciplina(arquivo):
                o relatório exportado via:
                SIGRA > Acompanhamento > Histórico Escolar > HEDIS
     '''
-    content = utils.load(arquivo)
-
     num_registros = 0
-    REGEX = r'(\d\d/\d{3,}) +(\d{4}/\d+) +(\w+) +(\w\w) {2,}(.*)[\s\S]'
     relacao = {}
-    for matricula, periodo, turma, mencao, nome in re.findall(REGEX, content):
-        if periodo not in relacao:
-            relacao[periodo] = {}
-        if turma not in relacao[periodo]:
-            relacao[periodo][turma] = {}
-        relacao[periodo][turma][matricula] = {'Nome': nome, 'Menção': mencao}
+    colunas = None
+    for line in utils.linhas(arquivo):
+        if colunas is None and utils.REGUA.match(line):
+            # As colunas permitem extrair registros sem menção (alunos ainda
+            # matriculados), que a expressão regular descarta.
+            colunas = utils.Colunas.de_regua(line, 5)
+            if len(colunas.colunas) != 5:
+                colunas = False
+            continue
+
+        campos = colunas.fatia(line) if colunas else None
+        if campos and campos[0][2:3] == '/' and campos[1][4:5] == '/':
+            matricula, periodo, turma, mencao, nome = campos
+            matricula, periodo, turma = (matricula.rstrip(), periodo.rstrip(),
+                                         turma.rstrip())
+            mencao, nome = mencao.rstrip(), nome.rstrip()
+        else:
+            registro = _registro_hedis(line)
+            if not registro:
+                continue
+            matricula, periodo, turma, mencao, nome = registro
+
+        turmas = relacao.get(periodo)
+        if turmas is None:
+            turmas = relacao[periodo] = {}
+        matriculados = turmas.get(turma)
+        if matriculados is None:
+            matriculados = turmas[turma] = {}
+        matriculados[matricula] = Matricula(nome, mencao)
         num_registros += 1
 
-    print('Disciplina cursada por {} alunos.'.format(num_registros))
+    metricas.registros(num_registros)
+    metricas.LOGGER.info('Disciplina cursada por %s alunos.', num_registros)
     return relacao
 
 
-def estatisticas_de_mencoes(arquivo):
-    '''Extrai as informações do histórico de menções de disciplinas.
+MENCOES_DE_APROVACAO = ('SS', 'MS', 'MM')
+MENCOES_DE_REPROVACAO = ('MI', 'II', 'SR')
+MENCOES_DE_TRANCAMENTO = ('TR', 'TJ')
+
+
+class TabelaDeMatriculas():
+    '''Representação colunar das matrículas de um relatório HEDIS, para
+    análises vetorizadas (requer NumPy).
+
+    Cada coluna (matricula, periodo, turma e mencao) é um array de inteiros
+    com uma entrada por matrícula em turma, cujo valor é o índice do valor
+    original na lista correspondente em valores. As listas são ordenadas, de
+    forma que a ordem dos códigos de período é a cronológica.
+    '''
+    COLUNAS = ('matricula', 'periodo', 'turma', 'mencao')
+
+    def __init__(self, valores, colunas):
+        '''Argumentos:
+        valores -- dicionário com a lista (ordenada) de valores de cada
+                   coluna.
+        colunas -- dicionário com o array de códigos de cada coluna.
+        '''
+        self.valores = valores
+        self.colunas = colunas
+        self._ordenados = {}
+
+    @classmethod
+    def de_relacao(cls, relacao):
+        '''Cria a tabela a partir do resultado da função
+        alunos_que_cursaram_disciplina.'''
+        import numpy as np
+
+        registros = [(matricula, periodo, turma, info['Menção'])
+                     for periodo, turmas in relacao.items()
+                     for turma, matriculados in turmas.items()
+                     for matricula, info in matriculados.items()]
+
+        valores, colunas = {}, {}
+        for coluna, dados in zip(cls.COLUNAS, zip(*registros) if registros
+                                 else [()] * len(cls.COLUNAS)):
+            valores[coluna] = sorted(set(dados))
+            codigo = {valor: i for i, valor in enumerate(valores[coluna])}
+            colunas[coluna] = np.fromiter((codigo[valor] for valor in dados),
+                                          dtype=np.int32, count=len(dados))
+        return cls(valores, colunas)
+
+    def __len__(self):
+        return len(self.colunas['matricula'])
+
+    def codigos(self, coluna, valores):
+        '''Retorna um array com os códigos dos valores dados (presentes na
+        tabela) da coluna.'''
+        import numpy as np
+
+        # Como os valores da tabela são ordenados, basta uma busca binária.
+        if coluna not in self._ordenados:
+            self._ordenados[coluna] = np.array(self.valores[coluna])
+        existentes = self._ordenados[coluna]
+        # Sem o dtype da tabela, já que os valores mais longos que os da
+        # tabela seriam truncados (e confundidos com os existentes).
+        valores = np.array(list(valores), dtype=str)
+        if not len(existentes) or not len(valores):
+            return np.array([], dtype=np.int32)
+
+        codigos = np.searchsorted(existentes, valores)
+        codigos[codigos == len(existentes)] = 0
+        return codigos[existentes[codigos] == valores].astype(np.int32)
+
+    def filtra(self, matriculas):
+        '''Retorna uma tabela apenas com as linhas referentes às matrículas
+        (de alunos) dadas.'''
+        import numpy as np
+
+        selecionadas = np.isin(self.colunas['matricula'],
+                               self.codigos('matricula', matriculas))
+        colunas = {coluna: codigos[selecionadas]
+                   for coluna, codigos in self.colunas.items()}
+        tabela = TabelaDeMatriculas(self.valores, colunas)
+        tabela._ordenados = self._ordenados
+        return tabela
+
+    def matriculados_por_periodo(self):
+        '''Retorna um dicionário com o número de alunos matriculados em cada
+        período (apenas os com pelo menos um aluno).'''
+        import numpy as np
+
+        periodos = self.valores['periodo']
+        contagem = np.bincount(self.colunas['periodo'],
+                               minlength=len(periodos))
+        return {periodos[i]: int(contagem[i])
+                for i in np.flatnonzero(contagem)}
+
+    def aprovacao_por_turma(self, mencoes_de_aprovacao=MENCOES_DE_APROVACAO):
+        '''Retorna um dicionário com a taxa de aprovação (entre 0 e 1) de
+        cada turma, indexado por (período, turma).
+
+        Argumentos:
+        mencoes_de_aprovacao -- menções consideradas como aprovação.
+                                (default MENCOES_DE_APROVACAO)
+        '''
+        import numpy as np
+
+        periodos, turmas = self.valores['periodo'], self.valores['turma']
+        grupo = (self.colunas['periodo'].astype(np.int64) * len(turmas) +
+                 self.colunas['turma'])
+        aprovados = np.isin(self.colunas['mencao'],
+                            self.codigos('mencao', mencoes_de_aprovacao))
+
+        num_grupos = len(periodos) * len(turmas)
+        total = np.bincount(grupo, minlength=num_grupos)
+        aprovacoes = np.bincount(grupo, weights=aprovados,
+                                 minlength=num_grupos)
+
+        return {(periodos[g // len(turmas)], turmas[g % len(turmas)]):
+                float(aprovacoes[g] / total[g])
+                for g in np.flatnonzero(total)}
+
+
+def disciplina_cursada(arquivo):
+    '''Retorna o código da disciplina de um relatório HEDIS (indicado em
+    seu cabeçalho), ou None se não for encontrado.
 
     Argumentos:
     arquivo -- caminho para o arquivo (UTF-16) contendo os dados, que deve ser
                o relatório exportado via:
-               SIGRA > Acompanhamento > Histórico Escolar > HEEME
+               SIGRA > Acompanhamento > Histórico Escolar > HEDIS
     '''
-    def preprocess(content):
-        HEADER = r'Universidade de Brasília.*[\s\S]*?' \
-                 'Histórico Escolar: Estatística de Menções?'
-        FOOTER = r'  --+[\s\S].*lstheeme'
+    for line in utils.linhas(arquivo):
+        match = DISCIPLINA_HEDIS.search(line)
+        if match:
+            return match.group(1)
+        if REGISTRO_HEDIS.search(line):
+            break
+    return None
 
-        content = re.sub(HEADER, '', content)
-        content = re.sub(FOOTER, '', content)
 
-        return [line for line in content.split('\n') if line.strip()]
+def aprovados(relacao):
+    '''Retorna o conjunto das matrículas (de alunos) aprovadas em algum
+    período, dado o resultado da função alunos_que_cursaram_disciplina.'''
+    return {matricula
+            for turmas in relacao.values()
+            for matriculados in turmas.values()
+            for matricula, info in matriculados.items()
+            if info['Menção'] in MENCOES_DE_APROVACAO}
 
-    def eh_disciplina(line):
-        return re.search(r'^ +Período:$', line)
 
-    def eh_total(line):
-        return re.search(r'^ +TOTAL DE MENÇÕES +(\d+)$', line)
+def tabela_de_matriculas(arquivo):
+    '''Retorna a TabelaDeMatriculas (requer NumPy) com as informações dos
+    alunos que cursaram determinada disciplina.
 
-    def parse_codigo(line):
-        return re.search(r'^ +(\d{6})$', line).group(1)
+    Argumentos:
+    arquivo -- caminho para o arquivo (UTF-16) contendo os dados, que deve ser
+               o relatório exportado via:
+               SIGRA > Acompanhamento > Histórico Escolar > HEDIS
+    '''
+    relacao = alunos_que_cursaram_disciplina(arquivo)
+    return TabelaDeMatriculas.de_relacao(relacao)
 
-    def parse_departamento(line):
-        return re.search(r'^ +Disciplina: +(\w+)$', line).group(1)
 
-    def parse_nivel(line):
-        return re.search(r'^ +(\w+) -$', line).group(1)
+# Menções contabilizadas (na ordem dos histogramas) em HEEME.
+MENCOES = ('SS', 'MS', 'MM', 'MI', 'II', 'SR', 'TR', 'TJ', 'CC')
+_INDICE_DAS_MENCOES = {mencao: i for i, mencao in enumerate(MENCOES)}
 
-    def parse_nome(line):
-        return re.search(r'^ +(\w.*)$', line).group(1)
+MENCAO_HEEME = re.compile(r'(\w\w) +(\d+)$')
+PAGINACAO_HEEME = utils.Paginacao(
+    'Histórico Escolar: Estatística de Mençõe', '  --', 'lstheeme', alcance=1)
 
-    def parse_periodo(line):
-        return re.search(r'^ +(\d{4}/\d)$', line).group(1)
 
-    def parse_total_de_mencoes(line):
-        return int(eh_total(line).group(1))
+@metricas.mede
+@cache.armazena(versao=4)
+def estatisticas_de_mencoes(arquivo):
+    '''Extrai as informações do histórico de menções de disciplinas,
+    retornando um dicionário período: departamento: código: informações da
+    disciplina, que são o nível ('Nível'), o total de menções de cada turma
+    ('Turmas') e a quantidade de cada menção por turma ('Menções'), como um
+    array de inteiros na ordem de MENCOES (outras menções são contabilizadas
+    apenas no total).
 
-    def parse_turma(line):
-        return line.split('Turma:')[-1].strip()
+    O relatório é processado em uma única passagem, como uma máquina de
+    estados: cada rótulo do cabeçalho de uma turma ('Período:', 'Código:' e
+    'Nível:') indica o campo dado pela linha seguinte, e o total de menções
+    encerra a turma.
 
-    content = preprocess(utils.load(arquivo))
+    Argumentos:
+    arquivo -- caminho para o arquivo (UTF-16) contendo os dados, que deve ser
+               o relatório exportado via:
+               SIGRA > Acompanhamento > Histórico Escolar > HEEME
+    '''
+    ROTULOS = {'Período:': 'periodo', 'Código:': 'codigo', 'Nível:': 'nivel'}
+    INDICE = _INDICE_DAS_MENCOES
+    vazio = array.array('i', bytes(4 * len(MENCOES)))
 
     relacao = {}
     num_disciplinas, num_turmas = 0, 0
-    i = 1
-    num_lines = len(content)
-    while i < num_lines:
-        if eh_disciplina(content[i]):
-            periodo = parse_periodo(content[i + 1])
-            depto = parse_departamento(content[i + 2])
-            codigo = parse_codigo(content[i + 4])
-            nivel = parse_nivel(content[i + 6])
-            # nome = parse_nome(content[i + 7])
-            turma = parse_turma(content[i + 8])
-
-            i += 9
-            while i < num_lines and not eh_total(content[i]):
-                i += 1
-
-            if i < num_lines:
-                mencoes = parse_total_de_mencoes(content[i])
-
-                if periodo not in relacao:
-                    relacao[periodo] = {depto: {}}
-                if codigo not in relacao[periodo][depto]:
-                    num_disciplinas += 1
-                    relacao[periodo][depto][codigo] = {'Nível': nivel,
-                                                       'Turmas': {}}
-
-                num_turmas += 1
-                relacao[periodo][depto][codigo]['Turmas'][turma] = mencoes
-
-        i += 1
-
-    print('Estatística de menções para '
-          '{} disciplinas ({} turmas).'.format(num_disciplinas, num_turmas))
+    campo = None  # Campo dado pela linha atual.
+    periodo = depto = codigo = nivel = turma = None
+    mencoes = None  # Histograma da turma atual.
+    for linha in PAGINACAO_HEEME.remove(utils.linhas(arquivo)):
+        linha = linha.strip()
+        if campo:
+            if campo == 'periodo':
+                periodo = linha
+            elif campo == 'codigo':
+                codigo = linha
+            elif campo == 'nivel':
+                nivel = linha.split()[0]
+            campo = None
+        elif linha in ROTULOS:
+            campo = ROTULOS[linha]
+        elif linha.startswith('Disciplina:'):
+            depto = linha[len('Disciplina:'):].strip()
+        elif linha.startswith('Turma:'):
+            turma = linha[len('Turma:'):].strip()
+            mencoes = array.array('i', vazio)
+        elif mencoes is None:
+            continue  # Nome da disciplina ou linha fora de uma turma.
+        elif linha.startswith('TOTAL DE MENÇÕES'):
+            disciplinas = relacao.setdefault(periodo, {}).setdefault(depto,
+                                                                     {})
+            if codigo not in disciplinas:
+                num_disciplinas += 1
+                disciplinas[codigo] = {'Nível': nivel,
+                                       'Turmas': {},
+                                       'Menções': {}}
+
+            num_turmas += 1
+            disciplinas[codigo]['Turmas'][turma] = int(linha.split()[-1])
+            disciplinas[codigo]['Menções'][turma] = mencoes
+            mencoes = None
+        else:
+            match = MENCAO_HEEME.match(linha)
+            if match and match.group(1) in INDICE:
+                mencoes[INDICE[match.group(1)]] = int(match.group(2))
+
+    metricas.registros(num_turmas)
+    metricas.LOGGER.info('Estatística de menções para %s disciplinas (%s '
+                         'turmas).', num_disciplinas, num_turmas)
     return relacao
+
+
+def taxas_de_aprovacao(relacao,
+                       mencoes_de_aprovacao=MENCOES_DE_APROVACAO,
+                       mencoes_de_reprovacao=MENCOES_DE_REPROVACAO):
+    '''Retorna um dicionário período: código: (taxa de aprovação, taxa de
+    reprovação) de cada disciplina (considerando todas as suas turmas), dado
+    o resultado da função estatisticas_de_mencoes. As taxas são relativas ao
+    total de menções contabilizadas (veja MENCOES).
+
+    Argumentos:
+    relacao -- resultado da função estatisticas_de_mencoes.
+    mencoes_de_aprovacao -- menções consideradas como aprovação.
+                            (default MENCOES_DE_APROVACAO)
+    mencoes_de_reprovacao -- menções consideradas como reprovação.
+                             (default MENCOES_DE_REPROVACAO)
+    '''
+    aprovacao = [_INDICE_DAS_MENCOES[m] for m in mencoes_de_aprovacao]
+    reprovacao = [_INDICE_DAS_MENCOES[m] for m in mencoes_de_reprovacao]
+
+    taxas = {}
+    for periodo, deptos in relacao.items():
+        for disciplinas in deptos.values():
+            for codigo, info in disciplinas.items():
+                total = aprovados = reprovados = 0
+                for mencoes in info['Menções'].values():
+                    total += sum(mencoes)
+                    aprovados += sum(mencoes[i] for i in aprovacao)
+                    reprovados += sum(mencoes[i] for i in reprovacao)
+                if total:
+                    taxas.setdefault(periodo, {})[codigo] = (
+                        aprovados / total, reprovados / total)
+    return taxas
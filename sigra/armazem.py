@@ -0,0 +1,233 @@
+#  -*- coding: utf-8 -*-
+#    @package: armazem.py
+#     @author: Guilherme N. Ramos (gnramos@unb.br)
+#
+# Armazenamento das informações extraídas dos relatórios do Sistema de
+# Graduação da UnB (SIGRA) em um banco de dados SQLite, de forma que possam ser
+# consultadas (inclusive entre vários semestres) sem processar novamente os
+# relatórios.
+#
+# Cada tabela de exportacao.TABELAS corresponde a uma tabela do banco, nomeada
+# como '<tipo>_<tabela>' (em minúsculas, como 'ofelst_aulas'), cuja primeira
+# coluna é o arquivo de origem de cada linha. A tabela 'relatorios' lista os
+# arquivos armazenados.
+
+import sqlite3
+import zlib
+
+from sigra import exportacao
+from sigra import lote
+from sigra import metricas
+
+
+# Colunas indexadas (em todas as tabelas que as contêm).
+INDEXADAS = ('arquivo', 'matricula', 'codigo', 'periodo', 'professor')
+
+_TIPOS_SQL = {str: 'TEXT', int: 'INTEGER'}
+
+
+def tabela(tipo, nome):
+    '''Retorna o nome da tabela do banco correspondente à tabela dada de um
+    tipo de relatório (veja exportacao.TABELAS).'''
+    return '{}_{}'.format(tipo, nome).lower()
+
+
+def _colunas(tipo, nome):
+    '''Retorna a lista de (coluna, tipo SQL) da tabela do banco.'''
+    colunas, _ = exportacao.TABELAS[tipo][nome]
+    return [(coluna, _TIPOS_SQL[t]) for coluna, t in [('arquivo', str)] +
+            colunas]
+
+
+def _versao_do_esquema():
+    '''Retorna a versão (PRAGMA user_version) do esquema das tabelas,
+    derivada de exportacao.TABELAS.'''
+    esquema = repr(sorted((tabela(tipo, nome), _colunas(tipo, nome))
+                          for tipo, tabelas in exportacao.TABELAS.items()
+                          for nome in tabelas))
+    return zlib.crc32(esquema.encode()) & 0x7fffffff
+
+
+# Versão do esquema (PRAGMA user_version). Um banco criado com outro esquema
+# tem as tabelas desatualizadas recriadas (veja Armazem._atualiza_esquema).
+VERSAO = _versao_do_esquema()
+
+
+class Armazem():
+    '''Banco de dados SQLite com as informações de relatórios de todos os
+    tipos. Por exemplo:
+
+        with Armazem('sigra.db') as armazem:
+            armazem.ingere(['OFELST_2017_1.txt', 'OFELST_2017_2.txt'],
+                           'OFELST')
+            armazem.consulta('SELECT professor, COUNT(*) '
+                             'FROM ofelst_professores GROUP BY professor')
+
+    Armazenar novamente um arquivo substitui as informações anteriores dele.
+    Além disso, há no máximo um relatório OFELST por período letivo: o
+    armazenado por último substitui os anteriores do mesmo período (como
+    exportações sucessivas da oferta durante a matrícula).
+    '''
+    def __init__(self, caminho=':memory:'):
+        '''Argumentos:
+        caminho -- caminho para o arquivo do banco de dados (criado se não
+                   existir).
+                   (default :memory:)
+        '''
+        self.caminho = caminho
+        self.conexao = sqlite3.connect(caminho)
+        with self.conexao:
+            self._cria_tabelas()
+
+    def _cria_tabelas(self):
+        versao, = self.conexao.execute('PRAGMA user_version').fetchone()
+        if versao != VERSAO:
+            self._atualiza_esquema()
+
+        self.conexao.execute('CREATE TABLE IF NOT EXISTS relatorios ('
+                             'arquivo TEXT PRIMARY KEY, '
+                             'tipo TEXT NOT NULL, '
+                             'periodo TEXT)')
+        self.conexao.execute('CREATE INDEX IF NOT EXISTS relatorios_tipo '
+                             'ON relatorios (tipo, periodo)')
+
+        for tipo, tabelas in exportacao.TABELAS.items():
+            for nome in tabelas:
+                colunas = _colunas(tipo, nome)
+                nome = tabela(tipo, nome)
+                self.conexao.execute(
+                    'CREATE TABLE IF NOT EXISTS {} ({})'.format(
+                        nome, ', '.join('{} {}'.format(coluna, tipo_sql)
+                                        for coluna, tipo_sql in colunas)))
+                for coluna, _ in colunas:
+                    if coluna in INDEXADAS:
+                        self.conexao.execute(
+                            'CREATE INDEX IF NOT EXISTS {0}_{1} '
+                            'ON {0} ({1})'.format(nome, coluna))
+        self.conexao.execute('PRAGMA user_version = {}'.format(VERSAO))
+
+    def _atualiza_esquema(self):
+        '''Remove as tabelas cujas colunas diferem das atuais (de um banco
+        criado por outra versão), junto com os relatórios dos tipos
+        correspondentes, que devem ser armazenados novamente.'''
+        existentes = {nome for nome, in self.consulta(
+            "SELECT name FROM sqlite_master WHERE type = 'table'")}
+        desatualizados = set()
+        for tipo, tabelas in exportacao.TABELAS.items():
+            for nome in tabelas:
+                nome_sql = tabela(tipo, nome)
+                if nome_sql not in existentes:
+                    continue
+                colunas = [(coluna, tipo_sql.upper()) for _, coluna, tipo_sql,
+                           *_ in self.consulta('PRAGMA table_info({})'.format(
+                               nome_sql))]
+                if colunas != _colunas(tipo, nome):
+                    desatualizados.add(tipo)
+
+        for tipo in sorted(desatualizados):
+            for nome in exportacao.TABELAS[tipo]:
+                self.conexao.execute('DROP TABLE IF EXISTS {}'.format(
+                                     tabela(tipo, nome)))
+            if 'relatorios' in existentes:
+                self.conexao.execute('DELETE FROM relatorios WHERE tipo = ?',
+                                     (tipo,))
+            metricas.LOGGER.warning('Tabelas de %s em %s criadas por outra '
+                                    'versão e removidas: os relatórios %s '
+                                    'devem ser armazenados novamente.', tipo,
+                                    self.caminho, tipo)
+
+    def ingere(self, arquivos, tipo):
+        '''Extrai as informações de vários relatórios de um mesmo tipo,
+        armazenando-as no banco (uma transação por arquivo). Retorna a
+        quantidade de linhas armazenadas.
+
+        Argumentos:
+        arquivos -- lista de caminhos para os arquivos (UTF-16) contendo os
+                    dados.
+        tipo -- tipo dos relatórios (veja lote.TIPOS), como 'OFELST'.
+        '''
+        if tipo not in exportacao.TABELAS:
+            raise ValueError('Tipo de relatório desconhecido: {} (esperado um '
+                             'dentre {}).'.format(
+                                 tipo, ', '.join(sorted(exportacao.TABELAS))))
+
+        extrai = lote.extrator(tipo)
+        num_linhas = 0
+        for arquivo in arquivos:
+            resultado = extrai([arquivo] if tipo in lote.RECEBEM_LISTA
+                               else arquivo)
+            num_linhas += self.armazena(resultado, tipo, arquivo)
+        return num_linhas
+
+    def armazena(self, resultado, tipo, arquivo):
+        '''Armazena as informações já extraídas de um relatório (em uma
+        transação), substituindo as anteriores do mesmo arquivo. Retorna a
+        quantidade de linhas armazenadas.
+
+        Argumentos:
+        resultado -- informações extraídas do relatório.
+        tipo -- tipo do relatório (veja lote.TIPOS), como 'OFELST'.
+        arquivo -- caminho para o arquivo do relatório.
+        '''
+        periodo = None
+        if tipo == 'OFELST':
+            from sigra.planejamento import oferta
+            periodo = oferta.periodo_ofertado(arquivo)
+
+        num_linhas = 0
+        with self.conexao:
+            substituidos = [arquivo]
+            if periodo is not None:
+                substituidos += [anterior for anterior, in self.consulta(
+                    'SELECT arquivo FROM relatorios WHERE tipo = ? AND '
+                    'periodo = ? AND arquivo != ?', (tipo, periodo, arquivo))]
+            self._remove(substituidos, tipo)
+
+            self.conexao.execute('INSERT INTO relatorios VALUES (?, ?, ?)',
+                                 (arquivo, tipo, periodo))
+            for nome, (colunas, _) in exportacao.TABELAS[tipo].items():
+                nome_sql = tabela(tipo, nome)
+                cursor = self.conexao.executemany(
+                    'INSERT INTO {} VALUES ({})'.format(
+                        nome_sql, ', '.join('?' * (len(colunas) + 1))),
+                    ((arquivo,) + linha
+                     for linha in exportacao.linhas(resultado, tipo, nome,
+                                                    arquivo)))
+                num_linhas += cursor.rowcount
+
+        metricas.LOGGER.info('%s linhas de %s armazenadas em %s.',
+                             num_linhas, arquivo, self.caminho)
+        return num_linhas
+
+    def _remove(self, arquivos, tipo):
+        '''Remove as informações dos arquivos dados (de um mesmo tipo).'''
+        marcadores = ', '.join('?' * len(arquivos))
+        for nome in exportacao.TABELAS[tipo]:
+            self.conexao.execute('DELETE FROM {} WHERE arquivo IN ({})'.format(
+                                 tabela(tipo, nome), marcadores), arquivos)
+        self.conexao.execute('DELETE FROM relatorios WHERE arquivo IN '
+                             '({})'.format(marcadores), arquivos)
+
+    def consulta(self, sql, parametros=()):
+        '''Retorna a lista de linhas (tuplas) resultantes da consulta SQL.'''
+        return self.conexao.execute(sql, parametros).fetchall()
+
+    def relatorios(self, tipo=None):
+        '''Retorna um dicionário com o tipo de cada arquivo armazenado (ou
+        apenas os arquivos do tipo dado).'''
+        if tipo is None:
+            return dict(self.consulta('SELECT arquivo, tipo FROM relatorios'))
+        return dict(self.consulta('SELECT arquivo, tipo FROM relatorios '
+                                  'WHERE tipo = ?', (tipo,)))
+
+    def fecha(self):
+        self.conexao.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        self.fecha()
+
+    def __repr__(self):
+        return 'Armazem({})'.format(self.caminho)
@@ -0,0 +1,182 @@
+#  -*- coding: utf-8 -*-
+#    @package: cache.py
+#     @author: Guilherme N. Ramos (gnramos@unb.br)
+#
+# Armazenamento em disco dos resultados das funções de extração de informações
+# dos relatórios do Sistema de Graduação da UnB (SIGRA), indexados pelo
+# conteúdo dos arquivos processados.
+#
+# Variáveis de ambiente:
+# SIGRA_CACHE -- diretório onde os resultados são armazenados.
+#                (default ~/.cache/sigra)
+# SIGRA_CACHE_MAX -- tamanho máximo (em bytes) ocupado pelos resultados.
+#                    (default 256 MiB)
+# SIGRA_SEM_CACHE -- se definida (com qualquer valor não vazio), desativa o
+#                    uso do cache.
+
+import contextlib
+import functools
+import hashlib
+import os
+import pickle
+import tempfile
+
+from sigra import metricas
+from sigra import utils
+
+
+DIRETORIO = os.environ.get('SIGRA_CACHE',
+                           os.path.join(os.path.expanduser('~'),
+                                        '.cache', 'sigra'))
+TAMANHO_MAXIMO = int(os.environ.get('SIGRA_CACHE_MAX', 256 * 2**20))
+ATIVO = not os.environ.get('SIGRA_SEM_CACHE')
+
+# Versão do formato de armazenamento; alterá-la invalida todo o cache.
+VERSAO = 1
+EXTENSAO = '.pickle'
+
+
+def armazena(versao):
+    '''Decorador de funções de extração, cujo primeiro argumento é o caminho
+    para um arquivo (ou uma lista de caminhos). O resultado é armazenado em
+    disco e reaproveitado enquanto o conteúdo do(s) arquivo(s), os demais
+    argumentos e a versão do extrator não mudarem.
+
+    Argumentos:
+    versao -- versão do extrator. Deve ser incrementada sempre que o formato
+              do resultado (ou a forma como ele é obtido) mudar.
+    '''
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def extrai(arquivo, *args, **kwargs):
+            if not ATIVO:
+                return funcao(arquivo, *args, **kwargs)
+
+            with metricas.fase(metricas.CACHE):
+                chave = _chave(funcao, versao, arquivo, args, kwargs)
+                caminho = os.path.join(DIRETORIO, chave + EXTENSAO)
+                resultado = _recupera(caminho)
+
+            if resultado is None:
+                resultado = funcao(arquivo, *args, **kwargs)
+                with metricas.fase(metricas.CACHE):
+                    try:
+                        _guarda(caminho, resultado)
+                    except (OSError, pickle.PicklingError, TypeError) as e:
+                        # O resultado já foi obtido, apenas não é armazenado.
+                        metricas.LOGGER.warning('Resultado de %s não '
+                                                'armazenado no cache (%s).',
+                                                arquivo, e)
+            return resultado
+
+        extrai.versao = versao
+        return extrai
+    return decorador
+
+
+@contextlib.contextmanager
+def desativado():
+    '''Gerenciador de contexto que ignora o cache no bloco.'''
+    global ATIVO
+    ativo, ATIVO = ATIVO, False
+    try:
+        yield
+    finally:
+        ATIVO = ativo
+
+
+def limpa():
+    '''Remove todos os resultados armazenados.'''
+    for caminho, _, _ in _entradas():
+        _remove(caminho)
+
+
+def tamanho():
+    '''Retorna o espaço (em bytes) ocupado pelos resultados armazenados.'''
+    return sum(tam for _, tam, _ in _entradas())
+
+
+def _chave(funcao, versao, arquivo, args, kwargs):
+    arquivos = arquivo if isinstance(arquivo, (list, tuple)) else [arquivo]
+
+    h = hashlib.blake2b(digest_size=20)
+    h.update('{}:{}.{}:{}'.format(VERSAO, funcao.__module__,
+                                  funcao.__qualname__, versao).encode())
+    h.update(repr((args, sorted(kwargs.items()))).encode())
+    for arquivo in arquivos:
+        with open(utils.caminho(arquivo), 'rb') as f:
+            for bloco in iter(lambda: f.read(2**20), b''):
+                h.update(bloco)
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def _entradas():
+    '''Lista (caminho, tamanho, último acesso) de cada resultado armazenado.'''
+    try:
+        nomes = os.listdir(DIRETORIO)
+    except FileNotFoundError:
+        return []
+
+    entradas = []
+    for nome in nomes:
+        if nome.endswith(EXTENSAO):
+            caminho = os.path.join(DIRETORIO, nome)
+            try:
+                info = os.stat(caminho)
+            except FileNotFoundError:
+                continue
+            entradas.append((caminho, info.st_size, info.st_mtime))
+    return entradas
+
+
+def _guarda(caminho, resultado):
+    os.makedirs(DIRETORIO, exist_ok=True)
+
+    fd, temporario = tempfile.mkstemp(dir=DIRETORIO, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(resultado, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, caminho)
+    except Exception:
+        _remove(temporario)
+        raise
+
+    _libera_espaco()
+
+
+def _libera_espaco():
+    '''Remove os resultados acessados há mais tempo até que o total ocupado
+    não ultrapasse TAMANHO_MAXIMO.'''
+    entradas = _entradas()
+    total = sum(tam for _, tam, _ in entradas)
+    for caminho, tam, _ in sorted(entradas, key=lambda e: e[2]):
+        if total <= TAMANHO_MAXIMO:
+            break
+        _remove(caminho)
+        total -= tam
+
+
+def _recupera(caminho):
+    try:
+        with open(caminho, 'rb') as f:
+            resultado = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        # Resultado corrompido ou incompatível, será recalculado.
+        _remove(caminho)
+        return None
+
+    try:
+        os.utime(caminho)  # Marca o acesso para a política de remoção.
+    except OSError:
+        pass
+    return resultado
+
+
+def _remove(caminho):
+    try:
+        os.remove(caminho)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,344 @@
+#  -*- coding: utf-8 -*-
+#    @package: exportacao.py
+#     @author: Guilherme N. Ramos (gnramos@unb.br)
+#
+# Exportação das informações extraídas dos relatórios do Sistema de Graduação
+# da UnB (SIGRA) como tabelas (CSV, Parquet ou Arrow), para que possam ser
+# usadas por outras ferramentas sem processar novamente os relatórios.
+#
+# Cada tipo de relatório é achatado em uma ou mais tabelas (veja TABELAS),
+# cujas linhas são geradas sob demanda e gravadas em lotes, de forma que a
+# memória usada não depende da quantidade de relatórios exportados.
+
+import csv
+import os
+
+from sigra import lote
+from sigra import metricas
+from sigra.acompanhamento import historico_escolar
+
+
+# Quantidade de linhas acumuladas antes de cada gravação.
+LINHAS_POR_LOTE = 65536
+
+# Extensão dos arquivos de cada formato.
+FORMATOS = {'csv': 'csv', 'parquet': 'parquet', 'arrow': 'arrow'}
+
+
+def _pre_requisitos(opcoes):
+    '''Representa as opções de pré-requisitos como texto, como em
+    '113476 E 116319 OU 113476'.'''
+    return ' OU '.join(' E '.join(opcao) for opcao in opcoes if opcao)
+
+
+def _creditos(creditos):
+    return (creditos.teoria, creditos.pratica,
+            creditos.extensao, creditos.estudo)
+
+
+def _turmas_ofertadas(oferta, arquivo):
+    for codigo, disciplina in oferta.items():
+        for turma in disciplina.turmas.values():
+            yield ((codigo, disciplina.depto, disciplina.nome) +
+                   _creditos(disciplina.creditos) +
+                   (_pre_requisitos(disciplina.pre_requisitos),
+                    turma.turma, turma.descricao, int(turma.vagas),
+                    turma.turno, turma.observacoes))
+
+
+def _aulas(oferta, arquivo):
+    for codigo, disciplina in oferta.items():
+        for turma in disciplina.turmas.values():
+            for aula in turma.aulas:
+                inicio, _, fim = aula.horario.partition(' ')
+                yield (codigo, turma.turma, aula.dia, inicio, fim, aula.local)
+
+
+def _professores(oferta, arquivo):
+    for codigo, disciplina in oferta.items():
+        for turma in disciplina.turmas.values():
+            for professor in turma.professores:
+                yield (codigo, turma.turma, professor)
+
+
+def _reservas(oferta, arquivo):
+    for codigo, disciplina in oferta.items():
+        for turma in disciplina.turmas.values():
+            for habilitacao, vagas in turma.reserva.items():
+                yield (codigo, turma.turma, habilitacao, int(vagas))
+
+
+def _fluxo(fluxo, arquivo):
+    for periodo in fluxo.values():
+        for tipo, disciplinas in periodo.disciplinas.items():
+            for codigo, disciplina in disciplinas.items():
+                yield ((int(periodo.numero), int(periodo.creditos), tipo,
+                        codigo, disciplina.depto, disciplina.nome) +
+                       _creditos(disciplina.creditos) +
+                       (_pre_requisitos(disciplina.pre_requisitos),))
+
+
+def _disciplinas(relacao, arquivo):
+    for codigo, disciplina in relacao.items():
+        yield ((codigo, disciplina['Órgão'], disciplina['Nome']) +
+               _creditos(disciplina['Créditos']) +
+               (_pre_requisitos(disciplina['Pré-requisitos']),))
+
+
+def _estatisticas(estatisticas, arquivo):
+    for periodo, categorias in estatisticas.items():
+        for categoria, quantidades in categorias.items():
+            yield (periodo, categoria,
+                   int(quantidades['Mas']), int(quantidades['Fem']))
+
+
+def _alunos(relacao, arquivo):
+    for opcao, info in relacao.items():
+        for periodo, alunos in info['Alunos'].items():
+            for matricula, aluno in alunos.items():
+                yield (opcao, info['Nome da Opção'], periodo, matricula,
+                       aluno.nome, aluno.forma_ingresso)
+
+
+def _contatos(relacao, arquivo):
+    for matricula, contato in relacao.items():
+        yield (matricula, contato.nome, contato.email, contato.telefone)
+
+
+def _matriculas(relacao, arquivo):
+    # O código da disciplina consta apenas no cabeçalho do relatório.
+    codigo = (arquivo and historico_escolar.disciplina_cursada(arquivo)) or ''
+
+    for periodo, turmas in relacao.items():
+        for turma, matriculados in turmas.items():
+            for matricula, aluno in matriculados.items():
+                yield (codigo, periodo, turma, matricula,
+                       aluno.nome, aluno.mencao)
+
+
+def _mencoes(relacao, arquivo):
+    for periodo, deptos in relacao.items():
+        for depto, disciplinas in deptos.items():
+            for codigo, info in disciplinas.items():
+                for turma, total in info['Turmas'].items():
+                    yield ((periodo, depto, codigo, info['Nível'], turma,
+                            int(total)) + tuple(info['Menções'][turma]))
+
+
+_CREDITOS = [('teoria', int), ('pratica', int),
+             ('extensao', int), ('estudo', int)]
+
+# Tabelas de cada tipo de relatório: nome da tabela: (colunas, função que
+# gera as linhas a partir do resultado da extração e do caminho do arquivo).
+# Cada coluna é dada por seu nome e tipo (str ou int).
+TABELAS = {
+    'OFELST': {
+        'turmas': ([('codigo', str), ('depto', str), ('nome', str)] +
+                   _CREDITOS +
+                   [('pre_requisitos', str), ('turma', str),
+                    ('descricao', str), ('vagas', int), ('turno', str),
+                    ('observacoes', str)],
+                   _turmas_ofertadas),
+        'aulas': ([('codigo', str), ('turma', str), ('dia', str),
+                   ('inicio', str), ('fim', str), ('local', str)],
+                  _aulas),
+        'professores': ([('codigo', str), ('turma', str),
+                         ('professor', str)],
+                        _professores),
+        'reservas': ([('codigo', str), ('turma', str),
+                      ('habilitacao', str), ('vagas', int)],
+                     _reservas)},
+    'FLULST': {
+        'disciplinas': ([('periodo', int), ('creditos_do_periodo', int),
+                         ('tipo', str), ('codigo', str), ('depto', str),
+                         ('nome', str)] +
+                        _CREDITOS +
+                        [('pre_requisitos', str)],
+                        _fluxo)},
+    'DISLST': {
+        'disciplinas': ([('codigo', str), ('orgao', str), ('nome', str)] +
+                        _CREDITOS +
+                        [('pre_requisitos', str)],
+                        _disciplinas)},
+    'CUREGEP': {
+        'estatisticas': ([('periodo', str), ('categoria', str),
+                          ('masculino', int), ('feminino', int)],
+                         _estatisticas)},
+    'ALUREL': {
+        'alunos': ([('opcao', str), ('nome_da_opcao', str),
+                    ('periodo_de_ingresso', str), ('matricula', str),
+                    ('nome', str), ('forma_ingresso', str)],
+                   _alunos)},
+    'ALUTEL': {
+        'contatos': ([('matricula', str), ('nome', str), ('email', str),
+                      ('telefone', str)],
+                     _contatos)},
+    'HEDIS': {
+        'matriculas': ([('codigo', str), ('periodo', str), ('turma', str),
+                        ('matricula', str), ('nome', str), ('mencao', str)],
+                       _matriculas)},
+    'HEEME': {
+        'mencoes': ([('periodo', str), ('depto', str), ('codigo', str),
+                     ('nivel', str), ('turma', str), ('mencoes', int)] +
+                    [(mencao.lower(), int)
+                     for mencao in historico_escolar.MENCOES],
+                    _mencoes)}}
+
+
+def linhas(resultado, tipo, tabela, arquivo=None):
+    '''Retorna um gerador das linhas (tuplas, na ordem das colunas em
+    TABELAS) de uma tabela do resultado da extração de um relatório.
+
+    Argumentos:
+    resultado -- informações extraídas do relatório.
+    tipo -- tipo do relatório (veja lote.TIPOS), como 'OFELST'.
+    tabela -- nome da tabela (veja TABELAS), como 'aulas'.
+    arquivo -- caminho para o arquivo do relatório, usado quando parte das
+               informações não consta do resultado (como o código da
+               disciplina em HEDIS).
+               (default None)
+    '''
+    _, gera = TABELAS[tipo][tabela]
+    return gera(resultado, arquivo)
+
+
+class _EscritorCSV():
+    def __init__(self, caminho, colunas, separador):
+        self._arquivo = open(caminho, 'w', newline='', encoding='utf-8',
+                             buffering=1 << 20)
+        self._csv = csv.writer(self._arquivo, delimiter=separador,
+                               lineterminator='\n')
+        self._csv.writerow([nome for nome, _ in colunas])
+
+    def grava(self, linhas):
+        self._csv.writerows(linhas)
+
+    def fecha(self):
+        self._arquivo.close()
+
+
+class _EscritorArrow():
+    def __init__(self, caminho, colunas, formato):
+        try:
+            import pyarrow
+        except ImportError:
+            raise ImportError('O formato {} requer pyarrow '
+                              '(pip install pyarrow).'.format(formato))
+
+        tipos = {str: pyarrow.string(), int: pyarrow.int64()}
+        self._pyarrow = pyarrow
+        self._esquema = pyarrow.schema([(nome, tipos[tipo])
+                                        for nome, tipo in colunas])
+        if formato == 'parquet':
+            import pyarrow.parquet
+            self._escritor = pyarrow.parquet.ParquetWriter(caminho,
+                                                           self._esquema)
+            self._grava = self._escritor.write_table
+            self._converte = pyarrow.Table.from_batches
+        else:
+            import pyarrow.ipc
+            self._escritor = pyarrow.ipc.new_file(caminho, self._esquema)
+            self._grava = self._escritor.write_batch
+            self._converte = None
+
+    def grava(self, linhas):
+        colunas = list(zip(*linhas))
+        dados = self._pyarrow.RecordBatch.from_arrays(
+            [self._pyarrow.array(valores, type=campo.type)
+             for valores, campo in zip(colunas, self._esquema)],
+            schema=self._esquema)
+        self._grava(self._converte([dados]) if self._converte else dados)
+
+    def fecha(self):
+        self._escritor.close()
+
+
+class _Tabela():
+    '''Tabela sendo exportada, acumulando as linhas até completar um lote.'''
+    def __init__(self, caminho, colunas, formato, separador, linhas_por_lote):
+        if formato == 'csv':
+            self._escritor = _EscritorCSV(caminho, colunas, separador)
+        else:
+            self._escritor = _EscritorArrow(caminho, colunas, formato)
+        self.caminho = caminho
+        self.num_linhas = 0
+        self._pendentes = []
+        self._linhas_por_lote = linhas_por_lote
+
+    def acrescenta(self, prefixo, linhas):
+        pendentes = self._pendentes
+        for linha in linhas:
+            pendentes.append(prefixo + linha)
+            if len(pendentes) >= self._linhas_por_lote:
+                self._descarrega()
+
+    def _descarrega(self):
+        if self._pendentes:
+            self._escritor.grava(self._pendentes)
+            self.num_linhas += len(self._pendentes)
+            self._pendentes = []
+
+    def fecha(self):
+        try:
+            self._descarrega()
+        finally:
+            self._escritor.fecha()
+
+
+def exporta(arquivos, tipo, diretorio='.', formato='csv', separador=';',
+            linhas_por_lote=LINHAS_POR_LOTE):
+    '''Exporta as informações de vários relatórios de um mesmo tipo (como os
+    de diversos semestres) como tabelas, uma por arquivo de saída, nomeado
+    como '<tipo>_<tabela>.<formato>' (por exemplo, 'OFELST_aulas.csv').
+    Retorna um dicionário com o caminho do arquivo de cada tabela.
+
+    Os relatórios são processados um de cada vez (aproveitando o cache), e a
+    primeira coluna de cada tabela indica o arquivo de origem de cada linha.
+
+    Argumentos:
+    arquivos -- lista de caminhos para os arquivos (UTF-16) contendo os dados.
+    tipo -- tipo dos relatórios (veja TABELAS), como 'OFELST'.
+    diretorio -- diretório onde gravar as tabelas.
+                 (default .)
+    formato -- formato das tabelas: 'csv', 'parquet' ou 'arrow' (os dois
+               últimos requerem pyarrow).
+               (default csv)
+    separador -- separador de valores (apenas para CSV).
+                 (default ;)
+    linhas_por_lote -- quantidade de linhas acumuladas (por tabela) antes de
+                       cada gravação.
+                       (default LINHAS_POR_LOTE)
+    '''
+    if tipo not in TABELAS:
+        raise ValueError('Tipo de relatório desconhecido: {} (esperado um '
+                         'dentre {}).'.format(tipo,
+                                              ', '.join(sorted(TABELAS))))
+    if formato not in FORMATOS:
+        raise ValueError('Formato desconhecido: {} (esperado um dentre '
+                         '{}).'.format(formato, ', '.join(sorted(FORMATOS))))
+
+    os.makedirs(diretorio, exist_ok=True)
+    extrai = lote.extrator(tipo)
+
+    tabelas = {}
+    try:
+        for nome, (colunas, _) in TABELAS[tipo].items():
+            caminho = os.path.join(diretorio, '{}_{}.{}'.format(
+                tipo, nome, FORMATOS[formato]))
+            tabelas[nome] = _Tabela(caminho, [('arquivo', str)] + colunas,
+                                    formato, separador, linhas_por_lote)
+
+        for arquivo in arquivos:
+            resultado = extrai([arquivo] if tipo in lote.RECEBEM_LISTA
+                               else arquivo)
+            for nome, tabela in tabelas.items():
+                tabela.acrescenta((arquivo,),
+                                  linhas(resultado, tipo, nome, arquivo))
+    finally:
+        for tabela in tabelas.values():
+            tabela.fecha()
+
+    for tabela in tabelas.values():
+        metricas.LOGGER.info('%s linhas exportadas para %s.',
+                             tabela.num_linhas, tabela.caminho)
+    return {nome: tabela.caminho for nome, tabela in tabelas.items()}
@@ -0,0 +1,291 @@
+#  -*- coding: utf-8 -*-
+#    @package: lote.py
+#     @author: Guilherme N. Ramos (gnramos@unb.br)
+#
+# Processamento em lote (e em paralelo) de vários relatórios do Sistema de
+# Graduação da UnB (SIGRA) de um mesmo tipo, como os de vários semestres.
+
+import concurrent.futures
+import importlib
+import itertools
+import os
+import re
+import time
+
+from sigra import cache
+from sigra import metricas
+from sigra import utils
+from sigra.planejamento import oferta
+
+
+# Função de extração de cada tipo de relatório (módulo:função).
+TIPOS = {'OFELST': 'sigra.planejamento.oferta:listagem',
+         'FLULST': 'sigra.planejamento.fluxo:listagem',
+         'DISLST': 'sigra.planejamento.disciplina:listagem',
+         'CUREGEP': 'sigra.planejamento.curso:estatisticas',
+         'ALUREL': 'sigra.acompanhamento.alunos:relacao',
+         'ALUTEL': 'sigra.acompanhamento.alunos:contatos',
+         'HEDIS': 'sigra.acompanhamento.historico_escolar:'
+                  'alunos_que_cursaram_disciplina',
+         'HEEME': 'sigra.acompanhamento.historico_escolar:'
+                  'estatisticas_de_mencoes'}
+
+# Tipos cuja função de extração recebe uma lista de arquivos.
+RECEBEM_LISTA = {'CUREGEP'}
+
+# Tipos cujo resultado não é indexado por período letivo (mas por código de
+# disciplina ou período do fluxo), de forma que os de vários arquivos (como os
+# de semestres diferentes) não são mesclados (veja Lote.combinado).
+NAO_MESCLADOS = {'OFELST', 'FLULST', 'DISLST'}
+
+# Título (ou âncora) no cabeçalho de cada tipo de relatório, na ordem em que
+# são testados (veja detecta).
+CABECALHOS = [('OFELST', r'Listagem da Oferta|lstofelst'),
+              ('FLULST', r'Listagem de Fluxo de Curso|lstflulst'),
+              ('DISLST', r'Relação de Disciplinas|lstdislst'),
+              ('HEDIS', r'Alunos que Cursaram a Disciplina'),
+              ('HEEME', r'Estatística de Menções|lstheeme'),
+              ('CUREGEP', r'Estatística de Entrada e Saída'),
+              ('ALUTEL', r'Relação de Alunos - Contatos'),
+              ('ALUREL', r'Relação de Alunos')]
+
+_CABECALHOS = [(tipo, re.compile(padrao)) for tipo, padrao in CABECALHOS]
+
+
+class Lote():
+    '''Resultado do processamento de vários relatórios de um mesmo tipo.
+
+    Os resultados e os tempos de processamento (em segundos) de cada arquivo
+    são mantidos na ordem em que os arquivos foram dados, independente da
+    ordem em que o processamento de cada um terminou.
+    '''
+    def __init__(self, tipo, resultados, tempos, duracao):
+        self.tipo = tipo
+        self.resultados = resultados
+        self.tempos = tempos
+        self.duracao = duracao
+
+    def combinado(self):
+        '''Retorna a combinação dos resultados de todos os arquivos.
+
+        Dicionários são combinados recursivamente; nos demais casos (ou
+        seja, informações presentes em mais de um arquivo), prevalece a do
+        arquivo listado por último. Os resultados dos tipos em NAO_MESCLADOS
+        são apenas indexados: os de OFELST pelo período ofertado (ou pelo
+        arquivo, se não for encontrado) e os demais pelo arquivo.
+        '''
+        if self.tipo == 'OFELST':
+            return {oferta.periodo_ofertado(arquivo) or arquivo: resultado
+                    for arquivo, resultado in self.resultados.items()}
+        if self.tipo in NAO_MESCLADOS:
+            return dict(self.resultados)
+
+        combinado = {}
+        for resultado in self.resultados.values():
+            _combina(combinado, resultado)
+        return combinado
+
+    def __repr__(self):
+        tempos = ''.join('\n\t{:.3f}s {}'.format(tempo, arquivo)
+                         for arquivo, tempo in self.tempos.items())
+        return '{} arquivo(s) {} em {:.3f}s.{}'.format(len(self.tempos),
+                                                       self.tipo,
+                                                       self.duracao, tempos)
+
+
+def processa(arquivos, tipo, processos=None):
+    '''Extrai as informações de vários relatórios de um mesmo tipo em
+    paralelo, retornando um Lote com os resultados.
+
+    Argumentos:
+    arquivos -- lista de caminhos para os arquivos (UTF-16) contendo os dados.
+    tipo -- tipo dos relatórios (veja TIPOS), como 'OFELST'.
+    processos -- número máximo de processos simultâneos. Se 1, os arquivos
+                 são processados sequencialmente, sem criar novos processos.
+                 (default número de processadores)
+    '''
+    if tipo not in TIPOS:
+        raise ValueError('Tipo de relatório desconhecido: {} (esperado um '
+                         'dentre {}).'.format(tipo, ', '.join(sorted(TIPOS))))
+
+    inicio = time.perf_counter()
+    arquivos = list(arquivos)
+    processados = _executa([tipo] * len(arquivos), arquivos, processos)
+
+    resultados, tempos = {}, {}
+    for arquivo, (resultado, tempo) in zip(arquivos, processados):
+        resultados[arquivo] = resultado
+        tempos[arquivo] = tempo
+
+    lote = Lote(tipo, resultados, tempos, time.perf_counter() - inicio)
+    metricas.LOGGER.info(lote)
+    return lote
+
+
+def processa_diretorio(diretorio, processos=None):
+    '''Extrai as informações de todos os relatórios de um diretório (cujo
+    tipo é identificado pelo cabeçalho, veja detecta) em paralelo,
+    retornando um dicionário com um Lote para cada tipo encontrado.
+
+    Argumentos:
+    diretorio -- caminho para o diretório com os arquivos (UTF-16, com
+                 extensão .txt) contendo os dados. Arquivos de tipo não
+                 identificado são ignorados.
+    processos -- número máximo de processos simultâneos. Se 1, os arquivos
+                 são processados sequencialmente, sem criar novos processos.
+                 (default número de processadores)
+    '''
+    inicio = time.perf_counter()
+    identificados = relatorios(diretorio)
+    arquivos, tipos = list(identificados), list(identificados.values())
+    processados = list(_executa(tipos, arquivos, processos))
+    duracao = time.perf_counter() - inicio
+
+    lotes = {}
+    for tipo, arquivo, (resultado, tempo) in zip(tipos, arquivos,
+                                                 processados):
+        if tipo not in lotes:
+            lotes[tipo] = Lote(tipo, {}, {}, duracao)
+        lotes[tipo].resultados[arquivo] = resultado
+        lotes[tipo].tempos[arquivo] = tempo
+
+    for lote in lotes.values():
+        metricas.LOGGER.info(lote)
+    return lotes
+
+
+def gera(arquivos, tipo, processos=None):
+    '''Gera (arquivo, resultado) de cada um de vários relatórios de um mesmo
+    tipo, na ordem dada, à medida que são processados em paralelo. Ao
+    contrário de processa, os resultados não são mantidos depois de gerados.
+
+    Argumentos:
+    arquivos -- lista de caminhos para os arquivos (UTF-16) contendo os dados.
+    tipo -- tipo dos relatórios (veja TIPOS), como 'HEDIS'.
+    processos -- número máximo de processos simultâneos. Se 1, os arquivos
+                 são processados sequencialmente, sem criar novos processos.
+                 (default número de processadores)
+    '''
+    if tipo not in TIPOS:
+        raise ValueError('Tipo de relatório desconhecido: {} (esperado um '
+                         'dentre {}).'.format(tipo, ', '.join(sorted(TIPOS))))
+
+    arquivos = list(arquivos)
+    processados = _executa([tipo] * len(arquivos), arquivos, processos)
+    for arquivo, (resultado, _) in zip(arquivos, processados):
+        yield arquivo, resultado
+
+
+def aplica(funcao, arquivos, processos=None):
+    '''Gera o resultado da função dada para cada um de vários arquivos, na
+    ordem dada, à medida que são processados em paralelo (como em gera).
+
+    Argumentos:
+    funcao -- função (definida no nível de um módulo) que recebe o caminho
+              para um arquivo.
+    arquivos -- lista de caminhos para os arquivos.
+    processos -- número máximo de processos simultâneos. Se 1, os arquivos
+                 são processados sequencialmente, sem criar novos processos.
+                 (default número de processadores)
+    '''
+    arquivos = list(arquivos)
+    yield from _mapeia(_aplica, processos, [funcao] * len(arquivos),
+                       arquivos)
+
+
+def relatorios(diretorio, tipo=None):
+    '''Retorna um dicionário com o tipo de cada relatório (arquivo .txt) de
+    um diretório, identificado pelo cabeçalho (veja detecta), na ordem dos
+    nomes dos arquivos.
+
+    Argumentos:
+    diretorio -- caminho para o diretório com os arquivos (UTF-16).
+    tipo -- tipo dos relatórios de interesse, como 'HEDIS'.
+            (default None, todos)
+    '''
+    identificados = {}
+    for nome in sorted(os.listdir(diretorio)):
+        arquivo = os.path.join(diretorio, nome)
+        if not (nome.endswith('.txt') and os.path.isfile(arquivo)):
+            continue
+
+        detectado = detecta(arquivo)
+        if not detectado:
+            metricas.LOGGER.info('%s ignorado (tipo de relatório não '
+                                 'identificado).', arquivo)
+        elif tipo is None or detectado == tipo:
+            identificados[arquivo] = detectado
+    return identificados
+
+
+def detecta(arquivo, num_linhas=10):
+    '''Retorna o tipo do relatório (veja CABECALHOS) de acordo com as
+    primeiras linhas do arquivo, ou None se não for identificado.
+
+    Argumentos:
+    arquivo -- caminho para o arquivo (UTF-16) contendo o relatório.
+    num_linhas -- quantidade de linhas iniciais consideradas.
+                  (default 10)
+    '''
+    try:
+        cabecalho = '\n'.join(itertools.islice(utils.linhas(arquivo),
+                                               num_linhas))
+    except UnicodeDecodeError:
+        return None
+
+    for tipo, padrao in _CABECALHOS:
+        if padrao.search(cabecalho):
+            return tipo
+    return None
+
+
+def extrator(tipo):
+    '''Retorna a função de extração do tipo de relatório dado.'''
+    modulo, funcao = TIPOS[tipo].split(':')
+    return getattr(importlib.import_module(modulo), funcao)
+
+
+def _combina(destino, origem):
+    for chave, valor in origem.items():
+        if isinstance(valor, dict) and isinstance(destino.get(chave), dict):
+            _combina(destino[chave], valor)
+        elif isinstance(valor, dict):
+            destino[chave] = _combina({}, valor)
+        else:
+            destino[chave] = valor
+    return destino
+
+
+def _executa(tipos, arquivos, processos):
+    '''Processa cada arquivo (do tipo correspondente), em paralelo se houver
+    mais de um, gerando (resultado, tempo gasto) na ordem dada.'''
+    yield from _mapeia(_processa, processos, tipos, arquivos)
+
+
+def _mapeia(funcao, processos, *args):
+    '''Aplica a função (que recebe também o estado do cache) a cada conjunto
+    de argumentos, em paralelo se houver mais de um, gerando os resultados na
+    ordem dada.'''
+    args += ([cache.ATIVO] * len(args[0]),)
+    if processos == 1 or len(args[0]) < 2:
+        yield from map(funcao, *args)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(processos) as executor:
+            yield from executor.map(funcao, *args)
+
+
+def _aplica(funcao, arquivo, usa_cache):
+    '''Aplica a função ao arquivo (possivelmente em outro processo).'''
+    cache.ATIVO = usa_cache
+    return funcao(arquivo)
+
+
+def _processa(tipo, arquivo, usa_cache):
+    '''Processa um arquivo (possivelmente em outro processo), retornando o
+    resultado e o tempo gasto.'''
+    cache.ATIVO = usa_cache
+
+    extrai = extrator(tipo)
+    inicio = time.perf_counter()
+    resultado = extrai([arquivo] if tipo in RECEBEM_LISTA else arquivo)
+    return resultado, time.perf_counter() - inicio
@@ -0,0 +1,209 @@
+#  -*- coding: utf-8 -*-
+#    @package: metricas.py
+#     @author: Guilherme N. Ramos (gnramos@unb.br)
+#
+# Instrumentação das funções de extração de informações dos relatórios do
+# Sistema de Graduação da UnB (SIGRA): mensagens (via logging) e medições de
+# desempenho de cada chamada.
+#
+# As medições só são feitas enquanto houver algum observador registrado, de
+# forma que não há custo adicional no uso normal. Por exemplo:
+#
+#     with metricas.coleta() as medicoes:
+#         oferta.listagem('OFELST.txt')
+#     print(metricas.como_json(medicoes))
+
+import contextlib
+import functools
+import json
+import logging
+import time
+
+
+LOGGER = logging.getLogger('sigra')
+LOGGER.addHandler(logging.NullHandler())
+
+# Fases em que o tempo de uma chamada é dividido.
+LEITURA = 'leitura'                    # Leitura e decodificação do arquivo.
+SEPARACAO = 'separacao'                # Separação das linhas.
+PAGINACAO = 'paginacao'                # Remoção de cabeçalhos e rodapés.
+TOKENIZACAO = 'tokenizacao'            # Classificação das linhas.
+EXTRACAO = 'extracao'                  # Extração das informações.
+POS_PROCESSAMENTO = 'pos_processamento'  # Combinação das informações.
+CACHE = 'cache'                        # Consulta/armazenamento no cache.
+
+_observadores = []
+_medicoes = []  # Pilha das medições em andamento.
+
+
+class Medicao():
+    '''Medições de uma chamada a uma função de extração: duração total e de
+    cada fase (em segundos), quantidade de bytes e linhas lidos e de
+    registros extraídos.'''
+    def __init__(self, funcao, arquivo):
+        self.funcao = funcao
+        self.arquivo = arquivo
+        self.inicio = time.time()
+        self.duracao = 0.0
+        self.fases = {}
+        self.bytes = 0
+        self.linhas = 0
+        self.registros = None
+        self._filhos = []  # Pilha do tempo gasto em fases aninhadas.
+
+    def como_dict(self):
+        return {'funcao': self.funcao,
+                'arquivo': self.arquivo,
+                'inicio': self.inicio,
+                'duracao': self.duracao,
+                'fases': dict(self.fases),
+                'bytes': self.bytes,
+                'linhas': self.linhas,
+                'registros': self.registros}
+
+    def __repr__(self):
+        fases = ', '.join('{} {:.3f}s'.format(fase, duracao)
+                          for fase, duracao in self.fases.items())
+        return '{} ({}): {:.3f}s [{}]'.format(self.funcao, self.arquivo,
+                                              self.duracao, fases)
+
+
+def observa(observador):
+    '''Registra uma função a ser chamada com a Medicao de cada chamada a uma
+    função de extração (ativando as medições).'''
+    _observadores.append(observador)
+    return observador
+
+
+def ignora(observador):
+    '''Remove o registro de um observador.'''
+    _observadores.remove(observador)
+
+
+@contextlib.contextmanager
+def coleta():
+    '''Gerenciador de contexto que coleta (em uma lista) as medições das
+    chamadas feitas no bloco.'''
+    medicoes = []
+    observa(medicoes.append)
+    try:
+        yield medicoes
+    finally:
+        ignora(medicoes.append)
+
+
+def como_json(medicoes, **kwargs):
+    '''Retorna as medições dadas em formato JSON (kwargs são repassados para
+    json.dumps).'''
+    return json.dumps([m.como_dict() for m in medicoes], **kwargs)
+
+
+def atual():
+    '''Retorna a medição em andamento, ou None se não houver.'''
+    return _medicoes[-1] if _medicoes else None
+
+
+def mede(funcao):
+    '''Decorador de funções de extração (cujo primeiro argumento é o caminho
+    para o arquivo processado), medindo cada chamada enquanto houver
+    observadores. O tempo não atribuído a nenhuma fase é considerado como de
+    extração.'''
+    @functools.wraps(funcao)
+    def medida(arquivo, *args, **kwargs):
+        if not _observadores:
+            return funcao(arquivo, *args, **kwargs)
+
+        medicao = Medicao('{}.{}'.format(funcao.__module__,
+                                         funcao.__qualname__), arquivo)
+        _medicoes.append(medicao)
+        inicio = time.perf_counter()
+        try:
+            resultado = funcao(arquivo, *args, **kwargs)
+        finally:
+            medicao.duracao = time.perf_counter() - inicio
+            _medicoes.pop()
+
+        medido = sum(medicao.fases.values())
+        medicao.fases[EXTRACAO] = (medicao.fases.get(EXTRACAO, 0) +
+                                   medicao.duracao - medido)
+        for observador in list(_observadores):
+            observador(medicao)
+        return resultado
+    return medida
+
+
+def acumula(fase, duracao):
+    '''Acrescenta a duração dada à fase da medição em andamento.'''
+    medicao = atual()
+    if medicao:
+        medicao.fases[fase] = medicao.fases.get(fase, 0) + duracao
+        if medicao._filhos:
+            medicao._filhos[-1] += duracao
+
+
+@contextlib.contextmanager
+def fase(nome):
+    '''Gerenciador de contexto que atribui o tempo gasto no bloco à fase
+    dada da medição em andamento (se houver).'''
+    medicao = atual()
+    if not medicao:
+        yield
+        return
+
+    medicao._filhos.append(0.0)
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        decorrido = time.perf_counter() - inicio
+        aninhado = medicao._filhos.pop()
+        acumula(nome, decorrido - aninhado)
+        if medicao._filhos:  # O tempo aninhado já foi contabilizado.
+            medicao._filhos[-1] += aninhado
+
+
+def cronometra(nome, iteravel):
+    '''Retorna o iterável dado, atribuindo à fase dada o tempo gasto para
+    gerar cada item (descontado o tempo de fases aninhadas, como a de um
+    iterável que ele consuma). Sem medição em andamento, o próprio iterável é
+    retornado.'''
+    medicao = atual()
+    if not medicao:
+        return iteravel
+    return _cronometrado(medicao, nome, iter(iteravel))
+
+
+def _cronometrado(medicao, nome, iterador):
+    fases = medicao.fases
+    filhos = medicao._filhos
+    relogio = time.perf_counter
+    fases.setdefault(nome, 0.0)
+    while True:
+        filhos.append(0.0)
+        inicio = relogio()
+        try:
+            item = next(iterador)
+        except StopIteration:
+            return
+        finally:
+            decorrido = relogio() - inicio
+            fases[nome] += decorrido - filhos.pop()
+            if filhos:
+                filhos[-1] += decorrido
+        yield item
+
+
+def contabiliza(num_bytes=0, num_linhas=0):
+    '''Acrescenta a quantidade de bytes e linhas lidos à medição em
+    andamento.'''
+    medicao = atual()
+    if medicao:
+        medicao.bytes += num_bytes
+        medicao.linhas += num_linhas
+
+
+def registros(quantidade):
+    '''Define a quantidade de registros extraídos na medição em andamento.'''
+    medicao = atual()
+    if medicao:
+        medicao.registros = quantidade
@@ -6,10 +6,22 @@
 # Sistema de Graduação da UnB (SIGRA).
 
 
-import re
+from sigra import cache
+from sigra import metricas
 from sigra import utils
+from sigra import tokenizador
+from sigra.tokenizador import Tokenizador
 
 
+TOKENS = Tokenizador([
+    ('periodos', r' +(\d{4}/\d) +(\d{4}/\d) +(\d{4}/\d) +(\d{4}/\d)$',
+     tokenizador.DIGITOS),
+    ('estatistica', r' +\d+  (.*?)  +(\d+) +(\d+) +(\d+) +(\d+)'
+                    r' +(\d+) +(\d+) +(\d+) +(\d+)$', tokenizador.DIGITOS)])
+
+
+@metricas.mede
+@cache.armazena(versao=3)
 def estatisticas(arquivos):
     '''Retorna um dicionário com as informações de entrada/saída de alunos
     para cada período no(s) arquivo(s) de entrada.
@@ -19,37 +31,27 @@ def estatisticas(arquivos):
                 dados, que deve ser o relatório exportado via:
                 SIGRA > Planejamento > Curso > CUREGEP
     '''
-    def lista_periodos(line):
-        REGEX = r'^ +(\d{4}/\d) +(\d{4}/\d) +(\d{4}/\d) +(\d{4}/\d)$'
-        return re.search(REGEX, line)
-
-    def parse_periodos(line):
-        return list(lista_periodos(line).groups())
-
-    def lista_estatistica(line):
-        REGEX = r'^ +\d+  (.*?)  +(\d+) +(\d+) +(\d+) +(\d+)' \
-                ' +(\d+) +(\d+) +(\d+) +(\d+)$'
-        return re.search(REGEX, line)
-
-    def parse_estatistica(line):
-        return list(lista_estatistica(line).groups())
-
     stats = {}
     for arquivo in arquivos:
-        lines = utils.load(arquivo).split('\n')
+        tokens = list(TOKENS.tokens(utils.linhas(arquivo)))
+        num_tokens = len(tokens)
 
         i = 0
-        while not lista_periodos(lines[i]):
+        while i < num_tokens and tokens[i].tipo != 'periodos':
             i += 1
+        if i == num_tokens:
+            metricas.LOGGER.warning('%s ignorado (períodos não '
+                                    'encontrados).', arquivo)
+            continue
 
-        periodos = parse_periodos(lines[i])
+        periodos = list(tokens[i].grupos)
         for p in periodos:
             stats[p] = {}
 
-        while not lista_estatistica(lines[i]):
+        while i < num_tokens and tokens[i].tipo != 'estatistica':
             i += 1
-        while lista_estatistica(lines[i]):
-            estatistica = parse_estatistica(lines[i])
+        while i < num_tokens and tokens[i].tipo == 'estatistica':
+            estatistica = tokens[i].grupos
 
             s = 1
             for p in periodos:
@@ -59,6 +61,7 @@ def estatisticas(arquivos):
 
             i += 1
 
-    print('Estatísticas de {} semestres.'.format(len(stats)))
+    metricas.registros(len(stats))
+    metricas.LOGGER.info('Estatísticas de %s semestres.', len(stats))
 
     return stats
@@ -5,10 +5,27 @@
 # Funções de extração de informações de relatórios de Planejamento do Sistema
 # de Graduação da UnB (SIGRA).
 
-import re
+from sigra import cache
+from sigra import metricas
 from sigra import utils
+from sigra import tokenizador
+from sigra.tokenizador import Tokenizador
 
 
+TOKENS = Tokenizador([
+    ('disciplina', r' +([A-Z]{1,5}) +([A-Z]{2,})  +(.*?)  +(.*?)  +'
+                   r'(\d{3}) +(\d{3}) +(\d{3}) +(\d{3}) +(.*)$',
+     tokenizador.MAIUSCULAS),
+    ('requisito', r' {100,}(\d{6})$', tokenizador.DIGITOS),
+    ('operador', r' {100,}(E|OU)$', 'EO'),
+    ('codigo', r'.*?(\d{6})(.*)$')])
+
+PAGINACAO = utils.Paginacao('Relação de Disciplinas', '  --', 'lstdislst',
+                            alcance=1)
+
+
+@metricas.mede
+@cache.armazena(versao=4)
 def listagem(arquivo):
     '''Retorna um dicionário com as informações de cada disciplina
     ofertada, extraindo as informações do arquivo de entrada.
@@ -20,74 +37,49 @@ def listagem(arquivo):
 
     No caso de pré-requisitos, veja a função utils.parse_pre_requisitos.
     '''
-    def preprocess(content):
-        HEADER = r'Universidade de Brasília.*[\s\S]*?Relação de Disciplinas.*?'
-        FOOTER = r'  --+[\s\S].*lstdislst'
-
-        content = re.sub(HEADER, '', content)
-        content = re.sub(FOOTER, '', content)
-
-        return [line for line in content.split('\n') if line.strip()]
-
-    def eh_disciplina(line):
-        REGEX = r'^ +([A-Z]{1,5}) +([A-Z]{2,})  +(.*?)  +(.*?)  +' \
-                '(\d{3}) +(\d{3}) +(\d{3}) +(\d{3}) +(.*)$'
-        return re.search(REGEX, line)
-
-    def eh_pre_req(line):
-        return re.search(r'^  +([A-z]{3})$', line)
+    def parse_disciplina(token):
+        orgao, nivel, nome, rest, teoria, pratica, extensao, estudo, domi = \
+            (g.strip() for g in token.grupos)
+        creditos = utils.Creditos(teoria, pratica, extensao, estudo)
+        return orgao, nivel, nome.title(), rest, creditos, domi
 
-    def parse_disciplina(line):
-        m = eh_disciplina(line)
-        orgao = m.group(1).strip()
-        nivel = m.group(2).strip()
-        nome = m.group(3).strip().title()
-        rest = m.group(4).strip()
-        creditos = utils.Creditos.to_string(m.group(5).strip(),
-                                            m.group(6).strip(),
-                                            m.group(7).strip(),
-                                            m.group(8).strip())
-        domi = m.group(9)
-        return orgao, nivel, nome, rest, creditos, domi
-
-    lines = preprocess(utils.load(arquivo))
+    tokens = TOKENS.tokens(PAGINACAO.remove(utils.linhas(arquivo)))
+    next(tokens, None)
 
     relacao = {}
-    i = 1
-    num_lines = len(lines)
-    while i < num_lines:
-        if eh_disciplina(lines[i]):
-            # No caso de disciplinas "repetidas", considera apenas a última
-            # informação. Ex: 181315 que é listada em ADM e EPR.
-            (orgao, nivel, nome, rest,
-             creditos, domi) = parse_disciplina(lines[i])
-            i += 1
-            codigo, resto_do_nome = re.search(r'(\d{6})(.*)',
-                                              lines[i]).groups()
-            if resto_do_nome:
-                nome += ' ' + resto_do_nome.strip().title()
-
-            i += 1
-
-            pre_reqs = ''
-            while i < num_lines and not eh_disciplina(lines[i]):
-                m = re.search(r'^ {100,}(\d{6})$', lines[i])
-                if m:
-                    pre_reqs += m.group(1)
-                else:
-                    m = re.search(r'^ {100,}(E|OU)$', lines[i])
-                    if m:
-                        pre_reqs += m.group(1)
-                i += 1
-            i -= 1  # Saiu da repetição, mas será incrementado novamente
-
-            pre_reqs = utils.parse_pre_requisitos(pre_reqs)
-            relacao[codigo] = {'Nome': nome,
-                               'Órgão': orgao,
-                               'Créditos': creditos,
-                               'Pré-requisitos': pre_reqs}
-
-        i += 1
-
-    print('{} disciplinas listadas.'.format(len(relacao)))
+    token = next(tokens, None)
+    while token:
+        if token.tipo != 'disciplina':
+            token = next(tokens, None)
+            continue
+
+        # No caso de disciplinas "repetidas", considera apenas a última
+        # informação. Ex: 181315 que é listada em ADM e EPR.
+        orgao, nivel, nome, rest, creditos, domi = parse_disciplina(token)
+        token = next(tokens, None)
+        if token is None:
+            break
+        if token.tipo != 'codigo':  # Disciplina incompleta, ignorada.
+            continue
+        codigo, resto_do_nome = token.grupos
+        if resto_do_nome:
+            nome += ' ' + resto_do_nome.strip().title()
+
+        pre_reqs = ''
+        for token in tokens:
+            if token.tipo == 'disciplina':
+                break
+            if token.tipo in ('requisito', 'operador'):
+                pre_reqs += token.grupos[0]
+        else:
+            token = None
+
+        pre_reqs = utils.parse_pre_requisitos(pre_reqs)
+        relacao[codigo] = {'Nome': nome,
+                           'Órgão': orgao,
+                           'Créditos': creditos,
+                           'Pré-requisitos': pre_reqs}
+
+    metricas.registros(len(relacao))
+    metricas.LOGGER.info('%s disciplinas listadas.', len(relacao))
     return relacao
@@ -6,11 +6,16 @@
 # Sistema de Graduação da UnB (SIGRA).
 
 
-import re
+from sigra import cache
+from sigra import metricas
 from sigra import utils
+from sigra import tokenizador
+from sigra.tokenizador import Tokenizador
 
 
-class PeriodoDoFluxo():
+class PeriodoDoFluxo(utils.Registro):
+    __slots__ = ('numero', 'creditos', 'disciplinas')
+
     def __init__(self, numero, creditos, disciplinas={}):
         self.numero = numero
         self.creditos = creditos
@@ -26,6 +31,23 @@ class PeriodoDoFluxo():
                                                    disciplinas)
 
 
+TOKENS = Tokenizador([
+    ('periodo', r' +Período: +?(\d{1,3}) +? Número de Créditos: +?(\d{1,3})$',
+     'P'),
+    ('modalidade', r' +\d{1,3} + (\w{3}) +\w$', tokenizador.DIGITOS),
+    ('continuacao', r' {120,}[\w\d]'),
+    ('disciplina', r' +(\w{1,3})  +(\d{6})  +(\w.*)$'),
+    ('credito', r'.*?(\d{3})')])
+
+# Tipos das linhas que seguem a modalidade de cada disciplina.
+_TIPOS_DA_DISCIPLINA = ('disciplina',) + ('credito',) * 4
+
+PAGINACAO = utils.Paginacao('Listagem de Fluxo de Curso - Dados Completos',
+                            ' -----', 'lstflulst', alcance=2)
+
+
+@metricas.mede
+@cache.armazena(versao=4)
 def listagem(arquivo):
     '''Retorna um dicionário com as informações das disciplinas listadas no
     fluxo em cada período, extraindo as informações do arquivo de entrada.
@@ -35,100 +57,69 @@ def listagem(arquivo):
                o relatório exportado via:
                SIGRA > Planejamento > Fluxo > FLULST
     '''
-    def eh_novo_periodo(line):
-        return parse_pre_requisitos(line) is not None
-
-    def eh_modalidade(line):
-        return re.search(r'^ +\d{1,3} + (\w{3}) +\w$', line)
-
-    def eh_pre_requisito(line):
-        return not (eh_novo_periodo(line) or eh_modalidade(line))
-
-    def parse_credito(line):
-        m = re.search(r'(\d{3})', line)
-        return str(int(m.group(1)))
-
-    def parse_disciplina(line):
-        m = re.search(r'^ +?(\w{1,3}) +? (\d{6}) +? (\w.*)$', line)
-        return m.group(1), m.group(2), m.group(3)
-
-    def parse_pre_requisitos(line):
-        m = re.search(r'^ +Período: +?(\d{1,3})'
-                      ' +? Número de Créditos: +?(\d{1,3})$', line)
-        if m:
-            return int(m.group(1)), int(m.group(2))
-        else:
-            return None
-
-    def parse_modalidade(line):
-        m = eh_modalidade(line)
-        return m.group(1)
-
-    def preprocess(content):
-        HEADER = r'Universidade de Brasília.*[\s\S]*?' \
-                 'Listagem de Fluxo de Curso - Dados Completos.*[\s\S]*?'
-        FOOTER = r'^ + -{5,}[\s\S]+?lstflulst[\s\S]'
-
-        content = re.sub(HEADER, '', content)
-        content = re.sub(FOOTER, '', content)
-
-        return [line for line in content.split('\n') if line]
+    def eh_limite(token):
+        return token.tipo in ('periodo', 'modalidade')
 
-    lines = preprocess(utils.load(arquivo))
+    linhas = PAGINACAO.remove(utils.linhas(arquivo), mantem_espacos=True)
+    tokens = list(TOKENS.tokens(linhas))
 
     fluxo = {}
     i = 1
-    num_lines = len(lines)
-    while i < num_lines:
-        if eh_novo_periodo(lines[i]):
-            p, num_creditos = parse_pre_requisitos(lines[i])
+    num_tokens = len(tokens)
+    while i < num_tokens:
+        if tokens[i].tipo == 'periodo':
+            p, num_creditos = (int(g) for g in tokens[i].grupos)
             disciplinas = {}
 
             i += 3  # Pulando o cabeçalho
 
-            while i < num_lines:
-                if eh_novo_periodo(lines[i]):
+            while i < num_tokens:
+                if tokens[i].tipo == 'periodo':
                     i -= 1
                     break
 
-                if eh_modalidade(lines[i]):
-                    tipo = parse_modalidade(lines[i])
+                if (tokens[i].tipo == 'modalidade' and
+                        _TIPOS_DA_DISCIPLINA == tuple(
+                            token.tipo for token in tokens[i + 1:i + 6])):
+                    tipo = tokens[i].grupos[0]
                     if tipo not in disciplinas:
                         disciplinas[tipo] = {}
 
                     i += 1
-                    dept, codigo, nome = parse_disciplina(lines[i])
-                    creditos = utils.Creditos(parse_credito(lines[i + 1]),
-                                              parse_credito(lines[i + 2]),
-                                              parse_credito(lines[i + 3]),
-                                              parse_credito(lines[i + 4]))
+                    dept, codigo, nome = tokens[i].grupos
+                    creditos = utils.Creditos(tokens[i + 1].grupos[0],
+                                              tokens[i + 2].grupos[0],
+                                              tokens[i + 3].grupos[0],
+                                              tokens[i + 4].grupos[0])
 
                     i += 5
                     pr = ''
-                    while i < num_lines:
-                        if not eh_pre_requisito(lines[i]):
+                    while i < num_tokens:
+                        if eh_limite(tokens[i]):
                             i -= 1
                             break
 
-                        pr += ' '.join([lines[i].strip(),
-                                        lines[i + 1].strip()])
+                        pr += ' '.join(token.linha.strip()
+                                       for token in tokens[i:i + 2])
                         i += 2
 
-                        while (i < num_lines and
-                               re.search(r'^ {120,}[\w\d].*?$', lines[i])):
-                            pr += ' ' + lines[i].strip()
+                        while (i < num_tokens and
+                               tokens[i].tipo == 'continuacao'):
+                            pr += ' ' + tokens[i].linha.strip()
                             i += 1
 
-                    pr = utils.parse_pre_requisitos(pr)
-                    disciplinas[tipo][codigo] = utils.Disciplina(dept,
-                                                                 codigo,
-                                                                 nome.title(),
-                                                                 creditos,
-                                                                 pr)
+                    with metricas.fase(metricas.POS_PROCESSAMENTO):
+                        pr = utils.parse_pre_requisitos(pr)
+                        disciplinas[tipo][codigo] = utils.Disciplina(
+                            dept, codigo, nome.title(), creditos, pr)
 
                 i += 1
 
-            fluxo[p] = PeriodoDoFluxo(p, num_creditos, disciplinas)
+            with metricas.fase(metricas.POS_PROCESSAMENTO):
+                fluxo[p] = PeriodoDoFluxo(p, num_creditos, disciplinas)
         i += 1
 
+    metricas.registros(sum(len(disciplinas)
+                           for periodo in fluxo.values()
+                           for disciplinas in periodo.disciplinas.values()))
     return fluxo
@@ -6,33 +6,73 @@
 # Sistema de Graduação da UnB (SIGRA).
 
 
+import functools
+import hashlib
 import re
+
+from sigra import cache
+from sigra import metricas
 from sigra import utils
+from sigra import tokenizador
+from sigra.tokenizador import Tokenizador
 
 
-class Aula():
+class Aula(utils.Registro):
     DIAS = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta',
             'Sábado', 'Domingo']
     HORARIOS = ['08:00 09:50', '10:00 11:50', '12:00 13:50', '16:00 17:50',
                 '18:00 19:50', '19:00 20:40', '20:50 22:30']
 
+    __slots__ = ('dia', 'horario', 'local')
+
     def __init__(self, dia, horario, local):
         self.dia = dia
         self.horario = horario
         self.local = local
 
+    # Os horários da semana são divididos em intervalos de 10 minutos, e o
+    # bit (dia * INTERVALOS_POR_DIA + intervalo) indica se há aula nele.
+    MINUTOS_POR_INTERVALO = 10
+    INTERVALOS_POR_DIA = 24 * 60 // MINUTOS_POR_INTERVALO
+
     def __lt__(self, other):
         if self.dia == other.dia:
             return self.horario < other.horario
-        return Aula.DIAS.index(self.dia) < Aula.DIAS.index(other.dia)
+        return _ORDEM_DOS_DIAS[self.dia] < _ORDEM_DOS_DIAS[other.dia]
+
+    @property
+    def mascara(self):
+        '''Máscara de bits dos intervalos da semana ocupados pela aula.'''
+        return mascara_de_horario(self.dia, self.horario)
 
     def __repr__(self):
         return '{} {} ({})'.format(self.dia, self.horario, self.local)
 
 
-class TurmaOfertada():
+_ORDEM_DOS_DIAS = {dia: i for i, dia in enumerate(Aula.DIAS)}
+
+
+@functools.lru_cache(maxsize=None)
+def mascara_de_horario(dia, horario):
+    '''Retorna a máscara de bits dos intervalos da semana ocupados por uma
+    aula no dia e horário (como '08:00 09:50') dados.'''
+    inicio, fim = (int(h) * 60 + int(m)
+                   for h, m in (t.split(':') for t in horario.split()))
+    primeiro = inicio // Aula.MINUTOS_POR_INTERVALO
+    ultimo = -(-fim // Aula.MINUTOS_POR_INTERVALO)  # Arredonda para cima.
+    deslocamento = _ORDEM_DOS_DIAS[dia] * Aula.INTERVALOS_POR_DIA
+    return ((1 << (ultimo - primeiro)) - 1) << (deslocamento + primeiro)
+
+
+class TurmaOfertada(utils.Registro):
+    '''Turma de uma disciplina ofertada. A máscara indica os intervalos da
+    semana ocupados por suas aulas (veja Aula.mascara), de forma que duas
+    turmas têm choque de horário se (a.mascara & b.mascara) != 0.'''
+    __slots__ = ('turma', 'descricao', 'vagas', 'turno', 'aulas',
+                 'professores', 'reserva', 'observacoes', 'mascara')
+
     def __init__(self, turma, descricao, vagas, turno, aulas,
-                 professores, reserva='', observacoes=''):
+                 professores, reserva='', observacoes='', mascara=0):
         self.turma = turma
         self.descricao = descricao
         self.vagas = vagas
@@ -41,6 +81,7 @@ class TurmaOfertada():
         self.professores = professores
         self.reserva = reserva
         self.observacoes = observacoes
+        self.mascara = mascara
 
     def __repr__(self):
         aulas = '\n\t\t'.join(str(aula) for aula in self.aulas)
@@ -48,6 +89,8 @@ class TurmaOfertada():
 
 
 class DisciplinaOfertada(utils.Disciplina):
+    __slots__ = ('turmas',)
+
     def __init__(self, depto, codigo, nome, creditos,
                  pre_requisitos=[], turmas={}):
         super().__init__(depto, codigo, nome, creditos, pre_requisitos)
@@ -58,9 +101,184 @@ class DisciplinaOfertada(utils.Disciplina):
         return '{}\n\t{}'.format(super().__repr__(), turmas)
 
 
+class Oferta(dict):
+    '''Dicionário com a DisciplinaOfertada de cada código, indexado para
+    consultas por professor, reserva, horário e local.
+
+    Os índices associam cada chave às turmas (pares (código, turma)) ou aulas
+    (triplas (código, turma, Aula)) correspondentes, na ordem da oferta. Eles
+    são construídos, em uma única passada, na primeira consulta; alterações
+    posteriores na oferta só são consideradas após uma chamada a reindexa.
+    '''
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._indices = None
+
+    def __reduce__(self):
+        # Os índices são reconstruídos quando necessário, não armazenados.
+        return (Oferta, (dict(self),))
+
+    @property
+    def por_professor(self):
+        '''Dicionário nome do(a) professor(a) -> lista de turmas.'''
+        return self._indexa()['professor']
+
+    @property
+    def por_reserva(self):
+        '''Dicionário habilitação -> lista de turmas com vagas reservadas.'''
+        return self._indexa()['reserva']
+
+    @property
+    def por_horario(self):
+        '''Dicionário (dia, horário) -> lista de turmas com aula no
+        horário.'''
+        return self._indexa()['horario']
+
+    @property
+    def por_local(self):
+        '''Dicionário local -> lista de aulas.'''
+        return self._indexa()['local']
+
+    def reindexa(self):
+        '''Descarta os índices, que serão reconstruídos na próxima
+        consulta.'''
+        self._indices = None
+
+    def turma(self, codigo, turma):
+        '''Retorna a TurmaOfertada da disciplina dada.'''
+        return self[codigo].turmas[turma]
+
+    def professores(self, nome):
+        '''Retorna a lista dos nomes de professores(as) que correspondem ao
+        nome (ou parte dele) dado, sem distinção de maiúsculas/minúsculas
+        nem de acentos (veja utils.IndiceDeNomes).'''
+        return self._indexa()['nomes'].busca(nome)
+
+    def reservadas(self, habilitacao=''):
+        '''Retorna o conjunto de turmas com reserva para as habilitações
+        cujo nome (em minúsculas) contém o texto dado.'''
+        return {turma
+                for nome, turmas in self.por_reserva.items()
+                if habilitacao in nome.lower()
+                for turma in turmas}
+
+    def conflitos(self, turmas):
+        '''Retorna a lista dos pares de turmas, de disciplinas diferentes,
+        com choque de horário.
+
+        Argumentos:
+        turmas -- iterável de turmas (pares (código, turma)) a considerar.
+        '''
+        # Muitas turmas têm os mesmos horários, então basta comparar as
+        # máscaras distintas entre si.
+        por_mascara = {}
+        for codigo, t in set(turmas):
+            mascara = self.turma(codigo, t).mascara
+            if mascara:
+                por_mascara.setdefault(mascara, []).append((codigo, t))
+
+        mascaras = list(por_mascara)
+        conflitos = []
+        for i, mascara in enumerate(mascaras):
+            grupo = por_mascara[mascara]
+            conflitos.extend((a, b) for a in grupo for b in grupo
+                             if a < b and a[0] != b[0])
+            for outra in mascaras[i + 1:]:
+                if mascara & outra:
+                    conflitos.extend((min(a, b), max(a, b))
+                                     for a in grupo
+                                     for b in por_mascara[outra]
+                                     if a[0] != b[0])
+        return sorted(conflitos)
+
+    def _indexa(self):
+        if self._indices is None:
+            professor, reserva, horario, local = {}, {}, {}, {}
+            for codigo, disciplina in self.items():
+                for t, turma in disciplina.turmas.items():
+                    chave = (codigo, t)
+                    for nome in turma.professores:
+                        professor.setdefault(nome, []).append(chave)
+                    for habilitacao in turma.reserva:
+                        reserva.setdefault(habilitacao, []).append(chave)
+                    for aula in turma.aulas:
+                        horario.setdefault((aula.dia, aula.horario),
+                                           []).append(chave)
+                        local.setdefault(aula.local, []).append(
+                            (codigo, t, aula))
+            self._indices = {'professor': professor, 'reserva': reserva,
+                             'horario': horario, 'local': local,
+                             'nomes': utils.IndiceDeNomes(professor)}
+        return self._indices
+
+
+_DIA = r'(Segunda|Terça|Quarta|Quinta|Sexta|Sábado|Domingo)'
+_HORARIO = r'(\d\d:\d\d \d\d:\d\d)'
+
+_LIMITES_DAS_DISCIPLINAS = [('centro_de_custo', r'(\w+.*?)    -  (\w+.*?)$'),
+                            ('disciplina', r' (.{10,14}) -  (\w.*)$')]
+
+TOKENS = Tokenizador(_LIMITES_DAS_DISCIPLINAS + [
+    ('cabecalho_de_turmas', r'   Turma', 'T'),
+    ('turma', r'  ([A-Z]{1,2}) (.*?) (\d+) +(Diurno|Noturno|Ambos) *'
+              r'(?:' + _DIA + ' +' + _HORARIO + r' (.*?)  +(.*?)|(.*?)) *$',
+     tokenizador.MAIUSCULAS),
+    ('aula', r'(.*)' + _DIA + ' +' + _HORARIO + ' (.*)$')])
+
+# Apenas os limites entre as disciplinas (veja OfertaIncremental).
+_LIMITES = Tokenizador(_LIMITES_DAS_DISCIPLINAS)
+
+# Extraídos apenas das linhas entre a disciplina e o cabeçalho das turmas.
+_CREDITOS = re.compile(r'(\d{3})  -   (\d{3})   -   (\d{3})  -   (\d{3})')
+_PRE_REQUISITOS = re.compile(r'(\w{3}-\d{6}  .*$)')
+
+PAGINACAO = utils.Paginacao(r'Período :.*\d{4}/\d', ' Observações :',
+                            'lstofelst')
+
+PERIODO_OFERTADO = re.compile(r'Período : *(\d{4}/\d)')
+
+
+def periodo_ofertado(arquivo):
+    '''Retorna o período letivo da oferta (indicado no cabeçalho do
+    relatório), ou None se não for encontrado.
+
+    Argumentos:
+    arquivo -- caminho para o arquivo (UTF-16) contendo os dados, que deve ser
+               o relatório exportado via:
+               SIGRA > Planejamento > Oferta > OFELST
+    '''
+    for linha in utils.linhas(arquivo):
+        match = PERIODO_OFERTADO.search(linha)
+        if match:
+            return match.group(1)
+    return None
+
+
+def iter_oferta(arquivo):
+    '''Gera as informações de cada disciplina ofertada, à medida que o
+    arquivo de entrada é lido, sem carregá-lo completamente na memória.
+
+    Cada disciplina é gerada assim que a listagem de suas turmas termina. Uma
+    disciplina listada em mais de um trecho do relatório é gerada uma vez para
+    cada trecho (veja a função listagem).
+
+    Argumentos:
+    arquivo -- caminho para o arquivo (UTF-16) contendo os dados, que deve ser
+               o relatório exportado via:
+               SIGRA > Planejamento > Oferta > OFELST
+
+    No caso de pré-requisitos, veja a função utils.parse_pre_requisitos.
+    '''
+    linhas = PAGINACAO.remove(utils.linhas(arquivo), mantem_espacos=True)
+    for centro_de_custo, bloco in _blocos(TOKENS.tokens(linhas)):
+        yield _parse_bloco(centro_de_custo, bloco)
+
+
+@metricas.mede
+@cache.armazena(versao=6)
 def listagem(arquivo):
-    '''Retorna um dicionário com as informações de cada disciplina
-    ofertada, extraindo as informações do arquivo de entrada.
+    '''Retorna uma Oferta (dicionário indexado) com as informações de cada
+    disciplina ofertada, extraindo as informações do arquivo de entrada.
 
     Argumentos:
     arquivo -- caminho para o arquivo (UTF-16) contendo os dados, que deve ser
@@ -71,204 +289,346 @@ def listagem(arquivo):
 
     @to-do Separação por centro de custo.
     '''
-    def preprocess(content):
-        HEADER = r'Universidade de Brasília.*[\s\S]*?' \
-                 'Período :.*\d{4}/\d.*[\s\S]'
-        FOOTER = r' Observações :[.*|\s\S]+?lstofelst'
+    disciplinas = list(iter_oferta(arquivo))
+
+    oferta = Oferta()
+    with metricas.fase(metricas.POS_PROCESSAMENTO):
+        for disciplina in disciplinas:
+            codigo = disciplina.codigo
+            if codigo in oferta:
+                oferta[codigo].pre_requisitos = disciplina.pre_requisitos
+                oferta[codigo].turmas.update(disciplina.turmas)
+            else:
+                oferta[codigo] = disciplina
 
-        content = re.sub(HEADER, '', content)
-        content = re.sub(FOOTER, '', content)
+    num_disciplinas = len(oferta)
+    num_turmas = sum(len(oferta[codigo].turmas) for codigo in oferta)
+    metricas.registros(num_turmas)
+    metricas.LOGGER.info('%s disciplinas (%s turmas) ofertadas.',
+                         num_disciplinas, num_turmas)
 
-        return [line for line in content.split('\n') if line]
+    return oferta
 
-    def eh_centro_de_custo(line):
-        return re.search(r'^(\w+.*?)    -  (\w+.*?)$', line)
 
-    def eh_disciplina(line):
-        return re.search(r'^ .{10,14} -  \w+', line)
+class Alteracoes():
+    '''Diferenças entre duas versões da oferta.
 
-    def eh_nova_turma(line):
-        REGEX = r'^  ([A-Z]{1,2}) .*?(\d+) +(Diurno|Noturno|Ambos)'
-        return re.search(REGEX, line)
+    Atributos:
+    incluidas -- lista dos códigos das disciplinas incluídas.
+    removidas -- lista dos códigos das disciplinas removidas.
+    turmas_incluidas -- lista das turmas (pares (código, turma)) incluídas em
+                        disciplinas que já eram ofertadas.
+    turmas_removidas -- lista das turmas removidas de disciplinas que
+                        continuam ofertadas.
+    modificacoes -- dicionário com as alterações de cada disciplina (código)
+                    ou turma (par (código, turma)) presente em ambas as
+                    versões, na forma {campo: (antes, depois)}.
+    '''
+    def __init__(self):
+        self.incluidas = []
+        self.removidas = []
+        self.turmas_incluidas = []
+        self.turmas_removidas = []
+        self.modificacoes = {}
+
+    def __bool__(self):
+        return bool(self.incluidas or self.removidas or
+                    self.turmas_incluidas or self.turmas_removidas or
+                    self.modificacoes)
 
-    def parse_centro_de_custo(line):
-        centro, nome = line.split('  -  ')
-        return centro.strip(), nome.strip().title()
+    def __repr__(self):
+        return ('{} disciplina(s) incluída(s), {} removida(s); {} turma(s) '
+                'incluída(s), {} removida(s); {} modificação(ões).'.format(
+                    len(self.incluidas), len(self.removidas),
+                    len(self.turmas_incluidas), len(self.turmas_removidas),
+                    len(self.modificacoes)))
 
-    def parse_creditos(line):
-        CREDITOS = r'(\d{3})  -   (\d{3})   -   (\d{3})  -   (\d{3})'
-        m = re.search(CREDITOS, line)
-        return utils.Creditos(m.group(1), m.group(2), m.group(3), m.group(4))
 
-    def parse_disciplina(line):
-        codigo, nome = line.split('  -  ')
-        return codigo.strip(), nome.strip().title()
+class OfertaIncremental():
+    '''Acompanha as sucessivas exportações de uma mesma oferta (como durante
+    o período de matrícula), processando apenas o que mudou.
 
-    def parse_pre_requisitos(line):
-        m = re.search(r'(\w{3}-\d{6}  .*$)', line)
-        return m.group(0) if m else ''
+    O relatório é dividido nos trechos de cada disciplina, identificados pelo
+    resumo (hash) de seu conteúdo. Apenas os trechos cujo resumo não constava
+    na versão anterior são processados, e as alterações são calculadas apenas
+    para as disciplinas desses trechos (ou dos que deixaram de existir).
 
-    def parse_Prof_Reserva_Obs(line):
-        professor = ''
-        reserva = {}
-        obs = ''
+    Por exemplo:
 
-        partes = [p.strip() for p in line.split('   ') if p.strip()]
+        acompanhamento = OfertaIncremental()
+        acompanhamento.atualiza('OFELST.txt')
+        ...
+        alteracoes = acompanhamento.atualiza('OFELST.txt')
+        print(alteracoes.modificacoes)
 
-        for parte in partes:
-            m = re.search(r'^(.*)/(\d+)$', parte)
-            if m:
-                reserva[m.group(1)] = int(m.group(2))
+    As disciplinas de trechos inalterados são compartilhadas entre as
+    versões, e não devem ser alteradas.
+    '''
+    def __init__(self):
+        self.oferta = Oferta()
+        self._trechos = {}  # resumo: (código, DisciplinaOfertada)
+
+    def atualiza(self, arquivo):
+        '''Atualiza a oferta com o conteúdo do arquivo dado, retornando as
+        Alteracoes em relação à versão anterior.
+
+        Argumentos:
+        arquivo -- caminho para o arquivo (UTF-16) contendo os dados, que
+                   deve ser o relatório exportado via:
+                   SIGRA > Planejamento > Oferta > OFELST
+        '''
+        linhas = PAGINACAO.remove(utils.linhas(arquivo), mantem_espacos=True)
+        trechos, resumos = {}, []
+        for centro_de_custo, bloco in _blocos(_LIMITES.tokens(linhas)):
+            conteudo = [token.linha for token in bloco]
+            h = hashlib.blake2b(digest_size=16)
+            h.update(str(centro_de_custo).encode())
+            for linha in conteudo:
+                h.update(b'\n' + linha.encode())
+            resumo = h.digest()
+
+            if resumo in self._trechos:
+                trechos[resumo] = self._trechos[resumo]
+            elif resumo not in trechos:
+                tokens = list(TOKENS.tokens(conteudo))
+                disciplina = _parse_bloco(centro_de_custo, tokens)
+                trechos[resumo] = (disciplina.codigo, disciplina)
+            resumos.append(resumo)
+
+        novos = trechos.keys() - self._trechos.keys()
+        afetadas = {trechos[r][0] for r in novos}
+        afetadas.update(self._trechos[r][0]
+                        for r in self._trechos.keys() - trechos.keys())
+        metricas.LOGGER.info('%s de %s trechos processados.', len(novos),
+                             len(resumos))
+
+        oferta, copiadas = Oferta(), set()
+        for resumo in resumos:
+            codigo, disciplina = trechos[resumo]
+            if codigo in oferta:  # Disciplina listada em mais de um trecho.
+                if codigo not in copiadas:
+                    oferta[codigo] = _copia(oferta[codigo])
+                    copiadas.add(codigo)
+                oferta[codigo].pre_requisitos = disciplina.pre_requisitos
+                oferta[codigo].turmas.update(disciplina.turmas)
             else:
-                m = re.search(r'^(\*+)$', parte)
-                if m:
-                    obs = m.group(1)
-                else:
-                    professor = parte
-        return professor, reserva, obs
-
-    def parse_turma(line):
-        TURNO = r'(Diurno|Noturno|Ambos)'
-        DIA = r'(Segunda|Terça|Quarta|Quinta|Sexta|Sábado|Domingo)'
-        HORARIO = r'(\d\d:\d\d \d\d:\d\d)'
-        REGEX = r'^ +([A-Z]{1,3}) (.*?) (\d+) +' + TURNO + '(.*)'
-
-        m = re.search(REGEX, line)
-        if m:  # nova turma
-            t = m.group(1)
-            descricao = m.group(2).strip()
-            vagas = int(m.group(3))
-            turno = m.group(4)
-            restante = m.group(5).strip()
-
-            m = re.search(DIA + ' +' + HORARIO + ' (.*?)  +(.*)', restante)
-            if m:
-                dia = m.group(1)
-                horario = m.group(2)
-                local = m.group(3)
-                restante = m.group(4)
+                oferta[codigo] = disciplina
+
+        alteracoes = _compara(self.oferta, oferta, sorted(afetadas))
+        self.oferta, self._trechos = oferta, trechos
+        return alteracoes
+
+
+def _copia(disciplina):
+    return DisciplinaOfertada(disciplina.depto, disciplina.codigo,
+                              disciplina.nome, disciplina.creditos,
+                              disciplina.pre_requisitos,
+                              dict(disciplina.turmas))
+
+
+def _compara(anterior, atual, codigos):
+    '''Retorna as Alteracoes entre as versões da oferta, considerando
+    apenas as disciplinas dadas.'''
+    alteracoes = Alteracoes()
+    for codigo in codigos:
+        if codigo not in anterior:
+            if codigo in atual:
+                alteracoes.incluidas.append(codigo)
+            continue
+        if codigo not in atual:
+            alteracoes.removidas.append(codigo)
+            continue
+
+        antes, depois = anterior[codigo], atual[codigo]
+        diferencas = _diferencas(antes, depois, ('depto', 'nome', 'creditos',
+                                                 'pre_requisitos'))
+        if diferencas:
+            alteracoes.modificacoes[codigo] = diferencas
+
+        for t in sorted(antes.turmas.keys() | depois.turmas.keys()):
+            if t not in depois.turmas:
+                alteracoes.turmas_removidas.append((codigo, t))
+            elif t not in antes.turmas:
+                alteracoes.turmas_incluidas.append((codigo, t))
             else:
-                dia, horario, local = '', '', ''
-
-            professor, reserva, obs = parse_Prof_Reserva_Obs(restante)
-        else:
-            t = ''
-            vagas = ''
-            turno = ''
-
-            m = re.search(r'(.*)' + DIA + ' +' + HORARIO + ' (.*)', line)
-            if m:  # tem dia
-                descricao = m.group(1).strip()
-                dia = m.group(2)
-                horario = m.group(3)
-                restante = m.group(4).strip()
-
-                if '  ' in restante:  # tem professor ou reserva ou obs
-                    i = restante.index('  ')
-                    local = restante[:i]
-                    restante = restante[i:].strip()
-                    professor, reserva, obs = parse_Prof_Reserva_Obs(restante)
+                diferencas = _diferencas(antes.turmas[t], depois.turmas[t],
+                                         ('descricao', 'vagas', 'turno',
+                                          'aulas', 'professores', 'reserva',
+                                          'observacoes'))
+                if diferencas:
+                    alteracoes.modificacoes[(codigo, t)] = diferencas
+    return alteracoes
+
+
+def _diferencas(antes, depois, campos):
+    diferencas = {}
+    for campo in campos:
+        a, d = getattr(antes, campo), getattr(depois, campo)
+        if _comparavel(a) != _comparavel(d):
+            diferencas[campo] = (a, d)
+    return diferencas
+
+
+def _comparavel(valor):
+    if isinstance(valor, utils.Registro):
+        return {chave: _comparavel(v) for chave, v in valor.items()}
+    if isinstance(valor, list):
+        return [_comparavel(v) for v in valor]
+    return valor
+
+
+def _blocos(tokens):
+    '''Agrupa os tokens referentes a cada disciplina, gerando o centro de
+    custo e os tokens de cada uma.'''
+    centro_de_custo = None
+    bloco = []
+
+    tokens = iter(tokens)
+    for token in tokens:
+        if token.tipo == 'centro_de_custo':
+            if bloco:
+                yield centro_de_custo, bloco
+                bloco = []
+            centro_de_custo = token.grupos[0].strip()
+            next(tokens, None)
+        elif token.tipo == 'disciplina':
+            if bloco:
+                yield centro_de_custo, bloco
+            bloco = [token]
+        elif bloco:
+            bloco.append(token)
+
+    if bloco:
+        yield centro_de_custo, bloco
+
+
+def _parse_bloco(centro_de_custo, tokens):
+    '''Extrai as informações de uma disciplina a partir dos tokens de seu
+    trecho do relatório.'''
+    codigo, nome = tokens[0].grupos
+    disciplina = DisciplinaOfertada(centro_de_custo,
+                                    codigo.strip(),
+                                    nome.strip().title(),
+                                    utils.Creditos(*_CREDITOS.search(
+                                        tokens[1].linha).groups()),
+                                    [],
+                                    {})
+
+    # ### Pré-requisitos ###
+    i = 1
+    num_tokens = len(tokens)
+    pre_reqs = ''
+    while i < num_tokens and tokens[i].tipo != 'cabecalho_de_turmas':
+        m = _PRE_REQUISITOS.search(tokens[i].linha)
+        if m:
+            pre_reqs += m.group(0)
+
+        i += 1
+
+    p = []
+    for opcoes in pre_reqs.split('OU'):
+        p.append(re.findall(r'\d{6}', opcoes))
+    disciplina.pre_requisitos = p
+    # ### Pré-requisitos ###
+
+    # ### Turmas ###
+    turmas = disciplina.turmas
+
+    i += 1
+    while i < num_tokens and tokens[i].tipo == 'turma':
+        t, info = _parse_nova_turma(tokens[i].grupos)
+        turmas[t] = info
+
+        i += 1
+        while i < num_tokens and tokens[i].tipo != 'turma':
+            info = _parse_complemento_da_turma(tokens[i])
+
+            if info.descricao:
+                turmas[t].descricao += ' ' + info.descricao
+            if info.aulas:
+                turmas[t].aulas += info.aulas
+                turmas[t].aulas.sort()
+            if info.professores:
+                if len(info.professores.split()) == 1:
+                    # Supondo que haja um professor com nome muito longo, a
+                    # última parte se estende em uma nova linha.
+                    turmas[t].professores += ' ' + info.professores
                 else:
-                    local = restante
-                    professor, reserva, obs = '', '', ''
+                    # É um nome composto de pelo menos duas partes, supõe-se
+                    # que seja de um novo professor.
+                    turmas[t].professores += ',' + info.professores
+            if info.reserva:
+                turmas[t].reserva.update(info.reserva)
+            if info.observacoes:
+                turmas[t].observacoes += ' ' + info.observacoes
 
-            else:
-                descricao = line[7:36].strip()
-                dia, horario, local = '', '', ''
-                professor, reserva, obs = '', '', ''
-                if len(line) > 36:
-                    professor, reserva, obs = parse_Prof_Reserva_Obs(line[36:])
-
-        aula = [Aula(dia, horario, local)] if dia else []
-        return t, TurmaOfertada(t, descricao, vagas, turno, aula, professor,
-                                reserva, obs)
+            i += 1
 
-    lines = preprocess(utils.load(arquivo))
+        turmas[t].professores = sorted([prof for prof in
+                                        turmas[t].professores.split(',')])
+        for aula in turmas[t].aulas:
+            turmas[t].mascara |= aula.mascara
+    # ### Turmas ###
 
-    oferta = {}
+    return disciplina
 
-    i = 0
-    num_lines = len(lines)
-    while i < num_lines:
-        if eh_centro_de_custo(lines[i]):
-            centro_de_custo, _ = parse_centro_de_custo(lines[i])
-            i += 2
 
-        if eh_disciplina(lines[i]):
-            codigo, nome = parse_disciplina(lines[i])
+def _parse_Prof_Reserva_Obs(line):
+    professor = ''
+    reserva = {}
+    obs = ''
 
-            i += 1
-            if codigo not in oferta:
-                oferta[codigo] = DisciplinaOfertada(centro_de_custo,
-                                                    codigo,
-                                                    nome,
-                                                    parse_creditos(lines[i]),
-                                                    [],
-                                                    {})
-
-            # ### Pré-requisitos ###
-            pre_reqs = ''
-            while not lines[i].startswith('   Turma'):
-                pre_reqs += parse_pre_requisitos(lines[i])
-
-                i += 1
-
-            p = []
-            for opcoes in pre_reqs.split('OU'):
-                p.append(re.findall(r'\d{6}', opcoes))
-            oferta[codigo].pre_requisitos = p
-            # ### Pré-requisitos ###
-
-            # ### Turmas ###
-            turmas = {}
-
-            i += 1
-            while i < num_lines and eh_nova_turma(lines[i]):
-                t, info = parse_turma(lines[i])
-                turmas[t] = info
-
-                i += 1
-                while i < num_lines and not eh_nova_turma(lines[i]):
-                    if eh_disciplina(lines[i]) or eh_centro_de_custo(lines[i]):
-                        break
-
-                    _, info = parse_turma(lines[i])
-
-                    if info.descricao:
-                        turmas[t].descricao += ' ' + info.descricao
-                    if info.aulas:
-                        turmas[t].aulas += info.aulas
-                        turmas[t].aulas.sort()
-                    if info.professores:
-                        if len(info.professores.split()) == 1:
-                            # Supondo que haja um professor com nome muito
-                            # longo, a última parte se estende em uma nova
-                            # linha.
-                            turmas[t].professores += ' ' + info.professores
-                        else:
-                            # É um nome composto de pelo menos duas partes,
-                            # supõe-se que seja de um novo professor.
-                            turmas[t].professores += ',' + info.professores
-                    if info.reserva:
-                        turmas[t].reserva.update(info.reserva)
-                    if info.observacoes:
-                        turmas[t].observacoes += ' ' + info.observacoes
-
-                    i += 1
-
-                turmas[t].professores = sorted([prof
-                                                for prof in turmas[
-                                                    t].professores.split(',')])
-
-            if oferta[codigo].turmas:
-                oferta[codigo].turmas.update(turmas)
-            else:
-                oferta[codigo].turmas = turmas
-            # ### Turmas ###
+    partes = [p.strip() for p in line.split('   ') if p.strip()]
 
-    num_disciplinas = len(oferta)
-    num_turmas = sum(len(oferta[codigo].turmas) for codigo in oferta)
-    print('{} disciplinas ({} turmas) ofertadas.'.format(num_disciplinas,
-                                                         num_turmas))
-
-    return oferta
+    for parte in partes:
+        habilitacao, barra, vagas = parte.rpartition('/')
+        if barra and vagas.isdecimal():
+            reserva[habilitacao] = int(vagas)
+        elif not parte.strip('*'):
+            obs = parte
+        else:
+            professor = parte
+    return professor, reserva, obs
+
+
+def _parse_nova_turma(grupos):
+    (t, descricao, vagas, turno,
+     dia, horario, local, restante, sem_aula) = grupos
+
+    if dia:
+        aulas = [Aula(dia, horario, local)]
+    else:
+        aulas = []
+        restante = sem_aula
+
+    professor, reserva, obs = _parse_Prof_Reserva_Obs(restante)
+    return t, TurmaOfertada(t, descricao.strip(), int(vagas), turno, aulas,
+                            professor, reserva, obs)
+
+
+def _parse_complemento_da_turma(token):
+    '''Extrai as informações de uma linha que complementa a listagem de uma
+    turma (outras aulas, professores, reservas e observações).'''
+    if token.tipo == 'aula':
+        descricao, dia, horario, restante = token.grupos
+        descricao = descricao.strip()
+        restante = restante.strip()
+
+        if '  ' in restante:  # tem professor ou reserva ou obs
+            i = restante.index('  ')
+            local = restante[:i]
+            restante = restante[i:].strip()
+            professor, reserva, obs = _parse_Prof_Reserva_Obs(restante)
+        else:
+            local = restante
+            professor, reserva, obs = '', '', ''
+        aulas = [Aula(dia, horario, local)]
+    else:
+        line = token.linha
+        descricao = line[7:36].strip()
+        aulas = []
+        professor, reserva, obs = '', '', ''
+        if len(line) > 36:
+            professor, reserva, obs = _parse_Prof_Reserva_Obs(line[36:])
+
+    return TurmaOfertada('', descricao, '', '', aulas, professor, reserva, obs)
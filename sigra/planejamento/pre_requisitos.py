@@ -0,0 +1,424 @@
+#  -*- coding: utf-8 -*-
+#    @package: pre_requisitos.py
+#     @author: Guilherme N. Ramos (gnramos@unb.br)
+#
+# Grafo de pré-requisitos das disciplinas, construído a partir dos relatórios
+# de Planejamento do Sistema de Graduação da UnB (SIGRA).
+#
+# Cada disciplina é um vértice identificado por um inteiro, e conjuntos de
+# disciplinas são representados por inteiros usados como vetores de bits (o
+# bit i indica a disciplina de índice i). As relações transitivas são
+# calculadas na construção, de forma que as consultas não percorrem o grafo.
+
+import heapq
+
+from sigra import metricas
+from sigra.planejamento import disciplina
+from sigra.planejamento import fluxo
+
+
+class GrafoDePreRequisitos():
+    '''Grafo de pré-requisitos das disciplinas.
+
+    Os pré-requisitos de uma disciplina são dados como em
+    utils.parse_pre_requisitos: uma lista de opções (relação 'OU'), cada uma
+    sendo uma lista de códigos (relação 'E'). Para cada disciplina, são
+    calculados:
+    - o fecho dos pré-requisitos (todas as disciplinas de alguma cadeia de
+      pré-requisitos);
+    - as disciplinas necessárias (que estão em todas as formas de cumprir os
+      pré-requisitos), e, inversamente, as que ficam bloqueadas se ela não
+      for cursada;
+    - a profundidade (número mínimo de semestres para cursá-la, sendo 1 para
+      as sem pré-requisitos) e o caminho crítico correspondente;
+    - os dependentes (disciplinas que a têm em seu fecho).
+    '''
+    def __init__(self, pre_requisitos):
+        '''Argumentos:
+        pre_requisitos -- dicionário código: lista de opções de
+                          pré-requisitos. Códigos citados apenas como
+                          pré-requisito são incluídos sem pré-requisitos.
+        '''
+        self.codigos = list(pre_requisitos)
+        self.indice = {codigo: i for i, codigo in enumerate(self.codigos)}
+        for opcoes in pre_requisitos.values():
+            for opcao in opcoes:
+                for codigo in opcao:
+                    if codigo not in self.indice:
+                        self.indice[codigo] = len(self.codigos)
+                        self.codigos.append(codigo)
+
+        self._opcoes = [[] for _ in self.codigos]
+        for codigo, opcoes in pre_requisitos.items():
+            self._opcoes[self.indice[codigo]] = [
+                tuple(sorted({self.indice[c] for c in opcao}))
+                for opcao in opcoes if opcao]
+
+        self._pre_requisitos = [_bits(u for opcao in opcoes for u in opcao)
+                                for opcoes in self._opcoes]
+        self._dependentes_diretos = _transposta(self._pre_requisitos)
+
+        ordem, ciclicas = self._ordem_topologica()
+        if ciclicas:
+            metricas.LOGGER.warning('Pré-requisitos cíclicos: %s.',
+                                    ', '.join(self.codigos[i]
+                                              for i in ciclicas))
+
+        self._calcula_profundidade()
+        self._fecho = self._propaga(ordem, ciclicas, self._uniao)
+        self._necessarias = self._propaga(ordem, ciclicas, self._intersecao)
+        self._dependentes = self._propaga(ordem[::-1], ciclicas,
+                                          self._uniao_dos_dependentes)
+        self._bloqueadas = _transposta(self._necessarias)
+
+    @classmethod
+    def de_relacao(cls, relacao):
+        '''Cria o grafo a partir do resultado de disciplina.listagem.'''
+        return cls(_da_relacao(relacao))
+
+    @classmethod
+    def de_fluxo(cls, fluxo_do_curso):
+        '''Cria o grafo a partir do resultado de fluxo.listagem.'''
+        return cls(_do_fluxo(fluxo_do_curso))
+
+    def __contains__(self, codigo):
+        return codigo in self.indice
+
+    def __len__(self):
+        return len(self.codigos)
+
+    def pre_requisitos(self, codigo):
+        '''Retorna a lista de opções de pré-requisitos diretos da
+        disciplina.'''
+        return [[self.codigos[u] for u in opcao]
+                for opcao in self._opcoes[self.indice[codigo]]]
+
+    def fecho(self, codigo):
+        '''Retorna as disciplinas de alguma cadeia de pré-requisitos da
+        disciplina dada.'''
+        return self._codigos(self._fecho[self.indice[codigo]])
+
+    def necessarias(self, codigo):
+        '''Retorna as disciplinas que precisam ser cursadas antes da
+        disciplina dada, qualquer que seja a opção de pré-requisitos
+        escolhida.'''
+        return self._codigos(self._necessarias[self.indice[codigo]])
+
+    def bloqueadas(self, codigo):
+        '''Retorna as disciplinas que não podem ser cursadas sem cursar a
+        disciplina dada (por exemplo, caso ela não seja ofertada).'''
+        return self._codigos(self._bloqueadas[self.indice[codigo]])
+
+    def bloqueia(self, codigo, outra):
+        '''Indica se a outra disciplina não pode ser cursada sem cursar a
+        disciplina dada.'''
+        return bool(self._bloqueadas[self.indice[codigo]] >>
+                    self.indice[outra] & 1)
+
+    def dependentes(self, codigo):
+        '''Retorna as disciplinas que têm a dada em alguma cadeia de
+        pré-requisitos.'''
+        return self._codigos(self._dependentes[self.indice[codigo]])
+
+    def num_dependentes(self, codigo):
+        '''Retorna a quantidade de dependentes da disciplina.'''
+        return bin(self._dependentes[self.indice[codigo]]).count('1')
+
+    def profundidade(self, codigo):
+        '''Retorna o número mínimo de semestres para cursar a disciplina
+        (1 se ela não tem pré-requisitos), ou None se for impossível
+        cumprir seus pré-requisitos (por um ciclo).'''
+        return self._profundidade[self.indice[codigo]]
+
+    def caminho_critico(self, codigo):
+        '''Retorna uma sequência de disciplinas, terminando na dada, que
+        determina sua profundidade (cada uma é pré-requisito da seguinte).'''
+        i = self.indice[codigo]
+        if self._profundidade[i] is None:
+            return []
+        caminho = []
+        while i is not None:
+            caminho.append(self.codigos[i])
+            i = self._critica[i]
+        return caminho[::-1]
+
+    def _codigos(self, bits):
+        codigos = []
+        while bits:
+            menor = bits & -bits
+            codigos.append(self.codigos[menor.bit_length() - 1])
+            bits ^= menor
+        return codigos
+
+    def _ordem_topologica(self):
+        '''Retorna as disciplinas em ordem topológica (pré-requisitos
+        primeiro) e as que estão em ciclos (ou dependem deles).'''
+        pendentes = [bin(p).count('1') for p in self._pre_requisitos]
+        ordem = [i for i, n in enumerate(pendentes) if not n]
+        for i in ordem:  # A lista cresce durante a iteração.
+            dependentes = self._dependentes_diretos[i]
+            while dependentes:
+                menor = dependentes & -dependentes
+                j = menor.bit_length() - 1
+                pendentes[j] -= 1
+                if not pendentes[j]:
+                    ordem.append(j)
+                dependentes ^= menor
+        ciclicas = [i for i, n in enumerate(pendentes) if n]
+        return ordem, ciclicas
+
+    def _calcula_profundidade(self):
+        '''Calcula a profundidade de cada disciplina, e a disciplina anterior
+        em seu caminho crítico, pela generalização do algoritmo de Dijkstra
+        para grafos E/OU (Knuth, 1977): uma opção é cumprida quando todas
+        as suas disciplinas o forem, e a profundidade é 1 + o mínimo, entre
+        as opções, da maior profundidade de suas disciplinas.'''
+        n = len(self.codigos)
+        faltam = []  # Disciplinas ainda não cumpridas de cada opção.
+        opcoes_com = [[] for _ in range(n)]
+        fila = []
+        for i, opcoes in enumerate(self._opcoes):
+            if not opcoes:
+                fila.append((1, i, None))
+            for opcao in opcoes:
+                for u in opcao:
+                    opcoes_com[u].append((i, len(faltam)))
+                faltam.append(len(opcao))
+        heapq.heapify(fila)
+
+        self._profundidade = [None] * n
+        self._critica = [None] * n
+        while fila:
+            profundidade, i, anterior = heapq.heappop(fila)
+            if self._profundidade[i] is not None:
+                continue
+            self._profundidade[i] = profundidade
+            self._critica[i] = anterior
+            for j, k in opcoes_com[i]:
+                faltam[k] -= 1
+                if not faltam[k] and self._profundidade[j] is None:
+                    # i é a disciplina mais profunda da opção.
+                    heapq.heappush(fila, (profundidade + 1, j, i))
+
+    def _propaga(self, ordem, ciclicas, combina):
+        '''Calcula um conjunto por disciplina, combinando os das disciplinas
+        relacionadas a ela, na ordem dada (em que as relacionadas precedem
+        cada disciplina). Nos ciclos, repete até que não haja mudança.'''
+        conjuntos = [0] * len(self.codigos)
+        for i in ordem:
+            conjuntos[i] = combina(i, conjuntos)
+
+        mudou = bool(ciclicas)
+        while mudou:
+            mudou = False
+            for i in ciclicas:
+                conjunto = combina(i, conjuntos)
+                if conjunto != conjuntos[i]:
+                    conjuntos[i] = conjunto
+                    mudou = True
+        return conjuntos
+
+    def _uniao(self, i, fechos):
+        fecho = self._pre_requisitos[i]
+        for opcao in self._opcoes[i]:
+            for u in opcao:
+                fecho |= fechos[u]
+        return fecho
+
+    def _uniao_dos_dependentes(self, i, dependentes):
+        resultado = diretos = self._dependentes_diretos[i]
+        while diretos:
+            menor = diretos & -diretos
+            resultado |= dependentes[menor.bit_length() - 1]
+            diretos ^= menor
+        return resultado
+
+    def _intersecao(self, i, necessarias):
+        # Só são consideradas as opções que podem ser cumpridas.
+        profundidade = self._profundidade
+        resultado = None
+        for opcao in self._opcoes[i]:
+            if any(profundidade[u] is None for u in opcao):
+                continue
+            conjunto = 0
+            for u in opcao:
+                conjunto |= 1 << u | necessarias[u]
+            resultado = conjunto if resultado is None else resultado & conjunto
+        return resultado or 0
+
+    def __repr__(self):
+        arestas = sum(bin(p).count('1') for p in self._pre_requisitos)
+        profundidades = [p for p in self._profundidade if p is not None]
+        return ('Grafo de pré-requisitos: {} disciplinas, {} relações de '
+                'pré-requisito, profundidade máxima {}.'.format(
+                    len(self.codigos), arestas,
+                    max(profundidades) if profundidades else 0))
+
+
+class MatrizDeAptidao():
+    '''Indica, para cada aluno e disciplina, se o aluno cumpre os
+    pré-requisitos da disciplina (requer NumPy).
+
+    As aprovações dos alunos são codificadas como uma matriz 0/1 (alunos x
+    disciplinas citadas como pré-requisito) e cada opção de pré-requisitos
+    como uma máscara nas mesmas colunas, de forma que o número de
+    disciplinas cumpridas de cada opção, para todos os alunos, é dado por um
+    único produto de matrizes. Uma opção é cumprida quando esse número é
+    igual ao seu tamanho, e uma disciplina quando alguma de suas opções o
+    for.
+
+    Atributos:
+    matriculas -- lista (ordenada) das matrículas dos alunos (linhas).
+    codigos -- lista (ordenada) dos códigos das disciplinas (colunas).
+    aptos -- array de booleanos (alunos x disciplinas) indicando se o aluno
+             cumpre os pré-requisitos.
+    aprovados -- array de booleanos (alunos x disciplinas) indicando se o
+                 aluno já foi aprovado na disciplina.
+    '''
+    # Alunos por produto de matrizes, limitando a memória intermediária.
+    BLOCO = 4096
+
+    def __init__(self, aprovacoes, pre_requisitos):
+        '''Argumentos:
+        aprovacoes -- dicionário matrícula: conjunto dos códigos das
+                      disciplinas em que o aluno foi aprovado.
+        pre_requisitos -- dicionário código: lista de opções de
+                          pré-requisitos (veja utils.parse_pre_requisitos)
+                          das disciplinas de interesse.
+        '''
+        import numpy as np
+
+        self.matriculas = sorted(aprovacoes)
+        self.codigos = sorted(pre_requisitos)
+        linha = {m: i for i, m in enumerate(self.matriculas)}
+        self._coluna = coluna = {c: j for j, c in enumerate(self.codigos)}
+
+        citadas = sorted({c for opcoes in pre_requisitos.values()
+                          for opcao in opcoes for c in opcao})
+        citada = {c: j for j, c in enumerate(citadas)}
+
+        # Opções agrupadas por disciplina, na ordem das colunas.
+        dono, mascaras = [], []
+        for j, codigo in enumerate(self.codigos):
+            for opcao in pre_requisitos[codigo]:
+                dono.append(j)
+                mascaras.append({citada[c] for c in opcao})
+        opcoes = np.zeros((len(mascaras), len(citadas)), dtype=np.float32)
+        for k, mascara in enumerate(mascaras):
+            opcoes[k, list(mascara)] = 1
+        tamanhos = opcoes.sum(axis=1)
+
+        historico = np.zeros((len(self.matriculas), len(citadas)),
+                             dtype=np.float32)
+        self.aprovados = np.zeros((len(self.matriculas), len(self.codigos)),
+                                  dtype=bool)
+        for matricula, codigos in aprovacoes.items():
+            i = linha[matricula]
+            for c in codigos:
+                if c in citada:
+                    historico[i, citada[c]] = 1
+                if c in coluna:
+                    self.aprovados[i, coluna[c]] = True
+
+        self.aptos = np.ones((len(self.matriculas), len(self.codigos)),
+                             dtype=bool)
+        if mascaras:
+            dono = np.array(dono)
+            com_opcoes, inicios = np.unique(dono, return_index=True)
+            for i in range(0, len(self.matriculas), self.BLOCO):
+                cumpridas = (historico[i:i + self.BLOCO] @ opcoes.T >=
+                             tamanhos)
+                self.aptos[i:i + self.BLOCO, com_opcoes] = \
+                    np.logical_or.reduceat(cumpridas, inicios, axis=1)
+
+    def num_aptos(self, inclui_aprovados=False):
+        '''Retorna um dicionário com o número de alunos aptos a cursar cada
+        disciplina.
+
+        Argumentos:
+        inclui_aprovados -- indica se os alunos já aprovados na disciplina
+                            devem ser contabilizados.
+                            (default False)
+        '''
+        aptos = self.aptos if inclui_aprovados else (self.aptos &
+                                                     ~self.aprovados)
+        return dict(zip(self.codigos, aptos.sum(axis=0).tolist()))
+
+    def aptos_para(self, codigo, inclui_aprovados=False):
+        '''Retorna a lista das matrículas dos alunos aptos a cursar a
+        disciplina (veja num_aptos).'''
+        import numpy as np
+
+        j = self._coluna[codigo]
+        aptos = self.aptos[:, j]
+        if not inclui_aprovados:
+            aptos = aptos & ~self.aprovados[:, j]
+        return [self.matriculas[i] for i in np.flatnonzero(aptos)]
+
+
+def grafo(DISLST=None, FLULST=None):
+    '''Retorna o GrafoDePreRequisitos das disciplinas listadas nos
+    relatórios dados (pelo menos um deles). Se ambos forem dados, os
+    pré-requisitos da relação de disciplinas prevalecem, e o fluxo apenas
+    acrescenta as disciplinas que não constarem nela.
+
+    Argumentos:
+    DISLST -- caminho para o arquivo (UTF-16) contendo a relação de
+              disciplinas, que deve ser o relatório exportado via:
+              SIGRA > Planejamento > Disciplina > DISLST
+              (default None)
+    FLULST -- caminho para o arquivo (UTF-16) contendo o fluxo de um curso,
+              que deve ser o relatório exportado via:
+              SIGRA > Planejamento > Fluxo > FLULST
+              (default None)
+    '''
+    if DISLST is None and FLULST is None:
+        raise ValueError('É preciso informar DISLST e/ou FLULST.')
+
+    pre_requisitos = {}
+    if FLULST is not None:
+        pre_requisitos.update(_do_fluxo(fluxo.listagem(FLULST)))
+    if DISLST is not None:
+        pre_requisitos.update(_da_relacao(disciplina.listagem(DISLST)))
+    return GrafoDePreRequisitos(pre_requisitos)
+
+
+def _da_relacao(relacao):
+    return {codigo: info['Pré-requisitos']
+            for codigo, info in relacao.items()}
+
+
+def _do_fluxo(fluxo):
+    return {codigo: d.pre_requisitos
+            for periodo in fluxo.values()
+            for disciplinas in periodo.disciplinas.values()
+            for codigo, d in disciplinas.items()}
+
+
+def _bits(indices):
+    bits = 0
+    for i in indices:
+        bits |= 1 << i
+    return bits
+
+
+def _transposta(conjuntos):
+    '''Retorna, para cada i, o conjunto dos j tais que i está em
+    conjuntos[j].'''
+    n = len(conjuntos)
+    indices = [[] for _ in range(n)]
+    for j, conjunto in enumerate(conjuntos):
+        while conjunto:
+            menor = conjunto & -conjunto
+            indices[menor.bit_length() - 1].append(j)
+            conjunto ^= menor
+
+    # Montar cada conjunto em um vetor de bytes evita criar um inteiro
+    # (de até n bits) a cada elemento acrescentado.
+    transposta = []
+    for js in indices:
+        vetor = bytearray((n + 7) // 8)
+        for j in js:
+            vetor[j >> 3] |= 1 << (j & 7)
+        transposta.append(int.from_bytes(vetor, 'little'))
+    return transposta
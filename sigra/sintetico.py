@@ -0,0 +1,458 @@
+#  -*- coding: utf-8 -*-
+#    @package: sintetico.py
+#     @author: Guilherme N. Ramos (gnramos@unb.br)
+#
+# Geração de relatórios sintéticos do Sistema de Graduação da UnB (SIGRA),
+# com o mesmo leiaute dos relatórios exportados, para testes e medições de
+# desempenho. Os nomes, códigos e valores são aleatórios, mas a geração é
+# determinística para uma mesma semente.
+
+import os
+import random
+
+
+CABECALHO = 'Universidade de Brasília\n' \
+            ' Sistema de Graduação - SIGRA\n'
+
+NOMES = ['ANA', 'BRUNO', 'CARLA', 'DANIEL', 'EDUARDA', 'FÁBIO', 'GABRIELA',
+         'HELENA', 'IGOR', 'JOÃO', 'LUÍSA', 'MARCOS', 'NATÁLIA', 'OTÁVIO',
+         'PAULA', 'RAFAEL', 'SÍLVIA', 'TIAGO', 'VÂNIA', 'WAGNER']
+SOBRENOMES = ['ALMEIDA', 'BARBOSA', 'CARVALHO', 'DIAS', 'FERREIRA', 'GOMES',
+              'LIMA', 'MARTINS', 'NASCIMENTO', 'OLIVEIRA', 'PEREIRA',
+              'RIBEIRO', 'SANTOS', 'SOUZA', 'VIEIRA']
+PALAVRAS = ['ALGORITMOS', 'PROGRAMAÇÃO', 'COMPUTADORES', 'ESTRUTURAS',
+            'DADOS', 'CÁLCULO', 'SISTEMAS', 'REDES', 'ANÁLISE', 'PROJETO',
+            'TEORIA', 'LINGUAGENS', 'ENGENHARIA', 'SOFTWARE', 'BANCOS',
+            'INTRODUÇÃO', 'FUNDAMENTOS', 'LÓGICA', 'COMPILADORES']
+HABILITACOES = [('1856', 'Ciência da Computação'),
+                ('1899', 'Computação'),
+                ('6912', 'Engenharia de Computação'),
+                ('6424', 'Engenharia Mecatrônica')]
+MENCOES = ['SS', 'MS', 'MM', 'MI', 'II', 'SR', 'TR', 'TJ']
+
+
+def _nome(rnd, partes=3):
+    return ' '.join([rnd.choice(NOMES)] +
+                    [rnd.choice(SOBRENOMES) for _ in range(partes - 1)])
+
+
+def _titulo(rnd):
+    return ' '.join(rnd.choice(PALAVRAS) for _ in range(rnd.randint(2, 4)))
+
+
+def _codigos(rnd, n):
+    return sorted(rnd.sample(range(100000, 999999), n))
+
+
+def _matriculas(rnd, n):
+    return ['{:02}/{:07}'.format(rnd.randint(10, 18), m)
+            for m in rnd.sample(range(10000, 9999999), n)]
+
+
+def _periodos(n, inicio=2010):
+    periodos = []
+    ano, semestre = inicio, 1
+    while len(periodos) < n:
+        periodos.append('{}/{}'.format(ano, semestre))
+        ano, semestre = (ano + 1, 1) if semestre == 2 else (ano, 2)
+    return periodos
+
+
+def _grava(arquivo, linhas):
+    with open(arquivo, 'w', encoding='utf-16') as f:
+        f.write('\n'.join(linhas))
+        f.write('\n')
+
+
+def _paginas(linhas, cabecalho, rodape, linhas_por_pagina=60):
+    paginado = []
+    for i in range(0, len(linhas), linhas_por_pagina):
+        paginado += cabecalho
+        paginado += linhas[i:i + linhas_por_pagina]
+        paginado += rodape
+    return paginado
+
+
+def _pre_requisitos(rnd, anteriores, prefixo='CIC-'):
+    if not anteriores or rnd.random() < 0.3:
+        return []
+    opcoes = []
+    for _ in range(rnd.randint(1, 2)):
+        opcoes.append(rnd.sample(anteriores, min(len(anteriores),
+                                                 rnd.randint(1, 2))))
+    return opcoes
+
+
+def ofelst(arquivo, num_disciplinas=100, num_turmas=3, periodo='2017/2',
+           semente=0):
+    '''Gera um relatório OFELST sintético.
+
+    Argumentos:
+    arquivo -- caminho para o arquivo (UTF-16) a ser gerado.
+    num_disciplinas -- quantidade de disciplinas ofertadas.
+                       (default 100)
+    num_turmas -- quantidade máxima de turmas por disciplina.
+                  (default 3)
+    periodo -- período letivo da oferta.
+               (default 2017/2)
+    semente -- semente do gerador de números aleatórios.
+               (default 0)
+    '''
+    rnd = random.Random(semente)
+    dias = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta']
+    horarios = ['08:00 09:50', '10:00 11:50', '14:00 15:50', '16:00 17:50',
+                '19:00 20:40', '20:50 22:30']
+    professores = [_nome(rnd) for _ in range(max(2, num_disciplinas // 2))]
+
+    cabecalho = [CABECALHO.rstrip('\n'),
+                 ' Listagem da Oferta',
+                 ' Período : {}       Campus: DARCY RIBEIRO'.format(periodo)]
+    rodape = [' Observações :  * Turma com observação.',
+              '               ** Turma com reserva especial.',
+              'lstofelst']
+
+    blocos = []
+    codigos = _codigos(rnd, num_disciplinas)
+    for n, codigo in enumerate(codigos):
+        bloco = []
+        if n % 25 == 0:
+            blocos.append(['CIC    -  DEPARTAMENTO DE CIÊNCIA DA COMPUTAÇÃO',
+                           '-' * 70])
+        bloco.append(' {:<12} -  {}'.format(codigo, _titulo(rnd)))
+        creditos = '    Créditos: {:03}  -   {:03}   -   {:03}  -   {:03}'
+        creditos = creditos.format(rnd.choice([2, 4]), rnd.choice([0, 2]),
+                                   0, rnd.choice([2, 4, 6]))
+        pre = _pre_requisitos(rnd, codigos[:n])
+        if pre:
+            partes = ['  E  '.join('CIC-{}'.format(c) for c in opcao)
+                      for opcao in pre]
+            creditos += '     Pré-req: ' + partes[0] + '  '
+            bloco.append(creditos)
+            for parte in partes[1:]:
+                bloco[-1] += 'OU'
+                bloco.append(' ' * 52 + parte + '  ')
+        else:
+            bloco.append(creditos)
+        bloco.append('   Turma  Descrição          Vagas Turno   '
+                     'Dia     Horário     Local      Professor   Reserva')
+        for t in range(rnd.randint(1, num_turmas)):
+            turma = chr(ord('A') + t)
+            dia = rnd.choice(dias)
+            horario = rnd.choice(horarios)
+            turno = 'Noturno' if horario >= '19' else 'Diurno'
+            reservas = rnd.sample(HABILITACOES, rnd.randint(0, 2))
+            professor = rnd.choice(professores)
+            linha = '  {:<2} {:<20} {:>3}   {:<7}   {:<7} {} {:<10}   {}'
+            linha = linha.format(turma, 'TURMA ' + turma,
+                                 rnd.choice([0, 20, 40, 60]), turno, dia,
+                                 horario, 'PJC BT {:03}'.format(t), professor)
+            if reservas:
+                linha += '   {}/{}'.format(reservas[0][1],
+                                           rnd.randint(5, 30))
+            if rnd.random() < 0.2:
+                linha += '   *'
+            bloco.append(linha)
+            outro_dia = dias[(dias.index(dia) + 2) % len(dias)]
+            bloco.append('       {:<29}{:<7} {} {}'.format('', outro_dia,
+                                                          horario,
+                                                          'PJC BT 001'))
+            for reserva in reservas[1:]:
+                bloco.append(' ' * 36 + '   {}/{}'.format(reserva[1],
+                                                          rnd.randint(5, 30)))
+            if rnd.random() < 0.2:
+                bloco.append(' ' * 36 + rnd.choice(professores))
+        blocos.append(bloco)
+
+    # As páginas são quebradas entre disciplinas.
+    linhas = []
+    por_pagina = 0
+    for bloco in blocos:
+        if por_pagina == 0:
+            linhas += cabecalho
+        linhas += bloco
+        por_pagina += len(bloco)
+        if por_pagina > 50:
+            linhas += rodape
+            por_pagina = 0
+    if por_pagina:
+        linhas += rodape
+
+    _grava(arquivo, linhas)
+    return codigos
+
+
+def flulst(arquivo, num_periodos=8, disciplinas_por_periodo=6, semente=0):
+    '''Gera um relatório FLULST sintético.
+
+    Argumentos:
+    arquivo -- caminho para o arquivo (UTF-16) a ser gerado.
+    num_periodos -- quantidade de períodos do fluxo.
+                    (default 8)
+    disciplinas_por_periodo -- quantidade de disciplinas em cada período.
+                               (default 6)
+    semente -- semente do gerador de números aleatórios.
+               (default 0)
+    '''
+    rnd = random.Random(semente)
+    linhas = [CABECALHO.rstrip('\n'),
+              ' Listagem de Fluxo de Curso - Dados Completos',
+              ' Curso: 370 - CIÊNCIA DA COMPUTAÇÃO']
+    codigos = _codigos(rnd, num_periodos * disciplinas_por_periodo)
+    anteriores = []
+    for p in range(num_periodos):
+        do_periodo = codigos[p * disciplinas_por_periodo:
+                             (p + 1) * disciplinas_por_periodo]
+        # Limitado a um valor realista (o campo tem no máximo 3 dígitos).
+        linhas.append('  Período: {}  Número de Créditos: {}'.format(
+                      p + 1, min(4 * len(do_periodo), 32)))
+        linhas.append('  Seq  Mod  Obr   Disciplina')
+        linhas.append('                  Teo Pra Ext Est  Pré-requisitos')
+        for n, codigo in enumerate(do_periodo):
+            tipo = 'OBR' if rnd.random() < 0.7 else 'OPT'
+            linhas.append('   {:>2}  {}  S'.format(n + 1, tipo))
+            linhas.append(' CIC  {}  {}'.format(codigo, _titulo(rnd)))
+            for c in (4, 2, 0, 4):
+                linhas.append('                  {:03}'.format(c))
+            pre = _pre_requisitos(rnd, anteriores)
+            if pre:
+                linhas.append('                  Pré-Requisito:')
+                linhas.append('                  ' +
+                              ' OU '.join(' E '.join(str(c) for c in opcao)
+                                          for opcao in pre))
+        anteriores += do_periodo
+    linhas += [' ' + '-' * 60, 'lstflulst']
+    _grava(arquivo, linhas)
+    return codigos
+
+
+def dislst(arquivo, num_disciplinas=200, semente=0):
+    '''Gera um relatório DISLST sintético.
+
+    Argumentos:
+    arquivo -- caminho para o arquivo (UTF-16) a ser gerado.
+    num_disciplinas -- quantidade de disciplinas listadas.
+                       (default 200)
+    semente -- semente do gerador de números aleatórios.
+               (default 0)
+    '''
+    rnd = random.Random(semente)
+    cabecalho = [CABECALHO.rstrip('\n'), ' Relação de Disciplinas']
+    rodape = ['  ' + '-' * 60, ' Emitido em 01/01/2018      lstdislst']
+    codigos = _codigos(rnd, num_disciplinas)
+    corpo = ['  Órgão Nível  Nome                 Rest  '
+             'Teo Pra Ext Est  Domínio']
+    for n, codigo in enumerate(codigos):
+        nome = _titulo(rnd).split()
+        linha = '  CIC   GR   {}   S   {:03} {:03} {:03} {:03}   CIC'
+        corpo.append(linha.format(' '.join(nome[:2]), 4, 2, 0, 4))
+        corpo.append('  {}{}'.format(codigo, ' ' + ' '.join(nome[2:])
+                                     if nome[2:] else ''))
+        for i, opcao in enumerate(_pre_requisitos(rnd, codigos[:n])):
+            if i:
+                corpo.append(' ' * 110 + 'OU')
+            for j, c in enumerate(opcao):
+                if j:
+                    corpo.append(' ' * 110 + 'E')
+                corpo.append(' ' * 110 + str(c))
+    _grava(arquivo, _paginas(corpo, cabecalho, rodape))
+    return codigos
+
+
+def heeme(arquivo, num_disciplinas=50, num_turmas=3, periodo='2017/1',
+          deptos=('CIC',), semente=0):
+    '''Gera um relatório HEEME sintético.
+
+    Argumentos:
+    arquivo -- caminho para o arquivo (UTF-16) a ser gerado.
+    num_disciplinas -- quantidade de disciplinas.
+                       (default 50)
+    num_turmas -- quantidade máxima de turmas por disciplina.
+                  (default 3)
+    periodo -- período letivo das menções.
+               (default 2017/1)
+    deptos -- departamentos (sorteados) das disciplinas.
+              (default ('CIC',))
+    semente -- semente do gerador de números aleatórios.
+               (default 0)
+    '''
+    rnd = random.Random(semente)
+    cabecalho = [CABECALHO.rstrip('\n'),
+                 ' Histórico Escolar: Estatística de Menções']
+    rodape = ['  ' + '-' * 60, ' Emitido em 01/01/2018      lstheeme']
+    corpo = []
+    for codigo in _codigos(rnd, num_disciplinas):
+        nome = _titulo(rnd)
+        for t in range(rnd.randint(1, num_turmas)):
+            corpo += ['   Período:',
+                      '   {}'.format(periodo),
+                      '   Disciplina:   {}'.format(rnd.choice(deptos)),
+                      '   Código:',
+                      '   {}'.format(codigo),
+                      '   Nível:',
+                      '   GR -',
+                      '   {}'.format(nome),
+                      '   Turma:  {}'.format(chr(ord('A') + t))]
+            total = 0
+            for mencao in MENCOES[:6]:
+                n = rnd.randint(0, 12)
+                total += n
+                corpo.append('   {}   {:>5}'.format(mencao, n))
+            corpo.append('   TOTAL DE MENÇÕES   {}'.format(total))
+    _grava(arquivo, _paginas(corpo, cabecalho, rodape))
+
+
+def hedis(arquivo, codigo='113476', matriculas=None, num_alunos=500,
+          num_periodos=10, semente=0):
+    '''Gera um relatório HEDIS sintético, retornando as matrículas listadas.
+
+    Argumentos:
+    arquivo -- caminho para o arquivo (UTF-16) a ser gerado.
+    codigo -- código da disciplina.
+              (default 113476)
+    matriculas -- matrículas dos alunos que cursaram a disciplina (por
+                  exemplo, as de um relatório ALUREL sintético). Se None,
+                  são sorteadas num_alunos matrículas.
+                  (default None)
+    num_alunos -- quantidade de alunos, caso matriculas seja None.
+                  (default 500)
+    num_periodos -- quantidade de períodos letivos.
+                    (default 10)
+    semente -- semente do gerador de números aleatórios.
+               (default 0)
+    '''
+    rnd = random.Random(semente)
+    if matriculas is None:
+        matriculas = _matriculas(rnd, num_alunos)
+    periodos = _periodos(num_periodos)
+    cabecalho = [CABECALHO.rstrip('\n'),
+                 ' Histórico Escolar: Alunos que Cursaram a Disciplina',
+                 ' Disciplina: {} - {}'.format(codigo, _titulo(rnd)),
+                 '',
+                 '  Matrícula   Período  Turma  Menção  Nome',
+                 '  ----------  -------  -----  ------  ' + '-' * 40]
+    rodape = ['  ' + '-' * 60, ' Emitido em 01/01/2018      lsthedis']
+    corpo = []
+    for matricula in matriculas:
+        periodo = rnd.choice(periodos)
+        corpo.append('  {:<10}  {:<7}  {:<5}  {:<6}  {}'.format(
+                     matricula, periodo, rnd.choice('ABC'),
+                     rnd.choice(MENCOES), _nome(rnd)))
+    _grava(arquivo, _paginas(corpo, cabecalho, rodape))
+    return matriculas
+
+
+def alurel(arquivo, num_alunos=500, semente=0):
+    '''Gera um relatório ALUREL sintético, retornando as matrículas listadas.
+
+    Argumentos:
+    arquivo -- caminho para o arquivo (UTF-16) a ser gerado.
+    num_alunos -- quantidade de alunos.
+                  (default 500)
+    semente -- semente do gerador de números aleatórios.
+               (default 0)
+    '''
+    rnd = random.Random(semente)
+    matriculas = _matriculas(rnd, num_alunos)
+    cabecalho = [CABECALHO.rstrip('\n'),
+                 ' Relação de Alunos',
+                 '',
+                 '  Matrícula   Nome' + ' ' * 37 + 'Ingresso  Forma     '
+                 'Opção',
+                 '  ----------  ' + '-' * 40 + '  --------  --------  '
+                 + '-' * 30]
+    rodape = ['  ' + '-' * 60, ' Emitido em 01/01/2018      lstalurel']
+    corpo = []
+    for matricula in matriculas:
+        codigo, opcao = rnd.choice(HABILITACOES)
+        corpo.append('  {:<10}  {:<40}  {:<8}  {:<8}  {} {}'.format(
+                     matricula, _nome(rnd, rnd.randint(2, 5)),
+                     rnd.choice(_periodos(10)), rnd.choice(['Vestibular',
+                                                            'PAS', 'SISU']),
+                     codigo, opcao))
+    _grava(arquivo, _paginas(corpo, cabecalho, rodape))
+    return matriculas
+
+
+def alutel(arquivo, num_alunos=500, semente=0):
+    '''Gera um relatório ALUTEL sintético.
+
+    Argumentos:
+    arquivo -- caminho para o arquivo (UTF-16) a ser gerado.
+    num_alunos -- quantidade de alunos.
+                  (default 500)
+    semente -- semente do gerador de números aleatórios.
+               (default 0)
+    '''
+    rnd = random.Random(semente)
+    cabecalho = [CABECALHO.rstrip('\n'), ' Relação de Alunos - Contatos', '']
+    rodape = ['  ' + '-' * 60, ' Emitido em 01/01/2018      lstalutel']
+    corpo = []
+    for matricula in _matriculas(rnd, num_alunos):
+        nome = _nome(rnd)
+        corpo.append('  {:<10}  {:<40}   (61) 9{:04}-{:04}'.format(
+                     matricula, nome, rnd.randint(0, 9999),
+                     rnd.randint(0, 9999)))
+        corpo.append('              {}@aluno.unb.br'.format(
+                     nome.split()[0].lower()))
+    _grava(arquivo, _paginas(corpo, cabecalho, rodape))
+
+
+def curegep(arquivo, periodos=None, semente=0):
+    '''Gera um relatório CUREGEP sintético.
+
+    Argumentos:
+    arquivo -- caminho para o arquivo (UTF-16) a ser gerado.
+    periodos -- lista com os 4 períodos letivos do relatório. Se None, são
+                os 4 primeiros a partir de 2010/1.
+                (default None)
+    semente -- semente do gerador de números aleatórios.
+               (default 0)
+    '''
+    rnd = random.Random(semente)
+    if periodos is None:
+        periodos = _periodos(4)
+    linhas = [CABECALHO.rstrip('\n'), ' Estatística de Entrada e Saída',
+              '', '      ' + '       '.join(periodos)]
+    categorias = ['Vestibular', 'PAS', 'Transferência', 'Formatura',
+                  'Desligamento', 'Abandono']
+    for n, categoria in enumerate(categorias):
+        numeros = ' '.join('{:>5}'.format(rnd.randint(0, 40))
+                           for _ in range(8))
+        linhas.append('   {}  {:<20}  {}'.format(n + 1, categoria, numeros))
+    linhas += ['  ' + '-' * 60, ' Emitido em 01/01/2018      lstcuregep']
+    _grava(arquivo, linhas)
+
+
+def gera(diretorio, num_disciplinas=100, num_turmas=3, num_alunos=500,
+         semente=0):
+    '''Gera um relatório sintético de cada tipo no diretório dado (nomeados
+    como o tipo, por exemplo OFELST.txt), retornando um dicionário com o
+    caminho de cada um.
+
+    Argumentos:
+    diretorio -- caminho para o diretório onde gravar os relatórios.
+    num_disciplinas -- quantidade de disciplinas (OFELST, DISLST e HEEME). O
+                       fluxo (FLULST) tem cerca de metade delas.
+                       (default 100)
+    num_turmas -- quantidade máxima de turmas por disciplina.
+                  (default 3)
+    num_alunos -- quantidade de alunos (ALUREL, ALUTEL e HEDIS).
+                  (default 500)
+    semente -- semente do gerador de números aleatórios.
+               (default 0)
+    '''
+    os.makedirs(diretorio, exist_ok=True)
+    arquivos = {tipo: os.path.join(diretorio, tipo + '.txt')
+                for tipo in ('OFELST', 'FLULST', 'DISLST', 'CUREGEP',
+                             'ALUREL', 'ALUTEL', 'HEDIS', 'HEEME')}
+
+    ofelst(arquivos['OFELST'], num_disciplinas, num_turmas, semente=semente)
+    flulst(arquivos['FLULST'], 8, max(1, num_disciplinas // 16),
+           semente=semente)
+    dislst(arquivos['DISLST'], num_disciplinas, semente=semente)
+    curegep(arquivos['CUREGEP'], semente=semente)
+    matriculas = alurel(arquivos['ALUREL'], num_alunos, semente=semente)
+    alutel(arquivos['ALUTEL'], num_alunos, semente=semente)
+    hedis(arquivos['HEDIS'], matriculas=matriculas, semente=semente)
+    heeme(arquivos['HEEME'], num_disciplinas, num_turmas, semente=semente)
+    return arquivos
@@ -0,0 +1,96 @@
+#  -*- coding: utf-8 -*-
+#    @package: tokenizador.py
+#     @author: Guilherme N. Ramos (gnramos@unb.br)
+#
+# Classificação das linhas dos relatórios do Sistema de Graduação da UnB
+# (SIGRA) em tokens, compartilhada pelas funções de extração.
+
+import collections
+import re
+import string
+
+from sigra import metricas
+
+
+Token = collections.namedtuple('Token', ['tipo', 'grupos', 'linha'])
+Token.__doc__ = '''Linha classificada: tipo (None se a linha não for de
+nenhum tipo conhecido), grupos capturados pelo padrão do tipo e a linha em
+si.'''
+
+
+_VAZIO = ()
+
+
+class Tokenizador():
+    '''Classifica cada linha com uma única avaliação de expressão regular.
+
+    Os padrões são combinados (na ordem dada, que define a prioridade entre
+    eles) em uma expressão pré-compilada, ancorada no início da linha. Para
+    evitar testar padrões que certamente falharão, cada padrão pode declarar
+    os caracteres com que as linhas reconhecidas por ele começam (ignorando
+    os espaços), e a expressão é montada apenas com os padrões compatíveis
+    com o primeiro caractere não branco da linha (e guardada para as próximas
+    linhas que comecem com ele).
+    '''
+    def __init__(self, padroes):
+        '''Argumentos:
+        padroes -- lista de (tipo, expressão regular) ou (tipo, expressão
+                   regular, iniciais). O tipo deve ser um identificador
+                   válido e a expressão não pode conter grupos nomeados.
+                   iniciais é o texto com todos os possíveis primeiros
+                   caracteres não brancos das linhas reconhecidas; se
+                   omitido, o padrão é testado em todas as linhas.
+        '''
+        self.tipos = [tipo for tipo, *_ in padroes]
+        self._padroes = [(tipo, padrao, iniciais[0] if iniciais else None)
+                         for tipo, padrao, *iniciais in padroes]
+        self._por_inicial = {}
+
+    def classifica(self, line):
+        '''Retorna o Token referente à linha dada.'''
+        return next(self._tokens((line,)))
+
+    def tokens(self, linhas):
+        '''Gera o Token de cada uma das linhas dadas.'''
+        return metricas.cronometra(metricas.TOKENIZACAO, self._tokens(linhas))
+
+    def _tokens(self, linhas):
+        por_inicial = self._por_inicial
+        compila = self._compila
+        novo = tuple.__new__
+
+        for line in linhas:
+            inicial = line.lstrip(' ')[:1]
+            try:
+                match, grupos = por_inicial[inicial]
+            except KeyError:
+                match, grupos = compila(inicial)
+
+            m = match(line) if match else None
+            if m:
+                inicio, fim = grupos[m.lastgroup]
+                yield novo(Token, (m.lastgroup, m.groups()[inicio:fim], line))
+            else:
+                yield novo(Token, (None, _VAZIO, line))
+
+    def _compila(self, inicial):
+        alternativas = []
+        grupos = {}
+        grupo = 1
+        for tipo, padrao, iniciais in self._padroes:
+            if iniciais is None or (inicial and inicial in iniciais):
+                num_grupos = re.compile(padrao).groups
+                grupos[tipo] = (grupo, grupo + num_grupos)
+                alternativas.append('(?P<{}>{})'.format(tipo, padrao))
+                grupo += num_grupos + 1
+
+        match = re.compile('|'.join(alternativas)).match if alternativas \
+            else None
+        self._por_inicial[inicial] = match, grupos
+        return match, grupos
+
+
+
+# Iniciais comuns.
+DIGITOS = string.digits
+MAIUSCULAS = string.ascii_uppercase
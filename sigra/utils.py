@@ -5,10 +5,76 @@
 #
 # Funções de utilitárias.
 
+import bisect
+import codecs
+import functools
+import mmap
+import operator
 import re
+import time
+import unicodedata
 
+from sigra import metricas
+
+
+class Registro():
+    '''Base dos registros extraídos dos relatórios. Os registros não têm um
+    dicionário por instância (usam __slots__), o que reduz significativamente
+    a memória ocupada quando há muitos deles.
+
+    Para manter a compatibilidade com o formato anterior (dicionários), as
+    informações também podem ser acessadas como em um dicionário, pelas chaves
+    definidas em CHAVES (chave: nome do atributo). Se a subclasse não definir
+    CHAVES, as chaves são os próprios nomes dos atributos.
+    '''
+    __slots__ = ()
+    CHAVES = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if 'CHAVES' not in cls.__dict__:
+            cls.CHAVES = {atributo: atributo
+                          for classe in reversed(cls.__mro__)
+                          for atributo in classe.__dict__.get('__slots__', ())}
+
+    def __getitem__(self, chave):
+        try:
+            return getattr(self, self.CHAVES[chave])
+        except KeyError:
+            raise KeyError(chave) from None
+
+    def __setitem__(self, chave, valor):
+        try:
+            setattr(self, self.CHAVES[chave], valor)
+        except KeyError:
+            raise KeyError(chave) from None
+
+    def __contains__(self, chave):
+        return chave in self.CHAVES
+
+    def __iter__(self):
+        return iter(self.CHAVES)
+
+    def get(self, chave, default=None):
+        return self[chave] if chave in self.CHAVES else default
+
+    def keys(self):
+        return self.CHAVES.keys()
+
+    def values(self):
+        return [self[chave] for chave in self.CHAVES]
+
+    def items(self):
+        return [(chave, self[chave]) for chave in self.CHAVES]
+
+    def como_dict(self):
+        '''Retorna as informações do registro em um dicionário.'''
+        return dict(self.items())
+
+
+class Creditos(Registro):
+    __slots__ = ('teoria', 'pratica', 'extensao', 'estudo')
 
-class Creditos():
     def __init__(self, teoria, pratica, extensao, estudo):
         self.teoria = int(teoria)
         self.pratica = int(pratica)
@@ -26,7 +92,9 @@ class Creditos():
                                     self.extensao, self.estudo)
 
 
-class Disciplina():
+class Disciplina(Registro):
+    __slots__ = ('depto', 'codigo', 'nome', 'creditos', 'pre_requisitos')
+
     def __init__(self, depto, codigo, nome, creditos, pre_requisitos=[]):
         self.depto = depto
         self.codigo = codigo
@@ -41,18 +109,453 @@ class Disciplina():
                                           str(self.creditos))
 
 
-def load(arquivo, encoding='utf-16'):
-    '''Lê o conteúdo do arquivo dado e o retorna.'''
+@functools.total_ordering
+class Periodo():
+    '''Período letivo (semestre), como '2014/2'. O termo 0 indica o
+    semestre de verão, que precede o primeiro semestre do ano.
+
+    O ordinal (ano * 3 + termo) preserva a ordem cronológica e é usado nas
+    comparações.
+    '''
+    __slots__ = ('ano', 'termo', 'ordinal')
+
+    def __init__(self, ano, termo):
+        if termo not in (0, 1, 2):
+            raise ValueError('Termo inválido: {} (esperado 0 para verão, 1 '
+                             'ou 2).'.format(termo))
+        self.ano = ano
+        self.termo = termo
+        self.ordinal = ano * 3 + termo
+
+    @classmethod
+    def de_texto(cls, texto):
+        '''Cria o período a partir do texto no formato 'AAAA/T'.'''
+        m = _PERIODO.fullmatch(texto.strip())
+        if not m:
+            raise ValueError('Período inválido: {!r} (esperado '
+                             '\'AAAA/T\').'.format(texto))
+        return cls(int(m.group(1)), int(m.group(2)))
+
+    @classmethod
+    def de_ordinal(cls, ordinal):
+        return cls(*divmod(ordinal, 3))
+
+    @property
+    def verao(self):
+        return self.termo == 0
+
+    def __eq__(self, other):
+        if not isinstance(other, Periodo):
+            return NotImplemented
+        return self.ordinal == other.ordinal
+
+    def __lt__(self, other):
+        if not isinstance(other, Periodo):
+            return NotImplemented
+        return self.ordinal < other.ordinal
+
+    def __hash__(self):
+        return hash(self.ordinal)
+
+    def __str__(self):
+        return '{}/{}'.format(self.ano, self.termo)
+
+    def __repr__(self):
+        return 'Periodo({!r})'.format(str(self))
+
+
+_PERIODO = re.compile(r'(\d{4})/(\d)')
+
+
+@functools.lru_cache(maxsize=None)
+def _ordinal_de_texto(texto):
+    return Periodo.de_texto(texto).ordinal
+
+
+def ordinal(periodo):
+    '''Retorna o ordinal do período dado (um Periodo ou texto 'AAAA/T').'''
+    if isinstance(periodo, Periodo):
+        return periodo.ordinal
+    return _ordinal_de_texto(periodo)
+
+
+class IntervaloDePeriodos():
+    '''Filtro de períodos letivos, compilado para os limites (inclusive)
+    dos ordinais dos períodos. Por exemplo, para considerar os semestres de
+    2014/2 a 2017/2, ignorando os de verão:
+
+        intervalo = IntervaloDePeriodos('2014/2', '2017/2', ignora_verao=True)
+        '2015/1' in intervalo  # True
+        intervalo.filtra(['2014/1', '2015/0', '2016/2'])  # ['2016/2']
+    '''
+    def __init__(self, inicio=None, fim=None, ignora_verao=False):
+        '''Argumentos:
+        inicio -- primeiro período (Periodo ou texto) considerado, ou None
+                  para não limitar.
+                  (default None)
+        fim -- último período (Periodo ou texto) considerado, ou None para
+               não limitar.
+               (default None)
+        ignora_verao -- indica se os semestres de verão são desconsiderados.
+                        (default False)
+        '''
+        self.inicio = None if inicio is None else ordinal(inicio)
+        self.fim = None if fim is None else ordinal(fim)
+        self.ignora_verao = ignora_verao
+
+    @classmethod
+    def de_filtro(cls, filtro, ignora_verao=False):
+        '''Cria o intervalo a partir de uma expressão de comparação de
+        períodos, com o período a ser filtrado indicado por chaves. Por
+        exemplo, '2014/2 <= {periodo} < 2016/2' ou '{} >= 2015/1'. Os
+        operadores aceitos são <, <=, >, >= e ==.'''
+        partes = _COMPARACAO.split(filtro.strip())
+        operandos, operadores = partes[::2], partes[1::2]
+        if not operadores:
+            raise ValueError('Filtro de período inválido: {!r}.'.format(
+                             filtro))
+
+        inicio, fim = None, None
+        for esquerda, operador, direita in zip(operandos, operadores,
+                                               operandos[1:]):
+            if _VARIAVEL.fullmatch(direita):
+                esquerda, direita = direita, esquerda
+                operador = _INVERSO[operador]
+            if (not _VARIAVEL.fullmatch(esquerda) or
+                    _VARIAVEL.fullmatch(direita)):
+                raise ValueError('Filtro de período inválido: {!r} (cada '
+                                 'comparação deve envolver o período e um '
+                                 'valor).'.format(filtro))
+
+            valor = ordinal(direita)
+            if operador in ('>', '>=', '=='):
+                limite = valor + 1 if operador == '>' else valor
+                inicio = limite if inicio is None else max(inicio, limite)
+            if operador in ('<', '<=', '=='):
+                limite = valor - 1 if operador == '<' else valor
+                fim = limite if fim is None else min(fim, limite)
+
+        intervalo = cls(ignora_verao=ignora_verao)
+        intervalo.inicio, intervalo.fim = inicio, fim
+        return intervalo
+
+    def __contains__(self, periodo):
+        return self._contem(ordinal(periodo))
+
+    def _contem(self, n):
+        return ((self.inicio is None or self.inicio <= n) and
+                (self.fim is None or n <= self.fim) and
+                not (self.ignora_verao and n % 3 == 0))
+
+    def mascara(self, ordinais):
+        '''Retorna um array (NumPy) de booleanos indicando quais dos
+        ordinais (array) estão no intervalo.'''
+        import numpy as np
+
+        mascara = np.ones(len(ordinais), dtype=bool)
+        if self.inicio is not None:
+            mascara &= ordinais >= self.inicio
+        if self.fim is not None:
+            mascara &= ordinais <= self.fim
+        if self.ignora_verao:
+            mascara &= ordinais % 3 != 0
+        return mascara
+
+    def filtra(self, periodos):
+        '''Retorna a lista dos períodos dados que estão no intervalo (na
+        mesma ordem).'''
+        periodos = list(periodos)
+        try:
+            import numpy as np
+        except ImportError:
+            return [p for p in periodos if p in self]
+
+        ordinais = np.fromiter((ordinal(p) for p in periodos),
+                               dtype=np.int64, count=len(periodos))
+        return [periodos[i] for i in np.flatnonzero(self.mascara(ordinais))]
+
+    def __repr__(self):
+        limites = [str(Periodo.de_ordinal(n)) if n is not None else None
+                   for n in (self.inicio, self.fim)]
+        return 'IntervaloDePeriodos({!r}, {!r}, ignora_verao={})'.format(
+               limites[0], limites[1], self.ignora_verao)
+
+
+_COMPARACAO = re.compile(r'\s*(<=|>=|==|<|>)\s*')
+_VARIAVEL = re.compile(r'\{\w*\}')
+_INVERSO = {'<': '>', '<=': '>=', '>': '<', '>=': '<=', '==': '=='}
+
+
+class IndiceDeNomes():
+    '''Índice para busca de nomes (de pessoas) por partes, sem distinção
+    de maiúsculas/minúsculas nem de acentos.
+
+    Cada nome é dividido em palavras normalizadas (veja normaliza), mantidas
+    em ordem, de forma que as que começam com um prefixo dado são encontradas
+    por busca binária. Uma consulta com várias palavras retorna os nomes que
+    têm, para cada uma delas, alguma palavra que comece por ela. Por exemplo,
+    'jose silv' encontra 'JOSÉ DA SILVA' e 'JOSÉ SILVEIRA'.
+    '''
+    def __init__(self, nomes):
+        '''Argumentos:
+        nomes -- iterável com os nomes a serem indexados.
+        '''
+        nomes_por_palavra = {}
+        for nome in nomes:
+            for palavra in normaliza(nome).split():
+                nomes_por_palavra.setdefault(palavra, set()).add(nome)
+        self.palavras = sorted(nomes_por_palavra)
+        self._nomes = [nomes_por_palavra[p] for p in self.palavras]
+
+    def busca(self, consulta):
+        '''Retorna a lista (ordenada) dos nomes que correspondem à consulta
+        (um nome ou parte dele).'''
+        encontrados = None
+        for prefixo in normaliza(consulta).split():
+            nomes = set()
+            i = bisect.bisect_left(self.palavras, prefixo)
+            while (i < len(self.palavras) and
+                   self.palavras[i].startswith(prefixo)):
+                nomes.update(self._nomes[i])
+                i += 1
+            encontrados = nomes if encontrados is None else encontrados & nomes
+            if not encontrados:
+                break
+        return sorted(encontrados or ())
+
+
+def normaliza(texto):
+    '''Retorna o texto dado em minúsculas e sem acentos.'''
+    decomposto = unicodedata.normalize('NFKD', texto.casefold())
+    return ''.join(c for c in decomposto if not unicodedata.combining(c))
+
+
+def caminho(arquivo):
+    '''Retorna o caminho para o arquivo dado, com a extensão '.txt'.'''
     if not arquivo.endswith('.txt'):
         arquivo += '.txt'
+    return arquivo
+
 
-    print('Leitura de {}.'.format(arquivo))
+def load(arquivo, encoding='utf-16'):
+    '''Lê o conteúdo do arquivo dado e o retorna.'''
+    arquivo = caminho(arquivo)
+
+    metricas.LOGGER.info('Leitura de %s.', arquivo)
     with open(arquivo, encoding=encoding) as f:
         content = f.read()
 
     return content
 
 
+def linhas(arquivo, encoding='utf-16', tamanho_do_bloco=2**20):
+    '''Gera cada linha (sem a quebra de linha) do arquivo dado. O arquivo é
+    mapeado em memória e decodificado aos poucos, em blocos de
+    tamanho_do_bloco bytes, de forma que nunca é carregado por completo.'''
+    arquivo = caminho(arquivo)
+
+    metricas.LOGGER.info('Leitura de %s.', arquivo)
+    medido = metricas.atual() is not None
+    relogio = time.perf_counter
+    with open(arquivo, 'rb') as f:
+        try:
+            dados = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Arquivo vazio.
+            return
+
+        with dados:
+            if medido:
+                metricas.contabiliza(num_bytes=len(dados))
+
+            decoder = codecs.getincrementaldecoder(encoding)()
+            resto = ''
+            for inicio in range(0, len(dados) + 1, tamanho_do_bloco):
+                lido = relogio()
+                bloco = dados[inicio:inicio + tamanho_do_bloco]
+                final = inicio + tamanho_do_bloco >= len(dados)
+                texto = resto + decoder.decode(bloco, final)
+                separado = relogio()
+                if final:
+                    if texto and texto[-1] not in '\r\n':
+                        texto += '\n'
+                    completo, resto = texto, ''
+                else:
+                    corte = texto.rfind('\n') + 1
+                    completo, resto = texto[:corte], texto[corte:]
+                partes = _quebra(completo)
+
+                if medido:
+                    metricas.acumula(metricas.LEITURA, separado - lido)
+                    metricas.acumula(metricas.SEPARACAO, relogio() - separado)
+                    metricas.contabiliza(num_linhas=len(partes))
+                yield from partes
+
+                if final:
+                    break
+
+
+def _quebra(texto):
+    '''Separa as linhas de um texto terminado por quebra de linha.'''
+    if '\r' in texto:
+        texto = texto.replace('\r\n', '\n').replace('\r', '\n')
+    partes = texto.split('\n')
+    partes.pop()
+    return partes
+
+
+class Paginacao():
+    '''Cabeçalho e rodapé repetidos em cada página de um relatório.
+
+    O cabeçalho vai da linha que contém inicio_do_cabecalho até a primeira
+    linha reconhecida por fim_do_cabecalho (uma expressão regular), inclusive.
+    O rodapé vai da linha que contém inicio_do_rodape até a linha que contém a
+    âncora do relatório (como 'lstofelst'), que deve estar no máximo alcance
+    linhas adiante (None para não limitar). Caso a âncora não seja encontrada,
+    as linhas são mantidas.
+    '''
+    def __init__(self, fim_do_cabecalho, inicio_do_rodape, ancora,
+                 alcance=None, inicio_do_cabecalho='Universidade de Brasília'):
+        self.inicio_do_cabecalho = inicio_do_cabecalho
+        self.fim_do_cabecalho = re.compile(fim_do_cabecalho)
+        self.inicio_do_rodape = inicio_do_rodape
+        self.ancora = ancora
+        self.alcance = alcance
+
+    def remove(self, linhas, mantem_espacos=False):
+        '''Gera as linhas dadas, exceto as de cabeçalho e rodapé e as vazias.
+
+        Argumentos:
+        linhas -- iterável com as linhas do relatório.
+        mantem_espacos -- indica se as linhas compostas apenas de espaços
+                          devem ser mantidas.
+                          (default False)
+        '''
+        return metricas.cronometra(metricas.PAGINACAO,
+                                   self._remove(linhas, mantem_espacos))
+
+    def _remove(self, linhas, mantem_espacos):
+        INICIO_DO_CABECALHO = self.inicio_do_cabecalho
+        FIM_DO_CABECALHO = self.fim_do_cabecalho.search
+        INICIO_DO_RODAPE = self.inicio_do_rodape
+        ANCORA = self.ancora
+        alcance = self.alcance
+
+        def util(line):
+            return line if mantem_espacos else line.strip()
+
+        em_cabecalho = False
+        rodape, antes_do_rodape = [], ''
+        for line in linhas:
+            if em_cabecalho:
+                em_cabecalho = not FIM_DO_CABECALHO(line)
+                continue
+
+            if rodape:
+                if ANCORA in line:
+                    if util(antes_do_rodape):
+                        yield antes_do_rodape
+                    rodape = []
+                    line = line.split(ANCORA, 1)[1]
+                elif alcance is None or len(rodape) < alcance:
+                    rodape.append(line)
+                    continue
+                else:  # Não era um rodapé.
+                    yield from (r for r in rodape if util(r))
+                    rodape = []
+
+            if INICIO_DO_CABECALHO in line:
+                em_cabecalho = not FIM_DO_CABECALHO(line)
+                line = line.split(INICIO_DO_CABECALHO, 1)[0]
+            elif INICIO_DO_RODAPE in line:
+                antes, _, depois = line.partition(INICIO_DO_RODAPE)
+                if ANCORA in depois:
+                    line = antes + depois.split(ANCORA, 1)[1]
+                else:
+                    rodape, antes_do_rodape = [line], antes
+                    continue
+
+            if util(line):
+                yield line
+
+        yield from (r for r in rodape if util(r))
+
+
+class Colunas():
+    '''Disposição das colunas de largura fixa de um relatório, obtida uma
+    única vez (em geral da régua de traços sob o cabeçalho), de forma que os
+    campos de cada linha sejam obtidos por fatiamento, sem expressões
+    regulares. Por exemplo:
+
+        colunas = Colunas.de_regua('  ----------  -------  -----')
+        colunas.fatia('  14/0123456  2014/1   A')
+        # ('14/0123456', '2014/1 ', 'A')
+
+    Uma linha só é fatiada se o intervalo entre cada par de colunas estiver
+    em branco, ou seja, se nenhum campo invadir o seguinte. Caso contrário,
+    a linha deve ser processada de outra forma (como por expressão regular).
+    Linhas curtas (com as últimas colunas vazias) são completadas com
+    espaços.
+    '''
+    def __init__(self, colunas):
+        '''Argumentos:
+        colunas -- lista com o intervalo (início, fim) de cada coluna. O fim
+                   da última pode ser None (até o fim da linha).
+        '''
+        self.colunas = [tuple(coluna) for coluna in colunas]
+        intervalos = [slice(fim, inicio) for (_, fim), (inicio, _) in
+                      zip(self.colunas, self.colunas[1:])]
+        self._intervalos = _fatiador(intervalos)
+        self._brancos = tuple(' ' * (i.stop - i.start) for i in intervalos)
+        self._campos = _fatiador([slice(*coluna) for coluna in self.colunas])
+        self._largura = self.colunas[-1][0]
+
+    @classmethod
+    def de_regua(cls, regua, num_colunas=None):
+        '''Cria a disposição a partir de uma régua com um grupo de traços por
+        coluna, como '  ----------  -------  -----'. A última coluna vai até o
+        fim da linha.
+
+        Argumentos:
+        regua -- linha com os traços.
+        num_colunas -- quantidade de colunas consideradas, sendo que a última
+                       inclui as demais. Se None, todas.
+                       (default None)
+        '''
+        colunas = [t.span() for t in _TRACOS.finditer(regua)][:num_colunas]
+        if not colunas:
+            raise ValueError('Régua inválida: {!r}.'.format(regua))
+        colunas[-1] = (colunas[-1][0], None)
+        return cls(colunas)
+
+    def fatia(self, linha):
+        '''Retorna a tupla com o conteúdo de cada coluna da linha (sem
+        remover os espaços que completam a largura da coluna), ou None se ela
+        não respeitar a disposição.'''
+        if len(linha) < self._largura:
+            linha = linha.ljust(self._largura)
+        if self._intervalos(linha) != self._brancos:
+            return None
+        return self._campos(linha)
+
+    def __repr__(self):
+        return 'Colunas({!r})'.format(self.colunas)
+
+
+def _fatiador(fatias):
+    '''Retorna uma função que obtém (em uma única chamada) a tupla com as
+    fatias dadas de um texto.'''
+    if len(fatias) == 1:
+        fatia, = fatias
+        return lambda texto: (texto[fatia],)
+    if not fatias:
+        return lambda texto: ()
+    return operator.itemgetter(*fatias)
+
+
+_TRACOS = re.compile(r'-+')
+REGUA = re.compile(r' *-+( +-+)+ *$')
+
+
 def parse_pre_requisitos(pre_reqs):
     '''Processa um string de pré-requisitos (separados por 'E' e 'OU'), e
     retorna uma lista em que cada item tem uma relação 'OU' com os demais, e
@@ -0,0 +1,7 @@
+#  -*- coding: utf-8 -*-
+#    @package: __init__.py
+#     @author: Guilherme N. Ramos (gnramos@unb.br)
+#
+# Testes das funções de extração e utilitários. Uso (a partir da raiz do
+# repositório):
+#   python -m unittest discover tests
@@ -0,0 +1,111 @@
+#  -*- coding: utf-8 -*-
+#    @package: test_oferta.py
+#     @author: Guilherme N. Ramos (gnramos@unb.br)
+#
+# Testes das consultas à Oferta.
+
+import itertools
+import os
+import tempfile
+import unittest
+
+from sigra import cache
+from sigra import sintetico
+from sigra import utils
+from sigra.planejamento import oferta
+from sigra.planejamento.oferta import Aula, DisciplinaOfertada, TurmaOfertada
+
+
+def _turma(turma, *aulas):
+    aulas = [Aula(dia, horario, 'PJC BT 000') for dia, horario in aulas]
+    mascara = 0
+    for aula in aulas:
+        mascara |= aula.mascara
+    return TurmaOfertada(turma, 'TURMA ' + turma, 40, 'Diurno', aulas, [],
+                         mascara=mascara)
+
+
+def _minutos(horario):
+    return [int(h) * 60 + int(m)
+            for h, m in (t.split(':') for t in horario.split())]
+
+
+def _choque(a, b):
+    '''Indica se as turmas dadas têm aulas simultâneas.'''
+    for x, y in itertools.product(a.aulas, b.aulas):
+        (inicio_x, fim_x), (inicio_y, fim_y) = (_minutos(x.horario),
+                                                _minutos(y.horario))
+        if x.dia == y.dia and max(inicio_x, inicio_y) < min(fim_x, fim_y):
+            return True
+    return False
+
+
+def _disciplina(codigo, *turmas):
+    return DisciplinaOfertada('CIC', codigo, 'DISCIPLINA ' + codigo,
+                              utils.Creditos(4, 0, 0, 4), [],
+                              {t.turma: t for t in turmas})
+
+
+class TestConflitos(unittest.TestCase):
+    def setUp(self):
+        self.oferta = oferta.Oferta({
+            '113034': _disciplina('113034',
+                                  _turma('A', ('Segunda', '08:00 09:50'),
+                                         ('Quarta', '08:00 09:50')),
+                                  _turma('B', ('Terça', '10:00 11:50'))),
+            '113476': _disciplina('113476',
+                                  _turma('A', ('Quarta', '08:00 09:50')),
+                                  _turma('B', ('Terça', '10:00 11:50')),
+                                  _turma('C', ('Terça', '12:00 13:50'))),
+            '116319': _disciplina('116319',
+                                  _turma('A', ('Segunda', '09:00 10:50')),
+                                  _turma('B')),
+        })
+        self.turmas = [(codigo, t)
+                       for codigo, disciplina in self.oferta.items()
+                       for t in disciplina.turmas]
+
+    def test_conflitos(self):
+        self.assertEqual(self.oferta.conflitos(self.turmas),
+                         [(('113034', 'A'), ('113476', 'A')),
+                          (('113034', 'A'), ('116319', 'A')),
+                          (('113034', 'B'), ('113476', 'B'))])
+
+    def test_mesma_disciplina(self):
+        # Turmas da mesma disciplina não conflitam entre si.
+        self.assertEqual(self.oferta.conflitos([('113476', 'A'),
+                                                ('113476', 'B'),
+                                                ('113476', 'C')]), [])
+
+    def test_horarios_adjacentes(self):
+        # Aulas consecutivas (uma termina às 11:50, a outra começa às 12:00)
+        # não conflitam.
+        self.assertEqual(self.oferta.conflitos([('113034', 'B'),
+                                                ('113476', 'C')]), [])
+
+    def test_turmas_repetidas_ou_sem_aulas(self):
+        self.assertEqual(self.oferta.conflitos([('113034', 'B'),
+                                                ('113034', 'B'),
+                                                ('113476', 'B'),
+                                                ('116319', 'B')]),
+                         [(('113034', 'B'), ('113476', 'B'))])
+
+    def test_equivale_a_comparar_todos_os_pares(self):
+        with tempfile.TemporaryDirectory() as diretorio, cache.desativado():
+            arquivo = os.path.join(diretorio, 'OFELST.txt')
+            sintetico.ofelst(arquivo, num_disciplinas=40)
+            ofertadas = oferta.listagem(arquivo)
+
+        turmas = [(codigo, t)
+                  for codigo, disciplina in ofertadas.items()
+                  for t in disciplina.turmas]
+        esperado = sorted(
+            (a, b) for a, b in itertools.combinations(sorted(turmas), 2)
+            if a[0] != b[0] and
+            _choque(ofertadas.turma(*a), ofertadas.turma(*b)))
+        self.assertTrue(esperado)
+        self.assertEqual(ofertadas.conflitos(turmas), esperado)
+
+
+if __name__ == '__main__':
+    unittest.main()
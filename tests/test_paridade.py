@@ -0,0 +1,138 @@
+#  -*- coding: utf-8 -*-
+#    @package: test_paridade.py
+#     @author: Guilherme N. Ramos (gnramos@unb.br)
+#
+# Paridade das funções de extração com os resultados de referência: cada
+# relatório sintético (veja sigra.sintetico) é processado sem o cache e o
+# resultado, convertido em JSON, é comparado com o de dados/paridade.json.
+#
+# A referência coincide com o resultado das funções de extração originais
+# (baseadas em expressões regulares), acrescido dos campos incluídos depois
+# (a máscara de horário das turmas de OFELST e o histograma de menções de
+# HEEME) e exceto por erros corrigidos (a primeira disciplina de HEEME era
+# ignorada e DISLST falhava). Ela só deve ser regerada quando uma mudança no
+# resultado for intencional, com:
+#   python -m tests.test_paridade
+
+import array
+import json
+import os
+import tempfile
+import unittest
+
+from sigra import cache
+from sigra import lote
+from sigra import sintetico
+from sigra import utils
+from sigra.acompanhamento import historico_escolar
+
+
+REFERENCIA = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          'dados', 'paridade.json')
+
+# Tamanho dos relatórios sintéticos.
+DISCIPLINAS = 20
+TURMAS = 2
+ALUNOS = 40
+
+
+def _json(valor):
+    '''Converte o resultado de uma função de extração em tipos JSON.'''
+    if isinstance(valor, utils.Registro):
+        valor = valor.como_dict()
+    if isinstance(valor, dict):
+        return {str(chave): _json(v) for chave, v in valor.items()}
+    if isinstance(valor, (list, tuple, array.array)):
+        return [_json(v) for v in valor]
+    return valor
+
+
+def extrai_sinteticos():
+    '''Retorna um dicionário tipo: resultado (convertido em JSON) da
+    extração do relatório sintético de cada tipo.'''
+    resultados = {}
+    with tempfile.TemporaryDirectory() as diretorio, cache.desativado():
+        arquivos = sintetico.gera(diretorio, DISCIPLINAS, TURMAS, ALUNOS)
+        for tipo, arquivo in arquivos.items():
+            extrai = lote.extrator(tipo)
+            resultado = extrai([arquivo] if tipo in lote.RECEBEM_LISTA
+                               else arquivo)
+            resultados[tipo] = _json(resultado)
+    return resultados
+
+
+class TestParidade(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(REFERENCIA, encoding='utf-8') as f:
+            cls.referencia = json.load(f)
+        cls.resultados = extrai_sinteticos()
+
+    def test_tipos(self):
+        self.assertEqual(sorted(self.resultados), sorted(lote.TIPOS))
+
+    def test_paridade(self):
+        for tipo in sorted(lote.TIPOS):
+            with self.subTest(tipo=tipo):
+                self.assertTrue(self.resultados[tipo])
+                self.assertEqual(self.resultados[tipo],
+                                 self.referencia[tipo])
+
+
+class TestHEDIS(unittest.TestCase):
+    '''Paridade entre a extração das linhas de HEDIS por colunas e por
+    expressão regular (veja historico_escolar._registro_hedis).'''
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.arquivo = os.path.join(self.diretorio.name, 'HEDIS.txt')
+        sintetico.hedis(self.arquivo, num_alunos=200)
+        self.linhas = list(utils.linhas(self.arquivo))
+
+    def tearDown(self):
+        self.diretorio.cleanup()
+
+    def _extrai(self):
+        with open(self.arquivo, 'w', encoding='utf-16') as f:
+            f.write('\n'.join(self.linhas))
+        with cache.desativado():
+            return historico_escolar.alunos_que_cursaram_disciplina(
+                self.arquivo)
+
+    def test_colunas_e_expressao_regular(self):
+        registros = list(filter(None, map(historico_escolar._registro_hedis,
+                                          self.linhas)))
+        relacao = self._extrai()
+        self.assertEqual(len(registros), 200)
+        for matricula, periodo, turma, mencao, nome in registros:
+            matriculado = relacao[periodo][turma][matricula]
+            self.assertEqual((matriculado.nome, matriculado.mencao),
+                             (nome, mencao))
+
+    def test_sem_mencao(self):
+        # Alunos ainda matriculados não têm menção, e suas linhas não são
+        # reconhecidas pela expressão regular.
+        i = next(i for i, linha in enumerate(self.linhas)
+                 if historico_escolar._registro_hedis(linha))
+        matricula, periodo, turma, mencao, nome = \
+            historico_escolar._registro_hedis(self.linhas[i])
+        self.linhas[i] = self.linhas[i].replace(' ' + mencao + ' ', '    ',
+                                                1)
+        self.assertIsNone(historico_escolar._registro_hedis(self.linhas[i]))
+
+        matriculado = self._extrai()[periodo][turma][matricula]
+        self.assertEqual((matriculado.nome, matriculado.mencao), (nome, ''))
+
+    def test_regua_com_mais_colunas(self):
+        i = next(i for i, linha in enumerate(self.linhas)
+                 if utils.REGUA.match(linha))
+        self.linhas[i] += '  ----'
+        self.assertEqual(sum(len(matriculados)
+                             for turmas in self._extrai().values()
+                             for matriculados in turmas.values()), 200)
+
+
+if __name__ == '__main__':
+    with open(REFERENCIA, 'w', encoding='utf-8') as f:
+        json.dump(extrai_sinteticos(), f, ensure_ascii=False, indent=1,
+                  sort_keys=True)
+        f.write('\n')
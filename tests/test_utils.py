@@ -0,0 +1,121 @@
+#  -*- coding: utf-8 -*-
+#    @package: test_utils.py
+#     @author: Guilherme N. Ramos (gnramos@unb.br)
+#
+# Testes de períodos letivos, filtros de períodos e colunas de largura fixa.
+
+import unittest
+
+from sigra import utils
+from sigra.utils import Colunas, IntervaloDePeriodos, Periodo
+
+
+class TestPeriodo(unittest.TestCase):
+    def test_de_texto(self):
+        periodo = Periodo.de_texto(' 2014/2 ')
+        self.assertEqual((periodo.ano, periodo.termo), (2014, 2))
+        self.assertEqual(str(periodo), '2014/2')
+        self.assertFalse(periodo.verao)
+        self.assertTrue(Periodo.de_texto('2015/0').verao)
+
+    def test_invalido(self):
+        for texto in ('2014', '2014/3', '14/1', '2014/1x'):
+            with self.subTest(texto=texto):
+                self.assertRaises(ValueError, Periodo.de_texto, texto)
+
+    def test_ordem(self):
+        textos = ['2015/1', '2014/2', '2015/0', '2014/1', '2014/0']
+        ordenados = sorted(Periodo.de_texto(t) for t in textos)
+        self.assertEqual([str(p) for p in ordenados],
+                         ['2014/0', '2014/1', '2014/2', '2015/0', '2015/1'])
+
+    def test_ordinal(self):
+        for texto in ('2010/0', '2014/1', '2017/2'):
+            with self.subTest(texto=texto):
+                periodo = Periodo.de_texto(texto)
+                self.assertEqual(utils.ordinal(texto), periodo.ordinal)
+                self.assertEqual(utils.ordinal(periodo), periodo.ordinal)
+                self.assertEqual(Periodo.de_ordinal(periodo.ordinal),
+                                 periodo)
+        self.assertEqual(len({Periodo.de_texto('2014/1'),
+                              Periodo(2014, 1)}), 1)
+
+
+class TestIntervaloDePeriodos(unittest.TestCase):
+    PERIODOS = ['2014/0', '2014/1', '2014/2', '2015/0', '2015/1', '2015/2',
+                '2016/0', '2016/1', '2016/2']
+
+    def test_de_filtro(self):
+        casos = {'2014/2 <= {periodo} < 2016/1': ['2014/2', '2015/0',
+                                                  '2015/1', '2015/2',
+                                                  '2016/0'],
+                 '{} >= 2015/2': ['2015/2', '2016/0', '2016/1', '2016/2'],
+                 '2015/1 > {}': ['2014/0', '2014/1', '2014/2', '2015/0'],
+                 '{} == 2015/1': ['2015/1'],
+                 '2016/0 < {}': ['2016/1', '2016/2']}
+        for filtro, esperado in casos.items():
+            with self.subTest(filtro=filtro):
+                intervalo = IntervaloDePeriodos.de_filtro(filtro)
+                self.assertEqual(intervalo.filtra(self.PERIODOS), esperado)
+                self.assertEqual([p for p in self.PERIODOS if p in intervalo],
+                                 esperado)
+
+    def test_ignora_verao(self):
+        intervalo = IntervaloDePeriodos.de_filtro('2014/1 <= {} <= 2015/1',
+                                                  ignora_verao=True)
+        self.assertEqual(intervalo.filtra(self.PERIODOS),
+                         ['2014/1', '2014/2', '2015/1'])
+
+    def test_equivale_ao_construtor(self):
+        filtrado = IntervaloDePeriodos.de_filtro('2014/2 <= {} <= 2016/0')
+        construido = IntervaloDePeriodos('2014/2', '2016/0')
+        self.assertEqual((filtrado.inicio, filtrado.fim),
+                         (construido.inicio, construido.fim))
+
+    def test_invalido(self):
+        for filtro in ('2014/2', '2014/1 < 2015/1', '{} < {}',
+                       '{} != 2014/1'):
+            with self.subTest(filtro=filtro):
+                self.assertRaises(ValueError, IntervaloDePeriodos.de_filtro,
+                                  filtro)
+
+
+class TestColunas(unittest.TestCase):
+    REGUA = '  ----------  -------  -----  ------  --------'
+
+    def test_fatia(self):
+        colunas = Colunas.de_regua(self.REGUA)
+        self.assertEqual(
+            colunas.fatia('  14/0123456  2014/1   A      MM      ANA LIMA'),
+            ('14/0123456', '2014/1 ', 'A    ', 'MM    ', 'ANA LIMA'))
+
+    def test_ultima_coluna_ate_o_fim(self):
+        colunas = Colunas.de_regua(self.REGUA)
+        campos = colunas.fatia('  14/0123456  2014/1   A      MM      '
+                               'ANA MARIA DE OLIVEIRA LIMA')
+        self.assertEqual(campos[-1], 'ANA MARIA DE OLIVEIRA LIMA')
+
+    def test_num_colunas(self):
+        colunas = Colunas.de_regua(self.REGUA, 3)
+        self.assertEqual(
+            colunas.fatia('  14/0123456  2014/1   A      MM      ANA LIMA'),
+            ('14/0123456', '2014/1 ', 'A      MM      ANA LIMA'))
+
+    def test_linha_curta(self):
+        colunas = Colunas.de_regua(self.REGUA)
+        self.assertEqual(colunas.fatia('  14/0123456  2014/1   A'),
+                         ('14/0123456', '2014/1 ', 'A    ', '      ', ''))
+
+    def test_campo_invade_o_seguinte(self):
+        colunas = Colunas.de_regua(self.REGUA)
+        self.assertIsNone(
+            colunas.fatia('  14/01234567 2014/1   A      MM      ANA LIMA'))
+        self.assertIsNone(
+            colunas.fatia('  14/0123456  2014/1   ABCDEFGH   MM  ANA LIMA'))
+
+    def test_regua_invalida(self):
+        self.assertRaises(ValueError, Colunas.de_regua, '   ')
+
+
+if __name__ == '__main__':
+    unittest.main()